@@ -3,7 +3,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
-from .models import User
+from django.utils import timezone
+from backend.pagination import EstimatedCountPaginator
+from .models import User, OutboundEmail
 
 
 # Optional: Custom forms (recommended for clean admin experience)
@@ -29,8 +31,10 @@ class UserAdmin(BaseUserAdmin):
     # Fields shown in the list view
     list_display = ('email', 'shop_name', 'is_email_verified', 'is_staff', 'is_active', 'date_joined')
     list_filter = ('is_email_verified', 'is_staff', 'is_active', 'date_joined')
-    search_fields = ('email', 'shop_name')
+    search_fields = ('email', 'shop_name')  # Trigram indexes, migration 0006
     ordering = ('email',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     # Fields shown when viewing/editing a user
     fieldsets = (
@@ -49,4 +53,22 @@ class UserAdmin(BaseUserAdmin):
     )
 
     readonly_fields = ('date_joined', 'last_login')
-    filter_horizontal = ('groups', 'user_permissions')
\ No newline at end of file
+    filter_horizontal = ('groups', 'user_permissions')
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected emails')
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} emails requeued')
@@ -0,0 +1,42 @@
+# accounts/hashers.py
+"""
+Password hashers whose cost parameters come from settings, so login CPU cost
+can be tuned per deployment (see PASSWORD_* in backend/settings.py and the
+benchmark_password_hashers command). A setting left as None keeps Django's
+default for that parameter.
+
+When a parameter or the preferred hasher changes, existing hashes are
+upgraded transparently the next time the user logs in: authenticate() calls
+check_password(), which re-encodes the password whenever must_update() is true
+or the hash was made by a hasher other than PASSWORD_HASHERS[0].
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher,
+)
+
+
+def _tuned(setting, default):
+    return property(lambda self: getattr(settings, setting, None) or default)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = _tuned('PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = _tuned('PASSWORD_SCRYPT_WORK_FACTOR', ScryptPasswordHasher.work_factor)
+    block_size = _tuned('PASSWORD_SCRYPT_BLOCK_SIZE', ScryptPasswordHasher.block_size)
+    parallelism = _tuned('PASSWORD_SCRYPT_PARALLELISM', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        # scrypt needs about 128 * n * r * p bytes; OpenSSL's default cap is 32 MiB
+        return 2 * 128 * self.work_factor * self.block_size * self.parallelism
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Requires argon2-cffi."""
+    time_cost = _tuned('PASSWORD_ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+    memory_cost = _tuned('PASSWORD_ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+    parallelism = _tuned('PASSWORD_ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
@@ -0,0 +1,96 @@
+# accounts/images.py
+"""
+Fixed-size profile picture variants.
+
+Variant URLs are computed once when the picture changes and stored on the
+user (User.profile_picture_variants), so serializers only read a dict. The
+backend that produces them is pluggable through PROFILE_PICTURE_VARIANT_BACKEND:
+
+- CloudinaryVariantBackend (default) builds Cloudinary transformation URLs;
+  Cloudinary renders and caches each size on first request.
+- PillowVariantBackend resizes the uploaded file locally and saves the
+  variants through Django's default storage.
+"""
+import io
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+DEFAULT_SIZES = {'thumb': 64, 'medium': 256}
+
+
+def variant_sizes():
+    return getattr(settings, 'PROFILE_PICTURE_VARIANT_SIZES', DEFAULT_SIZES)
+
+
+class CloudinaryVariantBackend:
+    def build(self, user, picture, upload=None):
+        if not hasattr(picture, 'build_url'):
+            return None
+        variants = {'original': picture.url}
+        for name, size in variant_sizes().items():
+            variants[name] = picture.build_url(
+                width=size, height=size, crop='fill', gravity='face',
+                quality='auto', fetch_format='auto'
+            )
+        return variants
+
+
+class PillowVariantBackend:
+    format = 'WEBP'
+    quality = 85
+
+    def build(self, user, picture, upload=None):
+        # Needs the original bytes, which are only at hand while uploading
+        if upload is None:
+            return None
+        from PIL import Image, ImageOps
+
+        upload.seek(0)
+        with Image.open(upload) as image:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            variants = {'original': picture.url if hasattr(picture, 'url') else str(picture)}
+            for name, size in variant_sizes().items():
+                resized = ImageOps.fit(image, (size, size), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, self.format, quality=self.quality)
+                path = default_storage.save(
+                    f'profile_pictures/{user.pk}/{name}.{self.format.lower()}',
+                    ContentFile(buffer.getvalue())
+                )
+                variants[name] = default_storage.url(path)
+        return variants
+
+
+@lru_cache(maxsize=None)
+def get_variant_backend():
+    path = getattr(settings, 'PROFILE_PICTURE_VARIANT_BACKEND', 'accounts.images.CloudinaryVariantBackend')
+    return import_string(path)()
+
+
+def build_profile_picture_variants(user, upload=None):
+    """
+    Return the variants dict for the user's current picture, reusing the
+    stored one when the picture has not changed.
+    """
+    picture = user.profile_picture
+    if not picture:
+        return {}
+
+    if isinstance(picture, str):
+        # Assigned as "image/upload/v1/<public_id>" rather than uploaded
+        picture = user._meta.get_field('profile_picture').to_python(picture)
+
+    source = str(picture)
+    current = user.profile_picture_variants or {}
+    if current.get('source') == source and upload is None:
+        return current
+
+    variants = get_variant_backend().build(user, picture, upload)
+    if variants is None:
+        return current
+    variants['source'] = source
+    return variants
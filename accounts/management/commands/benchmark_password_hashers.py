@@ -0,0 +1,53 @@
+# accounts/management/commands/benchmark_password_hashers.py
+
+import os
+import time
+
+from django.contrib.auth.hashers import get_hasher, get_hashers
+from django.core.management.base import BaseCommand
+
+HIDDEN_SUMMARY_KEYS = {'algorithm', 'salt', 'hash'}
+
+
+class Command(BaseCommand):
+    help = "Measure hashes per second per core for each configured password hasher"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=2.0, help="Time spent on each hasher")
+        parser.add_argument('--algorithm', action='append',
+                            help="Only benchmark this algorithm (repeatable), e.g. scrypt")
+
+    def handle(self, *args, **options):
+        cores = os.cpu_count() or 1
+        preferred = get_hasher('default').algorithm
+        self.stdout.write(f"{cores} CPU cores; new passwords use '{preferred}'\n")
+
+        for hasher in get_hashers():
+            if options['algorithm'] and hasher.algorithm not in options['algorithm']:
+                continue
+            try:
+                encoded = hasher.encode('benchmark-password', hasher.salt())
+            except ValueError as e:
+                # e.g. argon2 without argon2-cffi installed
+                self.stdout.write(self.style.WARNING(f"{hasher.algorithm}: skipped ({e})"))
+                continue
+
+            # Login cost is one verify(), which re-derives the hash
+            count = 0
+            started = time.perf_counter()
+            elapsed = 0.0
+            while elapsed < options['seconds'] or count == 0:
+                hasher.verify('benchmark-password', encoded)
+                count += 1
+                elapsed = time.perf_counter() - started
+
+            per_core = count / elapsed
+            params = ', '.join(
+                f"{key}={value}" for key, value in hasher.safe_summary(encoded).items()
+                if str(key) not in HIDDEN_SUMMARY_KEYS
+            )
+            marker = ' (preferred)' if hasher.algorithm == preferred else ''
+            self.stdout.write(
+                f"{hasher.algorithm}{marker} [{params}]: {1000 / per_core:.1f} ms/hash, "
+                f"{per_core:.1f} hashes/s/core, ~{per_core * cores:.0f} logins/s on {cores} cores"
+            )
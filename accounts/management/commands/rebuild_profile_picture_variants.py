@@ -0,0 +1,35 @@
+# accounts/management/commands/rebuild_profile_picture_variants.py
+
+from django.core.management.base import BaseCommand
+
+from accounts.images import build_profile_picture_variants
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = "Precompute profile picture variant URLs for users that lack them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--force', action='store_true', help="Rebuild even when variants are present")
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture__isnull=True).exclude(profile_picture='')
+        if not options['force']:
+            users = users.filter(profile_picture_variants={})
+
+        batch, updated = [], 0
+        for user in users.only('id', 'profile_picture', 'profile_picture_variants').iterator(chunk_size=options['batch_size']):
+            if options['force']:
+                user.profile_picture_variants = {}
+            variants = build_profile_picture_variants(user)
+            if variants and variants != user.profile_picture_variants:
+                user.profile_picture_variants = variants
+                batch.append(user)
+            if len(batch) >= options['batch_size']:
+                updated += User.objects.bulk_update(batch, ['profile_picture_variants'])
+                batch = []
+        if batch:
+            updated += User.objects.bulk_update(batch, ['profile_picture_variants'])
+
+        self.stdout.write(self.style.SUCCESS(f"Updated variants for {updated} users"))
@@ -0,0 +1,29 @@
+# accounts/management/commands/send_queued_emails.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Messages per SMTP connection")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new messages")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            counts = send_pending(options['batch_size'])
+            if any(counts.values()):
+                self.stdout.write(
+                    f"sent {counts['sent']}, retrying {counts['retry']}, dead-lettered {counts['dead']}"
+                )
+            if not options['loop']:
+                break
+            # Drain a backlog without sleeping between full batches
+            if not any(counts.values()):
+                time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 13:05
+
+from django.db import migrations
+
+# Django's icontains / iexact compare UPPER(column::text) on PostgreSQL, so
+# the indexes are built on that exact expression. Product, rating and reel
+# admins search through these as well (seller__email, buyer__shop_name...).
+INDEXES = [
+    ('user_email_upper_idx', 'accounts_user', '(UPPER(email::text))'),
+    ('user_email_trgm_idx', 'accounts_user', 'USING gin (UPPER(email::text) gin_trgm_ops)'),
+    ('user_shop_name_trgm_idx', 'accounts_user', 'USING gin (UPPER(shop_name::text) gin_trgm_ops)'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, definition in INDEXES:
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0005_user_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
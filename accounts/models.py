@@ -1,8 +1,11 @@
 from django.contrib.auth.models import BaseUserManager
 # accounts/models.py
 from django.contrib.auth.models import AbstractUser
+from django.core.files.uploadedfile import UploadedFile
 from django.db import models
+from django.utils import timezone
 import cloudinary.models  # If using Cloudinary
+from .images import build_profile_picture_variants
 
 
 class UserManager(BaseUserManager):
@@ -43,6 +46,9 @@ class User(AbstractUser):
         null=True,
     )
 
+    # {'source': ..., 'original': url, 'thumb': url, 'medium': url}, see accounts/images.py
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
+
     is_email_verified = models.BooleanField(default=False)
 
     USERNAME_FIELD = 'email'
@@ -52,3 +58,50 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.email
+
+    def save(self, *args, **kwargs):
+        upload = self.profile_picture if isinstance(self.profile_picture, UploadedFile) else None
+        super().save(*args, **kwargs)
+
+        # The picture is uploaded by CloudinaryField during save, so variants
+        # can only be built afterwards
+        variants = build_profile_picture_variants(self, upload)
+        if variants != self.profile_picture_variants:
+            self.profile_picture_variants = variants
+            super().save(update_fields=['profile_picture_variants'])
+
+
+class OutboundEmail(models.Model):
+    """
+    Persistent email outbox. Request handlers only enqueue rows here; the
+    send_queued_emails worker delivers them over one reused SMTP connection.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='outbox_pending_due_idx',
+                         condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {", ".join(self.recipients)} ({self.status})'
@@ -0,0 +1,121 @@
+# accounts/outbox.py
+"""
+Delivery side of the email outbox (see OutboundEmail).
+
+Due messages are claimed in batches and sent over a single backend connection.
+Claiming is a short transaction that leases the rows to the worker by moving
+next_attempt_at EMAIL_OUTBOX_LEASE_SECONDS ahead and counting the attempt.
+The sends then run with no transaction or row lock held, and each message's
+result is saved as soon as it is known. Messages left behind by a worker that
+died come due again when the lease runs out.
+
+A failed message is retried with exponential backoff and dead-lettered after
+EMAIL_OUTBOX_MAX_ATTEMPTS tries.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, body, recipients, from_email=None):
+    """Store an email for background delivery and return the outbox row."""
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or '',
+        recipients=list(recipients),
+    )
+
+
+def retry_delay(attempts):
+    """Backoff before the next try: base * 2^(attempts - 1), capped."""
+    delay = settings.EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+def claim_due(batch_size):
+    """Lease a batch of due messages to this worker, counting the attempt."""
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets several workers drain the outbox concurrently
+        messages = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[message.pk for message in messages]).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS),
+            attempts=F('attempts') + 1,
+        )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def send_pending(batch_size=None):
+    """
+    Send one batch of due messages. Returns a dict with the number of
+    messages sent, scheduled for retry and dead-lettered.
+    """
+    counts = {'sent': 0, 'retry': 0, 'dead': 0}
+    messages = claim_due(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not messages:
+        return counts
+
+    connection = get_connection(fail_silently=False)
+    try:
+        for message in messages:
+            counts[_send(message, connection)] += 1
+    finally:
+        connection.close()
+
+    return counts
+
+
+def _send(message, connection):
+    if message.attempts > settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        # Claimed too often without a result: a worker died sending it
+        message.status = OutboundEmail.STATUS_DEAD
+        message.last_error = message.last_error or "Worker stopped while sending"
+        message.save(update_fields=['last_error', 'status'])
+        return 'dead'
+
+    email = EmailMessage(
+        message.subject,
+        message.body,
+        message.from_email,
+        message.recipients,
+        connection=connection,
+    )
+    try:
+        # Opens the connection on first use and keeps it for the batch
+        connection.send_messages([email])
+    except Exception as e:
+        logger.warning("Email %s failed (attempt %s): %s", message.pk, message.attempts, e)
+        # A broken connection is reopened for the next message
+        connection.close()
+        message.last_error = str(e)
+        if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            message.status = OutboundEmail.STATUS_DEAD
+            result = 'dead'
+        else:
+            message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+            result = 'retry'
+        message.save(update_fields=['last_error', 'status', 'next_attempt_at'])
+        return result
+
+    message.status = OutboundEmail.STATUS_SENT
+    message.sent_at = timezone.now()
+    message.last_error = ''
+    message.save(update_fields=['last_error', 'status', 'sent_at'])
+    return 'sent'
@@ -74,12 +74,26 @@ class UserUpdateSerializer(serializers.ModelSerializer):
 
 class UserSerializer(serializers.ModelSerializer):
     profile_picture_url = serializers.SerializerMethodField()
+    profile_picture_thumb_url = serializers.SerializerMethodField()
+    profile_picture_medium_url = serializers.SerializerMethodField()
     
     class Meta:
         model = User
-        fields = ('id', 'shop_name', 'email', 'profile_picture_url', 'is_email_verified')
+        fields = ('id', 'shop_name', 'email', 'profile_picture_url', 'profile_picture_thumb_url',
+                  'profile_picture_medium_url', 'is_email_verified')
     
+    # Variant URLs are precomputed on upload (accounts/images.py)
+    def get_profile_picture_thumb_url(self, obj):
+        return obj.profile_picture_variants.get('thumb')
+
+    def get_profile_picture_medium_url(self, obj):
+        return obj.profile_picture_variants.get('medium')
+
     def get_profile_picture_url(self, obj):
+        original = obj.profile_picture_variants.get('original')
+        if original:
+            return original
+        # Users not yet backfilled by rebuild_profile_picture_variants
         if obj.profile_picture:
             # Return full URL if using Cloudinary or similar
             if hasattr(obj.profile_picture, 'url'):
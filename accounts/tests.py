@@ -1,3 +1,376 @@
-from django.test import TestCase
+import gc
+import io
+import weakref
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import ANY, Mock, patch
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from redis.exceptions import NoScriptError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.throttling import TOKEN_BUCKET_SHA, TokenBucketThrottle
+from .authentication import user_cache
+from .images import PillowVariantBackend, get_variant_backend
+from .models import OutboundEmail, User
+from .outbox import claim_due, send_pending
+from .serializers import UserSerializer
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("SMTP server unavailable")
+
+
+class RecordingEmailBackend(BaseEmailBackend):
+    """Records, per send, the open atomic blocks and the messages already marked sent"""
+    sends = []
+
+    def send_messages(self, email_messages):
+        self.sends.append((
+            len(connection.atomic_blocks),
+            OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT).count(),
+        ))
+        return len(email_messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    DEFAULT_FROM_EMAIL='noreply@bongoshop.test',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_BACKOFF_SECONDS=30,
+)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def register(self):
+        return self.client.post('/api/auth/register/', {
+            'email': 'seller@example.com',
+            'shop_name': 'Seller',
+            'password': 'a-long-Password-123',
+        }, format='json')
+
+    def test_register_only_enqueues(self):
+        response = self.register()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.recipients, ['seller@example.com'])
+        self.assertEqual(queued.status, OutboundEmail.STATUS_PENDING)
+
+    def test_worker_sends_batch(self):
+        self.register()
+        self.client.post('/api/auth/support/', {'message': 'Help'}, format='json')
+
+        counts = send_pending()
+
+        self.assertEqual(counts, {'sent': 2, 'retry': 0, 'dead': 0})
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('verification code', mail.outbox[0].body)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.STATUS_SENT).exists())
+
+    def test_failure_backs_off_then_dead_letters(self):
+        self.register()
+
+        with self.settings(EMAIL_BACKEND='accounts.tests.FailingEmailBackend'):
+            self.assertEqual(send_pending()['retry'], 1)
+            message = OutboundEmail.objects.get()
+            self.assertEqual(message.attempts, 1)
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+            # Not due yet, so nothing is retried
+            self.assertEqual(send_pending(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+            for expected in ('retry', 'dead'):
+                OutboundEmail.objects.update(next_attempt_at=timezone.now())
+                self.assertEqual(send_pending()[expected], 1)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboundEmail.STATUS_DEAD)
+        self.assertEqual(message.attempts, 3)
+        self.assertIn('SMTP server unavailable', message.last_error)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_sends_run_outside_the_claim_transaction(self):
+        self.register()
+        self.client.post('/api/auth/support/', {'message': 'Help'}, format='json')
+        RecordingEmailBackend.sends = []
+
+        with self.settings(EMAIL_BACKEND='accounts.tests.RecordingEmailBackend'):
+            self.assertEqual(send_pending()['sent'], 2)
+
+        # No transaction beyond the test's own, and each result is saved
+        # before the next message goes out
+        baseline = len(connection.atomic_blocks)
+        self.assertEqual(RecordingEmailBackend.sends, [(baseline, 0), (baseline, 1)])
+
+    @override_settings(EMAIL_OUTBOX_LEASE_SECONDS=600)
+    def test_messages_of_a_dead_worker_wait_for_the_lease(self):
+        self.register()
+        # A worker claims the message and dies before sending it
+        self.assertEqual(len(claim_due(10)), 1)
+        message = OutboundEmail.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=590))
+        self.assertEqual(send_pending(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_pending()['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_message_claimed_too_often_is_dead_lettered(self):
+        self.register()
+        OutboundEmail.objects.update(attempts=3)
+
+        self.assertEqual(send_pending(), {'sent': 0, 'retry': 0, 'dead': 1})
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.STATUS_DEAD)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+@override_settings(REST_FRAMEWORK={
+    'DEFAULT_AUTHENTICATION_CLASSES': (),
+    'DEFAULT_THROTTLE_RATES': {'verify_code': '3/15m', 'login': '2/min', 'login_account': '3/h'},
+    'NUM_PROXIES': 1,
+})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_code_attempts_limited_per_email(self):
+        for _ in range(3):
+            response = self.client.post('/api/auth/verify-email/', {'email': 'a@example.com', 'code': '000000'})
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/auth/verify-email/', {'email': 'A@example.com ', 'code': '000000'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        # Other addresses have their own bucket
+        response = self.client.post('/api/auth/verify-email/', {'email': 'b@example.com', 'code': '000000'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_forwarded_for_cannot_be_spoofed(self):
+        # Behind one proxy only the hop it appended counts
+        for spoofed in ('1.1.1.1', '2.2.2.2'):
+            response = self.client.post('/api/auth/login/', {}, HTTP_X_FORWARDED_FOR=f'{spoofed}, 10.0.0.7')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/auth/login/', {}, HTTP_X_FORWARDED_FOR='3.3.3.3, 10.0.0.7')
+        self.assertEqual(response.status_code, 429)
+        response = self.client.post('/api/auth/login/', {}, HTTP_X_FORWARDED_FOR='3.3.3.3, 10.0.0.8')
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_account_bucket_is_per_ip(self):
+        credentials = {'email': 'victim@example.com', 'password': 'guess'}
+        # 2/min per IP refills between attempts; 3/h per (account, IP) does not
+        for second in (1000.0, 1060.0, 1120.0):
+            with patch.object(TokenBucketThrottle, 'timer', return_value=second):
+                self.assertEqual(self.client.post('/api/auth/login/', credentials).status_code, 401)
+        with patch.object(TokenBucketThrottle, 'timer', return_value=1180.0):
+            self.assertEqual(self.client.post('/api/auth/login/', credentials).status_code, 429)
+            # The owner, from another IP, is not locked out
+            response = self.client.post('/api/auth/login/', credentials, HTTP_X_FORWARDED_FOR='10.0.0.9')
+            self.assertEqual(response.status_code, 401)
+            response = self.client.post('/api/auth/login/', {'email': 'other@example.com', 'password': 'x'})
+            self.assertEqual(response.status_code, 401)
+
+    def redis_cache(self, client_factory):
+        redis_cache = RedisCache('redis://cache.test:6379', {})
+        redis_cache._cache.get_client = lambda *args, **kwargs: client_factory()
+        return patch.object(TokenBucketThrottle, 'cache', redis_cache)
+
+    def test_login_is_one_redis_round_trip(self):
+        client = Mock()
+        client.evalsha.return_value = [1, '0']
+        with self.redis_cache(lambda: client):
+            self.client.post('/api/auth/login/', {'email': 'a@example.com', 'password': 'x'})
+
+        self.assertEqual(len(client.method_calls), 1)
+        sha, key_count, *keys_and_args = client.evalsha.call_args.args
+        self.assertEqual(sha, TOKEN_BUCKET_SHA)
+        self.assertEqual(key_count, 2)
+        self.assertEqual(keys_and_args[2:], [ANY, 2, 60.0, 3, 3600.0])
+
+    def test_redis_clients_are_not_retained(self):
+        # Django's Redis cache builds a new client object per call
+        clients = []
+
+        def new_client():
+            client = Mock()
+            client.evalsha.side_effect = NoScriptError
+            client.eval.return_value = [1, '0']
+            clients.append(weakref.ref(client))
+            return client
+
+        with self.redis_cache(new_client):
+            for _ in range(3):
+                self.client.post('/api/auth/login/', {})
+        gc.collect()
+
+        self.assertEqual(len(clients), 3)
+        self.assertEqual([ref() for ref in clients], [None, None, None])
+
+    def test_bucket_refills_over_time(self):
+        with patch.object(TokenBucketThrottle, 'timer', return_value=1000.0):
+            for _ in range(2):
+                self.client.post('/api/auth/login/', {})
+            self.assertEqual(self.client.post('/api/auth/login/', {}).status_code, 429)
+
+        # 2 tokens per minute: one token is back after 30 seconds
+        with patch.object(TokenBucketThrottle, 'timer', return_value=1030.0):
+            self.assertEqual(self.client.post('/api/auth/login/', {}).status_code, 400)
+            self.assertEqual(self.client.post('/api/auth/login/', {}).status_code, 429)
+
+
+class ProfilePictureVariantTests(TestCase):
+    picture = 'image/upload/v1/avatars/abc'
+
+    def setUp(self):
+        get_variant_backend.cache_clear()
+        self.addCleanup(get_variant_backend.cache_clear)
+        self.user = User.objects.create_user('seller@example.com', 'pw', shop_name='Seller')
+
+    def test_variants_are_stored_when_the_picture_changes(self):
+        self.user.profile_picture = self.picture
+        self.user.save()
+        self.user.refresh_from_db()
+
+        variants = self.user.profile_picture_variants
+        self.assertEqual(variants['source'], 'avatars/abc')
+        self.assertTrue(variants['original'].endswith('/image/upload/v1/avatars/abc'))
+        self.assertIn('c_fill', variants['thumb'])
+        self.assertIn('w_64', variants['thumb'])
+        self.assertIn('w_256', variants['medium'])
+
+        data = UserSerializer(self.user).data
+        self.assertEqual(data['profile_picture_url'], variants['original'])
+        self.assertEqual(data['profile_picture_thumb_url'], variants['thumb'])
+        self.assertEqual(data['profile_picture_medium_url'], variants['medium'])
+
+    def test_unchanged_picture_is_not_rebuilt(self):
+        self.user.profile_picture = self.picture
+        self.user.save()
+
+        with patch.object(get_variant_backend(), 'build') as build:
+            self.user.shop_name = 'Renamed'
+            self.user.save()
+        build.assert_not_called()
+
+    def test_user_without_picture_has_no_variants(self):
+        self.assertEqual(self.user.profile_picture_variants, {})
+        self.assertIsNone(UserSerializer(self.user).data['profile_picture_thumb_url'])
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_pillow_backend_resizes_the_upload(self):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, 'JPEG')
+        upload = SimpleUploadedFile('me.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+        variants = PillowVariantBackend().build(self.user, 'avatars/me', upload)
+
+        self.assertEqual(variants['original'], 'avatars/me')
+        for name, size in (('thumb', 64), ('medium', 256)):
+            path = f'profile_pictures/{self.user.pk}/{name}.webp'
+            self.assertEqual(variants[name], default_storage.url(path))
+            with default_storage.open(path) as stored, Image.open(stored) as image:
+                self.assertEqual((image.format, image.size), ('WEBP', (size, size)))
+        self.assertIsNone(PillowVariantBackend().build(self.user, 'avatars/me'))
+
+    def test_rebuild_command_backfills_missing_variants(self):
+        self.user.profile_picture = self.picture
+        self.user.save()
+        expected = User.objects.get(pk=self.user.pk).profile_picture_variants
+        User.objects.filter(pk=self.user.pk).update(profile_picture_variants={})
+        User.objects.create_user('buyer@example.com', 'pw', shop_name='Buyer')
+
+        out = StringIO()
+        call_command('rebuild_profile_picture_variants', stdout=out)
+
+        self.assertIn('Updated variants for 1 users', out.getvalue())
+        self.assertEqual(User.objects.get(pk=self.user.pk).profile_picture_variants, expected)
+        self.assertEqual(User.objects.get(email='buyer@example.com').profile_picture_variants, {})
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user('buyer@example.com', 'pw', shop_name='Buyer')
+        self.client = APIClient()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_repeat_requests_skip_user_query(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.data['email'], 'buyer@example.com')
+
+    def test_save_invalidates_cached_user(self):
+        self.client.get('/api/auth/profile/')
+        self.user.is_email_verified = True
+        self.user.save()
+
+        response = self.client.get('/api/auth/profile/')
+        self.assertTrue(response.data['is_email_verified'])
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+
+@override_settings(
+    PASSWORD_HASHERS=[
+        'accounts.hashers.TunedPBKDF2PasswordHasher',
+        'accounts.hashers.TunedScryptPasswordHasher',
+    ],
+    PASSWORD_PBKDF2_ITERATIONS=1000,
+    PASSWORD_SCRYPT_WORK_FACTOR=2**10,
+)
+class PasswordRehashTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            'seller@example.com', 'a-long-Password-123', shop_name='Seller', is_email_verified=True
+        )
+
+    def login(self):
+        return APIClient().post('/api/auth/login/', {
+            'email': 'seller@example.com', 'password': 'a-long-Password-123'
+        }, format='json')
+
+    def test_login_rehashes_with_new_parameters(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login().status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_login_rehashes_with_preferred_hasher(self):
+        with self.settings(PASSWORD_HASHERS=[
+            'accounts.hashers.TunedScryptPasswordHasher',
+            'accounts.hashers.TunedPBKDF2PasswordHasher',
+        ]):
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('scrypt$1024$'))
+            # The upgraded hash keeps working
+            self.assertEqual(self.login().status_code, 200)
@@ -1,7 +1,7 @@
 # accounts/utils.py
 import random
-from django.core.mail import send_mail
 from django.conf import settings
+from .outbox import enqueue_email
 
 
 def generate_code(n=6):
@@ -13,27 +13,15 @@ def generate_code(n=6):
 
 def send_verification_email(email, code):
     """
-    Send a verification code to the specified email.
+    Queue a verification code email to the specified address.
     """
     subject = 'Your verification code'
     message = f'Your verification code is: {code}\n\nThis code will expire in 15 minutes.'
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [email],
-        fail_silently=False
-    )
+    enqueue_email(subject, message, [email])
 
 
 def send_support_email(subject, body, from_email=None):
     """
-    Send support emails to the default support inbox.
+    Queue a support email to the default support inbox.
     """
-    send_mail(
-        subject,
-        body,
-        from_email or settings.DEFAULT_FROM_EMAIL,
-        [settings.DEFAULT_FROM_EMAIL],
-        fail_silently=False
-    )
\ No newline at end of file
+    enqueue_email(subject, body, [settings.DEFAULT_FROM_EMAIL], from_email=from_email)
@@ -7,6 +7,7 @@ from django.shortcuts import get_object_or_404
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.core.cache import cache
+from backend.throttling import CodeAttemptThrottle, IPTokenBucketThrottle, LoginThrottle
 from .models import User
 # IMPORT ALL SERIALIZERS
 from .serializers import RegisterSerializer, UserSerializer, UserUpdateSerializer, LoginSerializer
@@ -49,6 +50,9 @@ class RegisterView(generics.CreateAPIView):
 
 
 class VerifyEmailView(APIView):
+    throttle_classes = [CodeAttemptThrottle]
+    throttle_scope = 'verify_code'
+
     def post(self, request):
         email = request.data.get('email')
         code = request.data.get('code')
@@ -68,6 +72,9 @@ class VerifyEmailView(APIView):
 
 
 class LoginView(APIView):
+    throttle_classes = [LoginThrottle]
+    throttle_scope = 'login'
+
     def post(self, request):
         email = request.data.get('email')
         password = request.data.get('password')
@@ -96,6 +103,9 @@ class LoginView(APIView):
 
 
 class PasswordResetRequestView(APIView):
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = 'password_reset'
+
     def post(self, request):
         email = request.data.get('email')
         if not email:
@@ -113,6 +123,9 @@ class PasswordResetRequestView(APIView):
 
 
 class PasswordResetConfirmView(APIView):
+    throttle_classes = [CodeAttemptThrottle]
+    throttle_scope = 'verify_code'
+
     def post(self, request):
         email = request.data.get('email')
         code = request.data.get('code')
@@ -3,6 +3,12 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Database pool defaults for ASGI workers (daphne): a single process runs
+sync views on a thread pool and keeps many requests in flight, so it gets a
+larger pool than a WSGI worker. With the default of 10 connections per
+process, N daphne processes use at most 10 * N Postgres connections.
+Override any of these from the environment.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -12,5 +18,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('DB_POOL_MIN_SIZE', '2')
+os.environ.setdefault('DB_POOL_MAX_SIZE', '10')
 
 application = get_asgi_application()
@@ -0,0 +1,167 @@
+# backend/compression.py
+"""
+Response compression negotiated through Accept-Encoding.
+
+Used in place of Django's GZipMiddleware. It sends brotli when the client
+accepts it and the Brotli package is installed, and gzip otherwise. Some
+responses go out unchanged:
+- bodies under COMPRESSION_MIN_SIZE bytes, where the framing costs more than
+  it saves;
+- responses that are not text or JSON;
+- responses that are already encoded.
+
+StreamingHttpResponse bodies (the CSV exports) are compressed chunk by chunk
+and flushed after each chunk, so clients keep receiving rows as they are
+produced.
+
+The level follows the CPU load. The 1-minute load average per CPU is sampled
+at most once a second. At or below COMPRESSION_LOW_LOAD_PERCENT the
+encoding's highest level is used, at or above COMPRESSION_HIGH_LOAD_PERCENT
+its lowest, and a proportional level in between. `manage.py
+benchmark_compression` reports the bytes saved and CPU cost per endpoint.
+"""
+import gzip
+import os
+import re
+import time
+import zlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+# compress(data, level) -> bytes; stream(level) -> (process(chunk), finish())
+Encoding = namedtuple('Encoding', 'min_level max_level compress stream')
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/javascript', 'application/xml', 'image/svg+xml'}
+_QUALITY = re.compile(r'(?:^|;)\s*q=([0-9.]+)')
+
+
+def _gzip_stream(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+def _brotli_stream(level):
+    compressor = brotli.Compressor(quality=level)
+    return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+
+
+# Levels above these cost much more CPU for little gain on JSON
+ENCODINGS = {'gzip': Encoding(1, 6, lambda data, level: gzip.compress(data, level, mtime=0), _gzip_stream)}
+if brotli is not None:
+    ENCODINGS['br'] = Encoding(1, 5, lambda data, level: brotli.compress(data, quality=level), _brotli_stream)
+# Preferred first when the client accepts several equally
+PREFERENCE = ('br', 'gzip')
+
+
+def negotiate(accept_encoding):
+    """The encoding to use for an Accept-Encoding header, or None."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        match = _QUALITY.search(params)
+        try:
+            accepted[coding.strip().lower()] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            continue
+    best, best_quality = None, 0
+    for name in PREFERENCE:
+        quality = accepted.get(name, accepted.get('*', 0))
+        if name in ENCODINGS and quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class LoadSampler:
+    """The 1-minute load average per CPU, as a percentage, sampled at most once a second."""
+
+    def __init__(self):
+        self.cpus = os.cpu_count() or 1
+        self.sampled_at = None
+        self.percent = 0
+
+    def __call__(self):
+        now = time.monotonic()
+        if self.sampled_at is None or now - self.sampled_at >= 1:
+            try:
+                self.percent = os.getloadavg()[0] * 100 / self.cpus
+            except (AttributeError, OSError):  # Not available on this platform
+                self.percent = 0
+            self.sampled_at = now
+        return self.percent
+
+
+load_percent = LoadSampler()
+
+
+def compression_level(encoding, load=None):
+    """The level to compress at under `load` (percent per CPU; default: the current load)."""
+    load = load_percent() if load is None else load
+    low, high = settings.COMPRESSION_LOW_LOAD_PERCENT, settings.COMPRESSION_HIGH_LOAD_PERCENT
+    headroom = min(max((high - load) / max(high - low, 1), 0), 1)
+    return encoding.min_level + round(headroom * (encoding.max_level - encoding.min_level))
+
+
+def compressible(response):
+    content_type = response.get('Content-Type', '').partition(';')[0].strip().lower()
+    return content_type.startswith('text/') or content_type.endswith('+json') or content_type in COMPRESSIBLE_TYPES
+
+
+def compress_stream(chunks, encoding, level):
+    process, finish = encoding.stream(level)
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_stream(chunks, encoding, level):
+    process, finish = encoding.stream(level)
+    async for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with the best encoding the client accepts."""
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code == 206 or not compressible(response):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        name = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if name is None:
+            return response
+        encoding = ENCODINGS[name]
+        level = compression_level(encoding)
+
+        if response.streaming:
+            stream = acompress_stream if response.is_async else compress_stream
+            response.streaming_content = stream(response.streaming_content, encoding, level)
+            del response['Content-Length']
+        else:
+            compressed = encoding.compress(response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is not byte-for-byte the one the ETag was made for
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = name
+        return response
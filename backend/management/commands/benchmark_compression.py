@@ -0,0 +1,52 @@
+# backend/management/commands/benchmark_compression.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from backend.compression import ENCODINGS
+from products.models import Product
+
+DEFAULT_PATHS = ['/api/products/', '/api/products/reels/']
+
+
+class Command(BaseCommand):
+    help = ("Compress the responses of a few endpoints with each available encoding at its "
+            "lowest and highest level, and report the bytes saved and CPU time per response")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', help="Path to request (repeatable)")
+        parser.add_argument('--repeat', type=int, default=20, help="Compressions timed per measurement")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.default_paths()
+        client = Client()
+        self.stdout.write(f"{'path':<32}{'bytes':>10}{'encoding':>10}{'level':>7}"
+                          f"{'compressed':>12}{'saved':>8}{'cpu ms':>9}")
+        for path in paths:
+            # No Accept-Encoding header: the middleware leaves the body as is
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f"{path} returned {response.status_code}")
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            for name, encoding in ENCODINGS.items():
+                for level in sorted({encoding.min_level, encoding.max_level}):
+                    size, cpu_ms = self.measure(encoding, level, body, options['repeat'])
+                    self.stdout.write(
+                        f"{path:<32}{len(body):>10}{name:>10}{level:>7}{size:>12}"
+                        f"{1 - size / max(len(body), 1):>8.0%}{cpu_ms:>9.2f}"
+                    )
+        if 'br' not in ENCODINGS:
+            self.stdout.write("Brotli is not installed: gzip only")
+
+    def default_paths(self):
+        # The product with the most ratings has the largest detail page
+        product = Product.objects.with_rating_stats().order_by('-rating_count').first()
+        return DEFAULT_PATHS + ([f'/api/products/{product.pk}/'] if product else [])
+
+    def measure(self, encoding, level, body, repeat):
+        started = time.process_time()
+        for _ in range(repeat):
+            compressed = encoding.compress(body, level)
+        return len(compressed), (time.process_time() - started) * 1000 / repeat
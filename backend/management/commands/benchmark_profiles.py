@@ -0,0 +1,84 @@
+# backend/management/commands/benchmark_profiles.py
+
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+DEFAULT_PATHS = ['/api/products/', '/api/products/reels/', '/api/products/price-histogram/']
+PROFILES = ('development', 'production')
+
+
+class Command(BaseCommand):
+    help = ("Smoke benchmark: request the same endpoints in-process under the development "
+            "and production settings profiles (DJANGO_ENV) and compare latency")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', help="Path to request (repeatable)")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per path")
+        parser.add_argument('--run-profile', choices=PROFILES, help="Internal: benchmark the current process")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        if options['run_profile']:
+            self.stdout.write(json.dumps(self.run(paths, options['requests'])))
+            return
+
+        # Settings are read once per process, so each profile gets its own
+        rows = [self.run_profile(profile, paths, options['requests']) for profile in PROFILES]
+        self.stdout.write(f"{'profile':<13}{'DEBUG':>7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['profile']:<13}{str(row['debug']):>7}{row['rps']:>10.1f}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+            )
+        errors = {row['profile']: row['errors'] for row in rows if row['errors']}
+        if errors:
+            raise CommandError(f"Non-200 responses: {errors}")
+
+    def run_profile(self, profile, paths, requests):
+        env = dict(os.environ, DJANGO_ENV=profile, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        env.setdefault('DJANGO_SECRET_KEY', 'benchmark-only')
+        env.pop('DJANGO_DEBUG', None)
+        args = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_profiles',
+                '--run-profile', profile, '--requests', str(requests)]
+        for path in paths:
+            args += ['--path', path]
+        result = subprocess.run(args, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f"{profile} profile failed:\n{result.stderr}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def run(self, paths, requests):
+        client = Client()
+        # Warm up: URL resolver, serializers, first DB connection
+        for path in paths:
+            client.get(path)
+
+        timings, errors = [], {}
+        started = time.perf_counter()
+        for path in paths:
+            for _ in range(requests):
+                request_started = time.perf_counter()
+                response = client.get(path)
+                timings.append(time.perf_counter() - request_started)
+                if response.status_code != 200:
+                    errors[path] = response.status_code
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        return {
+            'profile': os.environ.get('DJANGO_ENV', 'development'),
+            'debug': settings.DEBUG,
+            'rps': len(timings) / elapsed,
+            'p50_ms': statistics.median(timings) * 1000,
+            'p95_ms': timings[math.ceil(len(timings) * 0.95) - 1] * 1000,
+            'errors': errors,
+        }
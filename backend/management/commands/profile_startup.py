@@ -0,0 +1,70 @@
+# backend/management/commands/profile_startup.py
+
+from collections import defaultdict
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.startup import import_profile
+
+
+class Command(BaseCommand):
+    help = "Profile cold startup with `python -X importtime`: cost of each app module and package"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='backend.wsgi', help="Module to import (default: backend.wsgi)")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs; the fastest time per module is kept")
+        parser.add_argument('--limit', type=int, default=15, help="Rows per table")
+        parser.add_argument('--budget-ms', type=float, help="Fail if the total import takes longer")
+
+    def handle(self, *args, **options):
+        # Fastest of several runs, per module, to filter out disk and CPU noise
+        profile = {}
+        for _ in range(max(options['repeat'], 1)):
+            for name, (own, cumulative) in import_profile(options['module']).items():
+                best_own, best_cumulative = profile.get(name, (own, cumulative))
+                profile[name] = (
+                    None if own is None else min(own, best_own),
+                    min(cumulative, best_cumulative),
+                )
+        if options['module'] not in profile:
+            raise CommandError(f"{options['module']} was not imported (already loaded by the interpreter?)")
+
+        project = tuple(
+            config.name for config in apps.get_app_configs()
+            if Path(config.path).is_relative_to(settings.BASE_DIR)
+        )
+        app_modules = [(name, times) for name, times in profile.items() if name.split('.')[0] in project]
+        packages = defaultdict(int)
+        for name, (own, _) in profile.items():
+            packages[name.split('.')[0]] += own or 0
+
+        total_ms = profile[options['module']][1] / 1000
+        self.stdout.write(f"import {options['module']}: {total_ms:.1f} ms "
+                          f"({len(profile)} modules, best of {options['repeat']})\n")
+
+        self.stdout.write("App modules (cumulative includes everything first imported by them):")
+        self.write_rows(
+            [(name, cum / 1000, None if own is None else own / 1000) for name, (own, cum) in app_modules],
+            ('module', 'cumulative ms', 'self ms'), options['limit'],
+        )
+        self.stdout.write("  (no self time: loaded by Django through importlib.import_module)")
+        self.stdout.write("\nPackages by own import time:")
+        self.write_rows(
+            [(name, own / 1000) for name, own in packages.items()],
+            ('package', 'self ms'), options['limit'],
+        )
+
+        if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+            raise CommandError(f"Startup import took {total_ms:.1f} ms, budget is {options['budget_ms']} ms")
+
+    def write_rows(self, rows, headers, limit):
+        rows = sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+        width = max([len(headers[0])] + [len(row[0]) for row in rows])
+        self.stdout.write('  ' + headers[0].ljust(width) + ''.join(f"{h:>15}" for h in headers[1:]))
+        for name, *values in rows:
+            self.stdout.write('  ' + name.ljust(width) + ''.join(
+                f"{'-':>15}" if value is None else f"{value:>15.1f}" for value in values
+            ))
@@ -0,0 +1,57 @@
+# backend/pagination.py
+"""
+Paginator for admin changelists over very large tables.
+
+Django's admin counts every changelist with COUNT(*), which on PostgreSQL
+reads the whole table (or the whole filtered set). EstimatedCountPaginator
+counts exactly only up to ADMIN_EXACT_COUNT_LIMIT rows:
+
+- unfiltered: the planner's row estimate for the table (pg_class.reltuples)
+- filtered: a COUNT over at most limit + 1 rows, then the planner's
+  estimate for the filtered query if the limit is reached
+
+Other databases get the bounded count only. Page links past the estimate
+may come out empty or short; the admin copes with that.
+Use it together with `show_full_result_count = False`.
+"""
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def table_row_estimate(queryset):
+    """pg_class.reltuples for the queryset's table, or None if unknown."""
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                       [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 until the table has been analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+def query_row_estimate(queryset):
+    """The planner's row estimate for a queryset (PostgreSQL only)."""
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        postgres = connections[queryset.db].vendor == 'postgresql'
+
+        if postgres and not queryset.query.where:
+            estimate = table_row_estimate(queryset)
+            if estimate is not None and estimate > limit:
+                return estimate
+
+        count = queryset.order_by()[:limit + 1].count()
+        if count > limit and postgres:
+            return max(count, query_row_estimate(queryset))
+        return count
@@ -2,13 +2,26 @@ import os
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables from .env
 load_dotenv()
 
+
+def env_bool(name, default=False):
+    """Read a boolean flag such as DB_POOL=true from the environment."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name, default=None):
+    """Read an integer from the environment; unset or empty gives the default."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
 # ----------------------------------------------------
 # BASE DIRECTORY
 # ----------------------------------------------------
@@ -17,9 +30,23 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # ----------------------------------------------------
 # SECURITY SETTINGS
 # ----------------------------------------------------
+# DJANGO_ENV=production selects the production profile: DEBUG off, cached
+# templates, JSON-only API rendering, hashed static files and secure cookies.
+# gunicorn.conf.py sets it by default.
+DJANGO_ENV = os.getenv("DJANGO_ENV", "development")
+PRODUCTION = DJANGO_ENV == "production"
+
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "replace-me")
-DEBUG = True
-ALLOWED_HOSTS = ["*"]
+if PRODUCTION and SECRET_KEY == "replace-me":
+    raise ImproperlyConfigured("Set DJANGO_SECRET_KEY when DJANGO_ENV=production")
+DEBUG = env_bool("DJANGO_DEBUG", not PRODUCTION)
+ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "*").split(",")
+
+if PRODUCTION:
+    # TLS terminates at the proxy in front of gunicorn
+    SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
 
 # ----------------------------------------------------
 # URL CONFIGURATION
@@ -44,9 +71,11 @@ INSTALLED_APPS = [
     "rest_framework",
     "rest_framework_simplejwt",
     "corsheaders",
-    "cloudinary",
+    # "cloudinary" is not installed as an app: it only adds template tags and
+    # widget static files this API doesn't use.
 
     # Local apps
+    "backend",  # Project-wide management commands
     "accounts",
     "products",
 ]
@@ -63,6 +92,8 @@ MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # must be at top
     "django.middleware.security.SecurityMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # After WhiteNoise, which serves its own precompressed static files
+    "backend.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -71,6 +102,14 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Response compression (backend/compression.py): brotli or gzip for bodies of
+# at least COMPRESSION_MIN_SIZE bytes, at the highest level while the load
+# average per CPU stays under COMPRESSION_LOW_LOAD_PERCENT, falling to the
+# lowest at COMPRESSION_HIGH_LOAD_PERCENT
+COMPRESSION_MIN_SIZE = env_int("COMPRESSION_MIN_SIZE", 1024)
+COMPRESSION_LOW_LOAD_PERCENT = env_int("COMPRESSION_LOW_LOAD_PERCENT", 50)
+COMPRESSION_HIGH_LOAD_PERCENT = env_int("COMPRESSION_HIGH_LOAD_PERCENT", 100)
+
 # ----------------------------------------------------
 # CORS SETTINGS
 # ----------------------------------------------------
@@ -86,10 +125,49 @@ CORS_ALLOW_ALL_ORIGINS = True
 # ----------------------------------------------------
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
     ),
+    # Token buckets (backend/throttling.py): "<capacity>/<period>", keyed by
+    # each view's throttle_scope.
+    "DEFAULT_THROTTLE_RATES": {
+        "login": os.getenv("THROTTLE_LOGIN", "10/min"),
+        "login_account": os.getenv("THROTTLE_LOGIN_ACCOUNT", "20/h"),
+        "verify_code": os.getenv("THROTTLE_VERIFY_CODE", "5/15m"),
+        "password_reset": os.getenv("THROTTLE_PASSWORD_RESET", "3/15m"),
+        "reel_like": os.getenv("THROTTLE_REEL_LIKE", "60/min"),
+        "reel_share": os.getenv("THROTTLE_REEL_SHARE", "30/min"),
+    },
+    # Proxies in front of the app that append to X-Forwarded-For; client IPs
+    # are read that many hops from the right. Production sits behind one
+    # TLS-terminating proxy (see SECURE_PROXY_SSL_HEADER).
+    "NUM_PROXIES": env_int("NUM_PROXIES", 1 if PRODUCTION else 0),
 }
 
+if not DEBUG:
+    # The browsable API renders an HTML page (with forms) per response
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = ("rest_framework.renderers.JSONRenderer",)
+
+# ----------------------------------------------------
+# CACHE
+# ----------------------------------------------------
+# Throttle buckets and verification codes live in the cache, so every process
+# must share it: set REDIS_URL in production. Without it each process gets
+# its own local memory cache (fine for development and tests).
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # ----------------------------------------------------
 # SIMPLE JWT SETTINGS
 # ----------------------------------------------------
@@ -98,6 +176,38 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
 }
 
+# Per-process cache of authenticated users (accounts/authentication.py).
+# Saves in another process become visible after at most this many seconds;
+# 0 disables the cache.
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 30))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 10000))
+
+# ----------------------------------------------------
+# PASSWORD HASHING
+# ----------------------------------------------------
+# PASSWORD_HASHER picks the hasher for new passwords (pbkdf2, scrypt or
+# argon2). The others stay listed so old hashes still verify; they are
+# rehashed with the preferred hasher and parameters on the user's next login.
+# Size the parameters with `manage.py benchmark_password_hashers`.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+_PASSWORD_HASHER_CLASSES = {
+    "pbkdf2": "accounts.hashers.TunedPBKDF2PasswordHasher",
+    "scrypt": "accounts.hashers.TunedScryptPasswordHasher",
+    "argon2": "accounts.hashers.TunedArgon2PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + ["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"]
+
+# None keeps Django's default for that parameter
+PASSWORD_PBKDF2_ITERATIONS = env_int("PASSWORD_PBKDF2_ITERATIONS")
+PASSWORD_SCRYPT_WORK_FACTOR = env_int("PASSWORD_SCRYPT_WORK_FACTOR", 2**14)
+PASSWORD_SCRYPT_BLOCK_SIZE = env_int("PASSWORD_SCRYPT_BLOCK_SIZE", 8)
+PASSWORD_SCRYPT_PARALLELISM = env_int("PASSWORD_SCRYPT_PARALLELISM", 1)
+PASSWORD_ARGON2_TIME_COST = env_int("PASSWORD_ARGON2_TIME_COST", 2)
+PASSWORD_ARGON2_MEMORY_COST = env_int("PASSWORD_ARGON2_MEMORY_COST", 19456)  # KiB
+PASSWORD_ARGON2_PARALLELISM = env_int("PASSWORD_ARGON2_PARALLELISM", 1)
+
 # ----------------------------------------------------
 # EMAIL SETTINGS
 # ----------------------------------------------------
@@ -108,16 +218,88 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# Seconds before a stalled SMTP connection or command fails
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 20))
+
+# Outbox: requests only enqueue, `manage.py send_queued_emails --loop` delivers
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 6))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", 30))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", 3600))
+# How long a claimed batch stays reserved for its worker; must outlast a
+# batch where every send times out
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv(
+    "EMAIL_OUTBOX_LEASE_SECONDS", 2 * EMAIL_OUTBOX_BATCH_SIZE * EMAIL_TIMEOUT
+))
 
 # ----------------------------------------------------
 # CLOUDINARY CONFIGURATION
 # ----------------------------------------------------
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True,
+# Read by the cloudinary package when it is first imported (by
+# cloudinary.models, for User.profile_picture). Settings import none of the
+# client itself; uploads go through backend/storage.py and the admin API
+# (cloudinary.api) is never loaded by the web processes.
+CLOUDINARY = {
+    "cloud_name": os.getenv("CLOUDINARY_CLOUD_NAME"),
+    "api_key": os.getenv("CLOUDINARY_API_KEY"),
+    "api_secret": os.getenv("CLOUDINARY_API_SECRET"),
+    "secure": True,
+}
+
+# Profile picture sizes, precomputed on upload (accounts/images.py). Use
+# "accounts.images.PillowVariantBackend" to resize locally instead.
+PROFILE_PICTURE_VARIANT_BACKEND = os.getenv(
+    "PROFILE_PICTURE_VARIANT_BACKEND", "accounts.images.CloudinaryVariantBackend"
 )
+PROFILE_PICTURE_VARIANT_SIZES = {"thumb": 64, "medium": 256}
+
+# Product images are resized and re-encoded locally before upload
+# (products/imaging.py). IMAGE_PREPROCESS_WORKERS=0 processes in-request.
+IMAGE_PREPROCESS_WORKERS = env_int("IMAGE_PREPROCESS_WORKERS", 2)
+IMAGE_PREPROCESS_FORMAT = os.getenv("IMAGE_PREPROCESS_FORMAT", "WEBP")  # or JPEG
+IMAGE_PREPROCESS_QUALITY = env_int("IMAGE_PREPROCESS_QUALITY", 82)
+
+# Admin changelists count exactly up to this many rows and estimate beyond
+# it (backend/pagination.py)
+ADMIN_EXACT_COUNT_LIMIT = env_int("ADMIN_EXACT_COUNT_LIMIT", 10000)
+
+# ----------------------------------------------------
+# PRODUCT LISTINGS
+# ----------------------------------------------------
+# Price histograms per region and condition (products/pricing.py), rebuilt
+# periodically by `manage.py refresh_price_histograms`
+PRICE_HISTOGRAM_BUCKETS = env_int("PRICE_HISTOGRAM_BUCKETS", 20)
+# Price filters estimated to match at most this many active products are
+# answered through the price index first
+PRICE_INDEX_MAX_ROWS = env_int("PRICE_INDEX_MAX_ROWS", 1000)
+# ?sort=price pages (keyset pagination)
+PRICE_SORT_PAGE_SIZE = env_int("PRICE_SORT_PAGE_SIZE", 24)
+PRICE_SORT_MAX_PAGE_SIZE = 100
+# Deactivated products and reels untouched for this long are moved to
+# ArchivedRecord by `manage.py archive_inactive`
+ARCHIVE_INACTIVE_AFTER_DAYS = env_int("ARCHIVE_INACTIVE_AFTER_DAYS", 180)
+# A viewer who replays a reel within this window counts as one view
+# (plays still count every time); see products/reel_views.py
+REEL_VIEW_DEDUP_SECONDS = env_int("REEL_VIEW_DEDUP_SECONDS", 30 * 60)
+# Trending lists (products/trending.py, `manage.py refresh_trending`): the
+# top TRENDING_SIZE items by hourly engagement over the last
+# TRENDING_WINDOW_HOURS, older hours weighing half every TRENDING_HALF_LIFE_HOURS
+TRENDING_WINDOW_HOURS = env_int("TRENDING_WINDOW_HOURS", 48)
+TRENDING_HALF_LIFE_HOURS = env_int("TRENDING_HALF_LIFE_HOURS", 12)
+TRENDING_SIZE = env_int("TRENDING_SIZE", 50)
+# "Similar items" per product (products/related.py), rebuilt by
+# `manage.py refresh_related_products --full` and extended with new products
+# by runs without --full
+RELATED_PRODUCTS_SIZE = env_int("RELATED_PRODUCTS_SIZE", 12)
+# Reel engagement events (products/events.py) are buffered per process and
+# written in batches of ENGAGEMENT_EVENT_BATCH_SIZE, or once the oldest is
+# ENGAGEMENT_EVENT_FLUSH_SECONDS old. `manage.py rollup_engagement` folds
+# them into the Reel counters, skipping the events inserted in the last
+# ENGAGEMENT_ROLLUP_DELAY_SECONDS so that batches still being written are not
+# overtaken; the delay must exceed the time a flush takes to commit.
+ENGAGEMENT_EVENT_BATCH_SIZE = env_int("ENGAGEMENT_EVENT_BATCH_SIZE", 200)
+ENGAGEMENT_EVENT_FLUSH_SECONDS = env_int("ENGAGEMENT_EVENT_FLUSH_SECONDS", 5)
+ENGAGEMENT_ROLLUP_DELAY_SECONDS = env_int("ENGAGEMENT_ROLLUP_DELAY_SECONDS", 10)
 
 # ----------------------------------------------------
 # STATIC FILES
@@ -135,8 +317,13 @@ MEDIA_ROOT = BASE_DIR / "media"
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# Recommended for better caching/compression
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Compressed, content-hashed static files in production (needs collectstatic;
+# the manifest would be missing in development and tests)
+if PRODUCTION:
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+    }
 
 # ----------------------------------------------------
 # TEMPLATES
@@ -157,19 +344,61 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Compile each template once per process
+    TEMPLATES[0]["APP_DIRS"] = False
+    TEMPLATES[0]["OPTIONS"]["loaders"] = [
+        ("django.template.loaders.cached.Loader", [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ]),
+    ]
+
 # ----------------------------------------------------
-# DATABASE (SQLite default)
+# DATABASE (SQLite default, PostgreSQL via DATABASE_URL)
 # ----------------------------------------------------
 import dj_database_url
 
+# Connection pooling uses Django's native psycopg 3 pool and only applies to
+# PostgreSQL. Pool sizes are *per worker process*: the server sees at most
+# (number of workers) x DB_POOL_MAX_SIZE connections, which must stay below
+# Postgres' max_connections. backend/wsgi.py and backend/asgi.py set the
+# defaults for their entry point before settings are loaded.
+#
+#   DB_POOL=true             enable the pool (persistent connections otherwise)
+#   DB_POOL_MIN_SIZE=1       connections kept open per worker
+#   DB_POOL_MAX_SIZE=4       hard cap per worker (WSGI 4, ASGI 10)
+#   DB_POOL_TIMEOUT=10       seconds to wait for a free connection
+#   DB_POOL_MAX_IDLE=300     seconds before an idle connection is closed
+#   DB_POOL_MAX_LIFETIME=1800  seconds before a connection is recycled
+#   DB_CONN_MAX_AGE=600      persistent connection lifetime when DB_POOL is off
+DB_POOL = env_bool("DB_POOL")
+
 DATABASES = {
     "default": dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
-        conn_max_age=600,
+        # Pooling and persistent connections are mutually exclusive.
+        conn_max_age=0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", 600)),
+        conn_health_checks=True,
         ssl_require=not DEBUG,
     )
 }
 
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # sslmode is a PostgreSQL option; sqlite3.connect() rejects it
+    DATABASES["default"].get("OPTIONS", {}).pop("sslmode", None)
+    # Covering indexes (INCLUDE) are PostgreSQL-only; SQLite builds them
+    # without the extra columns
+    SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+if DB_POOL and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 4)),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+        "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", 1800)),
+    }
 
 
 # Custom user model
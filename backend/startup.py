@@ -0,0 +1,71 @@
+# backend/startup.py
+"""
+Cold-start measurements: import a module in a fresh interpreter, the way a
+worker, test run or management command starts.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+_TIMED_IMPORT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def _run(args):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    return subprocess.run([sys.executable, *args], cwd=settings.BASE_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def timed_import(module):
+    """{'seconds': wall time of `import module`, 'modules': all modules loaded}."""
+    return json.loads(_run(['-c', _TIMED_IMPORT.format(module=module)]).stdout)
+
+
+# -X importtime only sees import statements; Django loads models, admin and
+# apps modules through importlib.import_module, so time those calls as well.
+_PROFILED_IMPORT = """
+import importlib, json, sys, time
+_import_module = importlib.import_module
+dynamic = {{}}
+
+def import_module(name, package=None):
+    new = name not in sys.modules
+    started = time.perf_counter()
+    module = _import_module(name, package)
+    if new:
+        dynamic[module.__name__] = int((time.perf_counter() - started) * 1e6)
+    return module
+
+importlib.import_module = import_module
+import {module}
+print(json.dumps(dynamic))
+"""
+
+
+def import_profile(module):
+    """
+    Import `module` under `python -X importtime`, parsed into
+    {module name: (self microseconds or None, cumulative microseconds)}.
+    Modules loaded with importlib.import_module only have a cumulative time.
+    """
+    result = _run(['-X', 'importtime', '-c', _PROFILED_IMPORT.format(module=module)])
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            profile[name] = (int(self_us), int(cumulative_us))
+    for name, cumulative_us in json.loads(result.stdout.splitlines()[-1]).items():
+        profile.setdefault(name, (None, cumulative_us))
+    return profile
@@ -0,0 +1,17 @@
+# backend/storage.py
+"""
+Entry point to the Cloudinary uploader.
+
+cloudinary.uploader is imported when an upload is made rather than when a
+module that uploads is imported. The User model's CloudinaryField loads it
+with the models anyway; keeping it out of module imports means nothing else
+adds Cloudinary modules to startup. Configuration comes from
+settings.CLOUDINARY.
+"""
+
+
+def upload(file, **options):
+    """cloudinary.uploader.upload, importing the client on first use."""
+    from cloudinary import uploader
+
+    return uploader.upload(file, **options)
@@ -0,0 +1,197 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .compression import ENCODINGS, CompressionMiddleware, compression_level, negotiate
+from .startup import timed_import
+
+# Generous enough for slow CI machines; a cold import takes ~0.5s locally
+WSGI_IMPORT_BUDGET_SECONDS = float(os.getenv('STARTUP_IMPORT_BUDGET_SECONDS', '2.0'))
+
+
+def load_settings(names, **env):
+    """The settings `names` as backend/settings.py computes them in a fresh
+    process, with `env` on top of a cleaned environment."""
+    environ = {key: value for key, value in os.environ.items()
+               if not key.startswith(('DJANGO_', 'DB_', 'DATABASE_URL'))}
+    environ.update(env, DJANGO_SETTINGS_MODULE='backend.settings')
+    script = ('import json, sys; from django.conf import settings; '
+              'print(json.dumps({name: getattr(settings, name) for name in sys.argv[1:]}, default=str))')
+    result = subprocess.run([sys.executable, '-c', script, *names], cwd=settings.BASE_DIR,
+                            env=environ, capture_output=True, text=True)
+    if result.returncode:
+        raise AssertionError(result.stderr)
+    return json.loads(result.stdout)
+
+
+class DatabasePoolTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_pool_stats_are_staff_only(self):
+        user = get_user_model().objects.create_user('buyer@example.com', 'pw', shop_name='Buyer')
+        self.client.force_authenticate(user)
+
+        self.assertEqual(self.client.get('/api/ops/db-pool/').status_code, 403)
+
+    def test_pool_stats_report_each_database(self):
+        staff = get_user_model().objects.create_user('staff@example.com', 'pw', shop_name='Staff', is_staff=True)
+        self.client.force_authenticate(staff)
+
+        response = self.client.get('/api/ops/db-pool/')
+
+        self.assertEqual(response.status_code, 200)
+        default = response.json()['default']
+        self.assertEqual(default['vendor'], 'sqlite')
+        self.assertFalse(default['pooled'])
+        self.assertTrue(default['conn_health_checks'])
+        self.assertNotIn('stats', default)
+
+    def test_pool_settings_apply_to_postgres_only(self):
+        postgres = 'postgres://shop:pw@db.internal:5432/shop'
+        pooled = load_settings(['DATABASES'], DATABASE_URL=postgres, DB_POOL='true', DB_POOL_MAX_SIZE='7')
+        persistent = load_settings(['DATABASES'], DATABASE_URL=postgres)
+        sqlite = load_settings(['DATABASES'], DB_POOL='true')
+
+        database = pooled['DATABASES']['default']
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertEqual(database['OPTIONS']['pool']['max_size'], 7)
+        self.assertEqual(database['OPTIONS']['pool']['min_size'], 1)
+        self.assertEqual(persistent['DATABASES']['default']['CONN_MAX_AGE'], 600)
+        self.assertNotIn('pool', persistent['DATABASES']['default'].get('OPTIONS', {}))
+        self.assertNotIn('pool', sqlite['DATABASES']['default'].get('OPTIONS', {}))
+
+
+class SettingsProfileTests(SimpleTestCase):
+    names = ['DEBUG', 'REST_FRAMEWORK', 'TEMPLATES', 'SESSION_COOKIE_SECURE', 'STORAGES', 'DATABASES']
+
+    def test_production_profile_loads_with_debug_off(self):
+        production = load_settings(self.names, DJANGO_ENV='production', DJANGO_SECRET_KEY='test-only')
+
+        self.assertIs(production['DEBUG'], False)
+        self.assertEqual(production['REST_FRAMEWORK']['DEFAULT_RENDERER_CLASSES'],
+                         ['rest_framework.renderers.JSONRenderer'])
+        self.assertEqual(production['TEMPLATES'][0]['OPTIONS']['loaders'][0][0],
+                         'django.template.loaders.cached.Loader')
+        self.assertIs(production['SESSION_COOKIE_SECURE'], True)
+        self.assertIn('CompressedManifestStaticFilesStorage', production['STORAGES']['staticfiles']['BACKEND'])
+        # SQLite rejects the sslmode option that DEBUG off would add
+        self.assertNotIn('sslmode', production['DATABASES']['default'].get('OPTIONS', {}))
+
+    def test_development_profile_keeps_debug_on(self):
+        development = load_settings(self.names, DJANGO_ENV='development')
+
+        self.assertIs(development['DEBUG'], True)
+        self.assertNotIn('loaders', development['TEMPLATES'][0]['OPTIONS'])
+
+    def test_production_profile_requires_a_secret_key(self):
+        with self.assertRaisesMessage(AssertionError, 'Set DJANGO_SECRET_KEY'):
+            load_settings(['DEBUG'], DJANGO_ENV='production', DJANGO_SECRET_KEY='replace-me')
+
+
+class BenchmarkProfilesTests(TestCase):
+    def test_run_profile_smoke(self):
+        out = StringIO()
+        call_command('benchmark_profiles', '--run-profile', 'development', '--requests', '2',
+                     '--path', '/api/products/', stdout=out)
+
+        row = json.loads(out.getvalue())
+        self.assertEqual(row['errors'], {})
+        self.assertEqual(row['debug'], settings.DEBUG)
+        self.assertGreater(row['rps'], 0)
+        self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+
+    def compare(self, rows):
+        outputs = [
+            subprocess.CompletedProcess([], 0, stdout='Applying migrations\n' + json.dumps(row) + '\n', stderr='')
+            for row in rows
+        ]
+        out = StringIO()
+        with patch('backend.management.commands.benchmark_profiles.subprocess.run',
+                   side_effect=outputs) as run:
+            try:
+                call_command('benchmark_profiles', '--requests', '1', '--path', '/api/products/', stdout=out)
+            finally:
+                self.environments = [call.kwargs['env'] for call in run.call_args_list]
+        return out.getvalue()
+
+    def row(self, profile, errors=None):
+        return {'profile': profile, 'debug': profile == 'development', 'rps': 100.0,
+                'p50_ms': 1.0, 'p95_ms': 2.0, 'errors': errors or {}}
+
+    def test_each_profile_runs_in_its_own_process(self):
+        output = self.compare([self.row('development'), self.row('production')])
+
+        self.assertEqual([env['DJANGO_ENV'] for env in self.environments], ['development', 'production'])
+        self.assertTrue(all(env['DJANGO_SECRET_KEY'] for env in self.environments))
+        self.assertIn('production', output.splitlines()[-1])
+
+    def test_non_200_responses_fail_the_command(self):
+        with self.assertRaisesMessage(CommandError, "{'production': {'/api/products/': 500}}"):
+            self.compare([self.row('development'), self.row('production', {'/api/products/': 500})])
+
+
+class StartupImportTests(SimpleTestCase):
+    def test_wsgi_import_within_budget(self):
+        # Best of three to ride out a cold disk cache
+        seconds = min(timed_import('backend.wsgi')['seconds'] for _ in range(3))
+        self.assertLess(seconds, WSGI_IMPORT_BUDGET_SECONDS)
+
+    def test_wsgi_import_leaves_cloudinary_admin_api_unloaded(self):
+        modules = timed_import('backend.wsgi')['modules']
+        self.assertIn('cloudinary.models', modules)
+        self.assertNotIn('cloudinary.api', modules)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionTests(SimpleTestCase):
+    body = b'{"name": "Samsung Galaxy phone", "region": "Arusha"}' * 20
+
+    def respond(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate('gzip;q=0.5, br'), 'br' if 'br' in ENCODINGS else 'gzip')
+        self.assertEqual(negotiate('*;q=0.1, br;q=0'), 'gzip')
+        self.assertIsNone(negotiate('identity'))
+        self.assertIsNone(negotiate(''))
+
+    def test_json_is_compressed(self):
+        response = self.respond(HttpResponse(self.body, content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_small_or_binary_bodies_are_left_alone(self):
+        for response in (HttpResponse(b'{}', content_type='application/json'),
+                         HttpResponse(self.body, content_type='image/png')):
+            self.assertFalse(self.respond(response).has_header('Content-Encoding'))
+
+    def test_streaming_is_compressed_per_chunk(self):
+        response = self.respond(StreamingHttpResponse(iter([self.body, self.body]), content_type='text/csv'))
+        chunks = list(response.streaming_content)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), self.body * 2)
+
+    @override_settings(COMPRESSION_LOW_LOAD_PERCENT=50, COMPRESSION_HIGH_LOAD_PERCENT=100)
+    def test_level_falls_with_load(self):
+        encoding = ENCODINGS['gzip']
+        self.assertEqual(compression_level(encoding, load=10), encoding.max_level)
+        self.assertEqual(compression_level(encoding, load=60), 5)
+        self.assertEqual(compression_level(encoding, load=300), encoding.min_level)
@@ -0,0 +1,205 @@
+# backend/throttling.py
+"""
+Token-bucket throttles backed by the shared cache.
+
+Each (scope, identity) pair owns a bucket of `capacity` tokens that refills
+continuously at capacity / period tokens per second; a request takes one token.
+Rates come from REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] keyed by the view's
+`throttle_scope`, written as "<capacity>/<period>" where the period is a
+unit (s, m, h, d, or sec/min/hour/day) with an optional multiplier: "5/15m".
+
+On Redis, checking a request's buckets costs exactly one cache round trip,
+however many buckets it has: the whole read-refill-take-write cycle runs as
+a single Lua script, called by its SHA1 (EVALSHA). A request is let through
+only when every bucket has a token, and then takes one from each. Other
+backends fall back to a get_many and a set_many under a process lock. That
+is atomic for the local memory cache only; on a shared non-Redis cache,
+concurrent requests from several processes can both take the last token.
+Use Redis (REDIS_URL) when running more than one process.
+
+Client IPs come from DRF's get_ident(), which trusts the right-most
+REST_FRAMEWORK["NUM_PROXIES"] hops of X-Forwarded-For. The setting must
+match the proxies in front of the app. Left unset, a client could send a
+fresh X-Forwarded-For per request and get a fresh bucket each time.
+"""
+import hashlib
+import re
+import threading
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+RATE_RE = re.compile(r'^(\d+)/(\d*)([a-z]+)$')
+
+# KEYS: one per bucket. ARGV: now, then capacity and period for each bucket.
+TOKEN_BUCKET_LUA = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local allowed = 1
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = capacity / tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local current = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if current == nil or ts == nil then
+        current = capacity
+        ts = now
+    end
+    current = math.min(capacity, current + math.max(0, now - ts) * rate)
+    if current < 1 then
+        allowed = 0
+        wait = math.max(wait, (1 - current) / rate)
+    end
+    tokens[i] = current
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - allowed), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(tonumber(ARGV[2 * i + 1])))
+end
+return {allowed, tostring(wait)}
+"""
+# Scripts are cached by the Redis server under their SHA1, not per client
+TOKEN_BUCKET_SHA = hashlib.sha1(TOKEN_BUCKET_LUA.encode()).hexdigest()
+
+_local_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60.0); '5/15m' -> (5, 900.0)"""
+    match = RATE_RE.match(rate.strip().lower())
+    if not match or match.group(3) not in PERIODS:
+        raise ImproperlyConfigured(f"Invalid throttle rate {rate!r}")
+    capacity, multiplier, unit = match.groups()
+    return int(capacity), float(int(multiplier or 1) * PERIODS[unit])
+
+
+def take_tokens(cache, buckets, now):
+    """
+    Take one token from each of `buckets`, a list of (key, capacity, period),
+    or from none of them if any is empty. Returns (allowed, seconds_to_wait).
+    """
+    if isinstance(cache, RedisCache):
+        from redis.exceptions import NoScriptError
+
+        keys = [cache.make_and_validate_key(key) for key, _, _ in buckets]
+        args = [now] + [value for _, capacity, period in buckets for value in (capacity, period)]
+        # Writes always go to the first server, so every key lives there
+        client = cache._cache.get_client(keys[0], write=True)
+        try:
+            allowed, wait = client.evalsha(TOKEN_BUCKET_SHA, len(keys), *keys, *args)
+        except NoScriptError:
+            # First call since the server started; EVAL also caches the script
+            allowed, wait = client.eval(TOKEN_BUCKET_LUA, len(keys), *keys, *args)
+        return bool(allowed), float(wait)
+
+    # Racy across processes on shared caches, see the module docstring
+    with _local_lock:
+        stored = cache.get_many([key for key, _, _ in buckets])
+        tokens, wait = {}, 0.0
+        for key, capacity, period in buckets:
+            current, ts = stored.get(key, (capacity, now))
+            tokens[key] = min(capacity, current + max(0.0, now - ts) * capacity / period)
+            if tokens[key] < 1:
+                wait = max(wait, (1 - tokens[key]) * period / capacity)
+        allowed = wait == 0.0
+        cache.set_many({key: (value - 1 if allowed else value, now) for key, value in tokens.items()},
+                       int(max(period for _, _, period in buckets)) + 1)
+    return allowed, wait
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class: subclasses return the bucket identity from get_ident_key().
+    The scope is the view's `throttle_scope`; views without one are not throttled.
+    Subclasses with several buckets override get_buckets() instead.
+    """
+    cache = default_cache
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+    timer = time.time
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def get_buckets(self, request, view):
+        """[(scope, ident), ...]; an ident of None skips that bucket"""
+        return [(getattr(view, 'throttle_scope', None), self.get_ident_key(request, view))]
+
+    def allow_request(self, request, view):
+        buckets = []
+        for scope, ident in self.get_buckets(request, view):
+            rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+            if rate is not None and ident is not None:
+                key = self.cache_format % {'scope': scope, 'ident': ident}
+                buckets.append((key, *parse_rate(rate)))
+        if not buckets:
+            return True
+
+        allowed, self.wait_seconds = take_tokens(self.cache, buckets, self.timer())
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def email_key(email):
+    # Cache keys must stay short and free of control characters
+    return 'email' + str(email).strip().lower().encode().hex()[:128]
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per client IP"""
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per authenticated user, per IP for anonymous clients"""
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user{request.user.pk}'
+        return self.get_ident(request)
+
+
+class CodeAttemptThrottle(TokenBucketThrottle):
+    """
+    One bucket per target email address, for endpoints that check the 6-digit
+    codes from generate_code(). Keying on the email rather than the IP stops
+    a distributed guesser from sharing the code space across many addresses.
+    """
+
+    def get_ident_key(self, request, view):
+        if request.method != 'POST':
+            return None
+        email = request.data.get('email')
+        if not email:
+            return self.get_ident(request)
+        return email_key(email)
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """
+    Login attempts: one bucket per client IP (the view's throttle_scope) and
+    one per (account, IP) pair ('login_account'), both checked in a single
+    cache call. The account bucket is not keyed on the email alone, or anyone
+    could lock an account out by posting its address.
+    """
+
+    def get_buckets(self, request, view):
+        ip = self.get_ident(request)
+        buckets = [(getattr(view, 'throttle_scope', None), ip)]
+        email = request.data.get('email') if request.method == 'POST' else None
+        if email:
+            buckets.append(('login_account', f'{email_key(email)}_{ip}'))
+        return buckets
@@ -1,9 +1,11 @@
 # Main project urls.py
 from django.contrib import admin
 from django.urls import path, include
+from .views import DatabasePoolStatsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
     path('api/products/', include('products.urls')),
-]
\ No newline at end of file
+    path('api/ops/db-pool/', DatabasePoolStatsView.as_view(), name='db-pool-stats'),
+]
@@ -0,0 +1,35 @@
+# backend/views.py
+from django.db import connections
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
+
+
+class DatabasePoolStatsView(APIView):
+    """Connection pool statistics for every configured database (staff only)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        data = {}
+        for alias in connections:
+            connection = connections[alias]
+            settings_dict = connection.settings_dict
+            # Only the PostgreSQL backend has a pool; it is None when disabled.
+            pool = getattr(connection, 'pool', None)
+
+            entry = {
+                'vendor': connection.vendor,
+                'pooled': pool is not None,
+                'conn_max_age': settings_dict.get('CONN_MAX_AGE'),
+                'conn_health_checks': settings_dict.get('CONN_HEALTH_CHECKS'),
+            }
+            if pool is not None:
+                entry.update({
+                    'min_size': pool.min_size,
+                    'max_size': pool.max_size,
+                    'timeout': pool.timeout,
+                    'stats': pool.get_stats(),
+                })
+            data[alias] = entry
+
+        return Response(data)
@@ -3,6 +3,11 @@ WSGI config for backend project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+Database pool defaults for WSGI workers (gunicorn): each worker process
+serves at most one request per thread, so a small pool is enough. With the
+default of 4 connections per worker, N gunicorn workers use at most 4 * N
+Postgres connections. Override any of these from the environment.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 """
@@ -12,5 +17,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('DB_POOL_MIN_SIZE', '1')
+os.environ.setdefault('DB_POOL_MAX_SIZE', '4')
 
 application = get_wsgi_application()
@@ -2,11 +2,34 @@
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Product, Rating
+from backend.pagination import EstimatedCountPaginator
+from .models import ArchivedRecord, Product, Rating, Region
+from .exports import PRODUCT_COLUMNS, export_response, iter_product_rows
+
+
+class SoftDeleteAdminMixin:
+    """
+    Admins see deactivated products and reels too: list them through
+    `all_objects` and accept them in foreign key fields.
+    """
+
+    def get_queryset(self, request):
+        if not hasattr(self.model, 'all_objects'):
+            return super().get_queryset(request)
+        queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if hasattr(db_field.related_model, 'all_objects') and 'queryset' not in kwargs:
+            kwargs['queryset'] = db_field.related_model.all_objects.all()
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = (
         'name',
         'seller',
@@ -15,18 +38,23 @@ class ProductAdmin(admin.ModelAdmin):
         'condition',
         'is_active',
         'display_average_rating',   # ← fixed
-        'total_ratings',
+        'display_total_ratings',
         'created_at'
     )
     list_filter = (
         'condition',
-        'region',
+        'region_ref',
         'is_active',
         'created_at',
     )
-    search_fields = ('name', 'description', 'seller__email', 'seller__shop_name', 'phone_number')
-    readonly_fields = ('created_at', 'updated_at', 'display_average_rating', 'total_ratings')
+    # Each backed by a trigram or equality index (migration 0012)
+    search_fields = ('name', 'seller__shop_name', '=seller__email', '=phone_number')
+    readonly_fields = ('created_at', 'updated_at', 'display_average_rating', 'display_total_ratings')
     raw_id_fields = ('seller',)
+    list_select_related = ('seller',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['export_as_csv', 'export_as_jsonl']
 
     fieldsets = (
         ('Product Info', {
@@ -37,30 +65,50 @@ class ProductAdmin(admin.ModelAdmin):
             'description': 'Image uploaded via Cloudinary → URL appears here'
         }),
         ('Status & Stats', {
-            'fields': ('is_active', 'display_average_rating', 'total_ratings', 'created_at', 'updated_at'),
+            'fields': ('is_active', 'display_average_rating', 'display_total_ratings', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('seller').prefetch_related('ratings')
+        return super().get_queryset(request).with_rating_stats()
 
     # Fixed method to display average rating
+    @admin.display(description='Avg Rating', ordering='rating_avg')
     def display_average_rating(self, obj):
         avg = obj.average_rating
         if avg > 0:
             stars = '★★★★★☆☆☆☆☆'[:int(avg)] + '☆' * (5 - int(avg))
-            return format_html(f'<b>{avg}</b> {stars}')
+            return format_html('<b>{}</b> {}', avg, stars)
         return "No ratings"
-    display_average_rating.short_description = 'Avg Rating'
+
+    @admin.display(description='Total ratings', ordering='rating_count')
+    def display_total_ratings(self, obj):
+        return obj.total_ratings
+
+    def _export(self, queryset, fmt):
+        columns = tuple(PRODUCT_COLUMNS)
+        return export_response(columns, iter_product_rows(queryset, columns), fmt, 'products')
+
+    @admin.action(description='Export selected products as CSV')
+    def export_as_csv(self, request, queryset):
+        return self._export(queryset, 'csv')
+
+    @admin.action(description='Export selected products as JSONL')
+    def export_as_jsonl(self, request, queryset):
+        return self._export(queryset, 'jsonl')
 
 
 @admin.register(Rating)
-class RatingAdmin(admin.ModelAdmin):
+class RatingAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ('product', 'buyer', 'rating', 'comment_preview', 'created_at')
-    list_filter = ('rating', 'created_at', 'product__region')
-    search_fields = ('product__name', 'buyer__email', 'buyer__shop_name', 'comment')
+    list_filter = ('rating', 'created_at', 'product__region_ref')
+    search_fields = ('product__name', '=buyer__email', 'buyer__shop_name')
     readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('product', 'buyer')
+    list_select_related = ('product', 'buyer')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def comment_preview(self, obj):
         if len(obj.comment or '') > 50:
@@ -68,26 +116,50 @@ class RatingAdmin(admin.ModelAdmin):
         return obj.comment or '—'
     comment_preview.short_description = 'Comment'
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('product', 'buyer')
-
 
 
 from .models import Reel, ReelLike, ReelComment
 
 @admin.register(Reel)
-class ReelAdmin(admin.ModelAdmin):
+class ReelAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'seller', 'price', 'views_count', 'likes_count', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
-    search_fields = ['title', 'seller__email']
+    search_fields = ['title', '=seller__email']
+    raw_id_fields = ['seller']
+    list_select_related = ['seller']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(ReelLike)
-class ReelLikeAdmin(admin.ModelAdmin):
+class ReelLikeAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ['reel', 'user', 'created_at']
     list_filter = ['created_at']
+    search_fields = ['=user__email']
+    raw_id_fields = ['reel', 'user']
+    list_select_related = ['reel', 'user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(ReelComment)
-class ReelCommentAdmin(admin.ModelAdmin):
+class ReelCommentAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_display = ['reel', 'user', 'text', 'created_at']
     list_filter = ['created_at']
-    search_fields = ['text', 'user__email']
\ No newline at end of file
+    search_fields = ['text', '=user__email']
+    raw_id_fields = ['reel', 'user']
+    list_select_related = ['reel', 'user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+@admin.register(Region)
+class RegionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key')
+    search_fields = ('name', 'key')
+
+
+@admin.register(ArchivedRecord)
+class ArchivedRecordAdmin(admin.ModelAdmin):
+    list_display = ('model', 'object_id', 'root_model', 'root_id', 'seller_id', 'archived_at')
+    list_filter = ('model',)
+    readonly_fields = ('model', 'object_id', 'root_model', 'root_id', 'seller_id', 'data', 'archived_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
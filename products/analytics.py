@@ -0,0 +1,129 @@
+# products/analytics.py
+"""
+Seller analytics over DailyItemStats.
+
+`rollup_daily_stats` keeps the daily rows current:
+- reels: the EngagementEvent log is consumed with its own cursor, so each
+  event is added to its reel's day exactly once;
+- products: ratings can be edited, so the days that had ratings created or
+  changed since the previous run are recomputed from the Rating table.
+  Deleting a rating leaves no timestamp behind; `--full` recomputes all days.
+
+The analytics endpoint then sums a seller's rows per day with one range
+scan of the (seller_id, day) index.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .events import consume
+from .models import DailyItemStats, EngagementBucket, EngagementEvent, EventCursor, Rating, Reel
+
+EVENTS_CURSOR = 'daily_item_stats'
+RATINGS_CURSOR = 'daily_rating_stats'
+# Ratings committed while a run was reading are picked up by the next one
+RATINGS_OVERLAP = timedelta(minutes=5)
+
+PRODUCT = EngagementBucket.ITEM_PRODUCT
+REEL = EngagementBucket.ITEM_REEL
+METRICS = ('plays', 'views', 'likes', 'shares', 'comments', 'ratings', 'rating_sum')
+REEL_METRICS = ('plays', 'views', 'likes', 'shares', 'comments')
+
+# Event type -> (DailyItemStats field, delta)
+EVENT_METRICS = {
+    EngagementEvent.PLAY: ('plays', 1),
+    EngagementEvent.VIEW: ('views', 1),
+    EngagementEvent.LIKE: ('likes', 1),
+    EngagementEvent.UNLIKE: ('likes', -1),
+    EngagementEvent.SHARE: ('shares', 1),
+    EngagementEvent.COMMENT: ('comments', 1),
+    EngagementEvent.UNCOMMENT: ('comments', -1),
+}
+
+
+def add_reel_events(batch):
+    """Add a batch of consumed events to the reels' daily rows."""
+    deltas = defaultdict(Counter)
+    for _, event_type, reel_id, _, created_at in batch:
+        field, delta = EVENT_METRICS[event_type]
+        deltas[(reel_id, timezone.localdate(created_at))][field] += delta
+
+    # Events of reels archived since are dropped
+    sellers = dict(Reel.all_objects.filter(pk__in={reel_id for reel_id, _ in deltas})
+                   .values_list('pk', 'seller_id'))
+    existing = {
+        (row['item_id'], row['day']): row
+        for row in DailyItemStats.objects.filter(
+            item_type=REEL, item_id__in=sellers, day__in={day for _, day in deltas}
+        ).values('item_id', 'day', *REEL_METRICS)
+    }
+    rows = []
+    for (reel_id, day), counters in deltas.items():
+        if reel_id not in sellers:
+            continue
+        current = existing.get((reel_id, day), {})
+        rows.append(DailyItemStats(
+            item_type=REEL, item_id=reel_id, seller_id=sellers[reel_id], day=day,
+            **{field: current.get(field, 0) + counters[field] for field in REEL_METRICS},
+        ))
+    DailyItemStats.objects.bulk_create(
+        rows, batch_size=1000, update_conflicts=True,
+        unique_fields=['item_type', 'item_id', 'day'], update_fields=list(REEL_METRICS),
+    )
+
+
+def refresh_rating_days(full=False):
+    """Recompute the product rows of the days whose ratings changed. Returns the rows written."""
+    with transaction.atomic():
+        cursor, created = EventCursor.objects.select_for_update().get_or_create(name=RATINGS_CURSOR)
+        ratings = Rating.objects.annotate(day=TruncDate('created_at'))
+        stale = DailyItemStats.objects.filter(item_type=PRODUCT)
+        if not (created or full):
+            changed = Rating.objects.filter(updated_at__gte=cursor.updated_at - RATINGS_OVERLAP)
+            days = set(changed.annotate(day=TruncDate('created_at')).values_list('day', flat=True))
+            ratings = ratings.filter(day__in=days)
+            stale = stale.filter(day__in=days)
+
+        grouped = (
+            ratings.values('product_id', 'product__seller_id', 'day')
+            .annotate(count=Count('id'), total=Sum('rating')).order_by()
+        )
+        rows = [
+            DailyItemStats(item_type=PRODUCT, item_id=row['product_id'], seller_id=row['product__seller_id'],
+                           day=row['day'], ratings=row['count'], rating_sum=row['total'])
+            for row in grouped
+        ]
+        stale.delete()
+        DailyItemStats.objects.bulk_create(rows, batch_size=1000)
+        cursor.save(update_fields=['updated_at'])
+    return len(rows)
+
+
+def rollup_daily_stats(full=False, batch_size=5000):
+    """Bring DailyItemStats up to date. Returns (events consumed, product rows written)."""
+    return consume(EVENTS_CURSOR, add_reel_events, batch_size), refresh_rating_days(full)
+
+
+def seller_series(seller_id, start, end, item_type=None, item_id=None):
+    """
+    Daily totals of a seller's items (or of one item) from start to end,
+    inclusive, one dict per day with every day present.
+    """
+    rows = DailyItemStats.objects.filter(seller_id=seller_id, day__range=(start, end))
+    if item_type:
+        rows = rows.filter(item_type=item_type)
+    if item_id:
+        rows = rows.filter(item_id=item_id)
+    by_day = {
+        row.pop('day'): row
+        for row in rows.values('day').annotate(**{metric: Sum(metric) for metric in METRICS}).order_by('day')
+    }
+    empty = dict.fromkeys(METRICS, 0)
+    return [
+        {'day': day, **by_day.get(day, empty)}
+        for day in (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+    ]
@@ -0,0 +1,77 @@
+# products/archive.py
+"""
+Archival of soft-deleted products and reels.
+
+Deleting a product or reel only deactivates it, so sellers can bring it
+back. Once a row has been inactive for ARCHIVE_INACTIVE_AFTER_DAYS it is
+serialized, together with its images and ratings (or likes and comments),
+into ArchivedRecord and deleted from the hot tables. Every batch is its own
+transaction: runs hold locks briefly and can be stopped and resumed.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from .models import ArchivedRecord, Product, Reel
+
+# Archived model -> reverse accessors of the rows archived along with it
+ARCHIVE_PLAN = {
+    Product: ('images', 'ratings'),
+    Reel: ('likes', 'comments'),
+}
+
+
+def archive_cutoff(days=None):
+    days = settings.ARCHIVE_INACTIVE_AFTER_DAYS if days is None else days
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable(model, before):
+    """Rows of `model` deactivated and not modified since `before`."""
+    return model.all_objects.filter(is_active=False, updated_at__lt=before)
+
+
+def _records(root, objects):
+    for entry in serializers.serialize('python', objects):
+        yield ArchivedRecord(
+            model=entry['model'],
+            object_id=entry['pk'],
+            root_model=root._meta.label_lower,
+            root_id=root.pk,
+            seller_id=root.seller_id,
+            data=entry['fields'],
+        )
+
+
+def archive_batch(model, before, batch_size):
+    """
+    Archive up to `batch_size` of the oldest archivable rows of `model` in
+    one transaction. Returns (rows archived, ArchivedRecords written).
+    """
+    children = ARCHIVE_PLAN[model]
+    with transaction.atomic():
+        # Locked and re-checked, so a row reactivated meanwhile is skipped
+        roots = list(
+            archivable(model, before)
+            .select_for_update()
+            .order_by('updated_at', 'pk')[:batch_size]
+        )
+        if not roots:
+            return 0, 0
+        prefetch_related_objects(roots, *children)
+
+        records = []
+        for root in roots:
+            records.extend(_records(root, [root]))
+            for accessor in children:
+                records.extend(_records(root, getattr(root, accessor).all()))
+        ArchivedRecord.objects.bulk_create(records, batch_size=500)
+        # Cascades to the children (and pending image fetches); their delete
+        # signals keep SellerStats in step
+        model.all_objects.filter(pk__in=[root.pk for root in roots]).delete()
+
+    return len(roots), len(records)
@@ -0,0 +1,180 @@
+# products/duplicates.py
+"""
+Near-duplicate image lookup by multi-index hashing.
+
+Each 64-bit perceptual hash is split into BANDS bands of 16 bits, and every
+band has its own database index. If two hashes differ in at most
+BANDS - 1 bits, at least one band must match exactly (pigeonhole). So a
+near-duplicate search is a few indexed equality lookups plus an exact
+Hamming check on the candidates, not a scan of the whole table.
+
+cluster_products() applies the same idea catalogue-wide: images are only
+compared within a band bucket (same value of one band).
+"""
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import ProductImage
+
+BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+# Largest distance the band index is guaranteed to find
+MAX_DISTANCE = BANDS - 1
+# Band buckets with more distinct hashes than this are skipped when
+# clustering (comparing within one is quadratic); near-duplicates in them
+# are still found through the other bands unless those differ too
+MAX_BUCKET_HASHES = 500
+# Only our own image host is fetched, never seller-supplied URLs elsewhere
+FETCH_HOSTS = {'res.cloudinary.com'}
+MAX_FETCH_BYTES = 10 * 1024 * 1024
+
+
+def to_signed(value):
+    """Unsigned 64-bit hash -> value that fits a BigIntegerField."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def split_bands(value):
+    value = to_unsigned(value)
+    return [(value >> (BAND_BITS * i)) & BAND_MASK for i in range(BANDS)]
+
+
+def hamming_distance(a, b):
+    return (to_unsigned(a) ^ to_unsigned(b)).bit_count()
+
+
+def phash_fields(value):
+    """Model field values for a ProductImage with perceptual hash `value`."""
+    if value is None:
+        return {}
+    fields = {'phash': to_signed(value)}
+    for i, band in enumerate(split_bands(value)):
+        fields[f'phash_band{i}'] = band
+    return fields
+
+
+def band_query(hashes):
+    query = Q()
+    for value in hashes:
+        for i, band in enumerate(split_bands(value)):
+            query |= Q(**{f'phash_band{i}': band})
+    return query
+
+
+def find_near_duplicates(hashes, exclude_product_id=None, max_distance=MAX_DISTANCE):
+    """
+    Return the ids of active products with an image within `max_distance`
+    bits of any of `hashes`.
+    """
+    hashes = [h for h in hashes if h is not None]
+    if not hashes:
+        return []
+
+    candidates = (
+        ProductImage.objects
+        .filter(band_query(hashes), product__is_active=True)
+        .exclude(product_id=exclude_product_id)
+        .values_list('product_id', 'phash')
+    )
+    return sorted({
+        product_id for product_id, phash in candidates
+        if any(hamming_distance(phash, value) <= max_distance for value in hashes)
+    })
+
+
+class _UnionFind(dict):
+    def find(self, x):
+        self.setdefault(x, x)
+        while self[x] != x:
+            self[x] = self[self[x]]
+            x = self[x]
+        return x
+
+    def union(self, a, b):
+        self[self.find(a)] = self.find(b)
+
+
+def _link_bucket(bucket, max_distance, groups):
+    """Union the products of one band bucket, a list of (product_id, phash)."""
+    by_hash = defaultdict(list)
+    for product_id, phash in bucket:
+        by_hash[phash].append(product_id)
+    # Identical hashes are linked without comparing pairs
+    for product_ids in by_hash.values():
+        for product_id in product_ids[1:]:
+            groups.union(product_ids[0], product_id)
+    if len(by_hash) > MAX_BUCKET_HASHES:
+        return False
+    hashes = list(by_hash)
+    for i, hash_a in enumerate(hashes):
+        for hash_b in hashes[i + 1:]:
+            if hamming_distance(hash_a, hash_b) <= max_distance:
+                groups.union(by_hash[hash_a][0], by_hash[hash_b][0])
+    return True
+
+
+def cluster_products(images, max_distance=MAX_DISTANCE):
+    """
+    Group the products of a ProductImage queryset whose images are within
+    `max_distance` bits. Returns (clusters of two or more product ids,
+    largest first; number of band buckets skipped as oversized).
+    """
+    max_distance = min(max_distance, MAX_DISTANCE)
+    groups = _UnionFind()
+    skipped = 0
+    # Each pass streams one band in order, one bucket at a time
+    for band in range(BANDS):
+        field = f'phash_band{band}'
+        bucket, current = [], None
+        rows = images.filter(phash__isnull=False).order_by(field).values_list(field, 'product_id', 'phash')
+        for value, product_id, phash in rows.iterator(chunk_size=5000):
+            groups.find(product_id)
+            if value != current:
+                skipped += not _link_bucket(bucket, max_distance, groups)
+                bucket, current = [], value
+            bucket.append((product_id, phash))
+        skipped += not _link_bucket(bucket, max_distance, groups)
+
+    clusters = defaultdict(set)
+    for product_id in list(groups):
+        clusters[groups.find(product_id)].add(product_id)
+    return sorted((sorted(c) for c in clusters.values() if len(c) > 1), key=len, reverse=True), skipped
+
+
+def fetchable(url):
+    """True for https URLs on our image host (and our cloud, when configured)."""
+    parts = urlsplit(url)
+    cloud_name = settings.CLOUDINARY.get('cloud_name')
+    return (parts.scheme == 'https' and parts.hostname in FETCH_HOSTS
+            and (not cloud_name or parts.path.startswith(f'/{cloud_name}/')))
+
+
+class _HostCheckingRedirects(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if not fetchable(newurl):
+            raise urllib.error.HTTPError(newurl, code, "Redirect off the image host", headers, fp)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = urllib.request.build_opener(_HostCheckingRedirects)
+
+
+def fetch_image(url, timeout=10):
+    """Download an image from our image host. Raises ValueError for other URLs."""
+    if not fetchable(url):
+        raise ValueError("Not an image host URL")
+    with _opener.open(url, timeout=timeout) as response:
+        data = response.read(MAX_FETCH_BYTES + 1)
+    if len(data) > MAX_FETCH_BYTES:
+        raise ValueError("Image too large")
+    return data
@@ -0,0 +1,202 @@
+# products/events.py
+"""
+Reel engagement event log.
+
+Plays, views, likes, shares and comments are recorded as EngagementEvent
+rows instead of updating Reel counters in the request. Events are buffered
+in the process and inserted with one bulk_create per batch, once
+ENGAGEMENT_EVENT_BATCH_SIZE are pending or the oldest is
+ENGAGEMENT_EVENT_FLUSH_SECONDS old. A timer thread per process flushes the
+events of an idle worker, and gunicorn's worker_exit hook and interpreter
+exit flush what is left; a killed worker loses at most its last few seconds
+of events. `rollup_engagement`
+then reads the log in id order from its EventCursor and applies the counter
+deltas (plus SellerStats and the unique-viewer sketches) one batch per
+transaction, so every event is counted exactly once. Other consumers (daily
+analytics) read the same log through consume() with their own cursor.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from .models import EngagementEvent, EventCursor, Reel, ReelViewerSketch, SellerStats
+from .sketches import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_CURSOR = 'reel_counters'
+
+# Event type -> (Reel counter, delta)
+COUNTER_DELTAS = {
+    EngagementEvent.PLAY: ('plays_count', 1),
+    EngagementEvent.VIEW: ('views_count', 1),
+    EngagementEvent.LIKE: ('likes_count', 1),
+    EngagementEvent.UNLIKE: ('likes_count', -1),
+    EngagementEvent.SHARE: ('shares_count', 1),
+    EngagementEvent.COMMENT: ('comments_count', 1),
+    EngagementEvent.UNCOMMENT: ('comments_count', -1),
+}
+# Reel counter -> SellerStats field it feeds
+SELLER_STATS = {'views_count': 'reel_views', 'shares_count': 'reel_shares'}
+
+
+class EventBuffer:
+    """Events waiting to be inserted, shared by the threads of one process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.first_at = None
+        self.pid = os.getpid()
+        self.timer_pid = None
+
+    def add(self, event):
+        with self.lock:
+            if self.pid != os.getpid():
+                # Forked from a process with pending events: those are its own
+                self.events, self.pid = [], os.getpid()
+            if self.timer_pid != os.getpid():
+                # Started on first use, so a preloading master starts none
+                threading.Thread(target=self.flush_periodically, name='engagement-event-flush', daemon=True).start()
+                self.timer_pid = os.getpid()
+            if not self.events:
+                self.first_at = time.monotonic()
+            self.events.append(event)
+            due = (len(self.events) >= settings.ENGAGEMENT_EVENT_BATCH_SIZE
+                   or time.monotonic() - self.first_at >= settings.ENGAGEMENT_EVENT_FLUSH_SECONDS)
+        if due:
+            self.flush()
+
+    def due(self):
+        with self.lock:
+            return bool(self.events) and time.monotonic() - self.first_at >= settings.ENGAGEMENT_EVENT_FLUSH_SECONDS
+
+    def flush_periodically(self):
+        """Timer thread: flush events that no later add() came to flush."""
+        while True:
+            time.sleep(settings.ENGAGEMENT_EVENT_FLUSH_SECONDS)
+            if self.pid == os.getpid() and self.due():
+                self.flush()
+                # This thread's own connection, returned between flushes
+                connections.close_all()
+
+    def flush(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.events, self.pid = [], os.getpid()
+            events, self.events = self.events, []
+        if not events:
+            return 0
+        try:
+            EngagementEvent.objects.bulk_create(events, batch_size=settings.ENGAGEMENT_EVENT_BATCH_SIZE)
+        except Exception:
+            # Engagement is best effort: never fail the request that flushed
+            logger.exception("Dropped %d engagement events", len(events))
+            return 0
+        return len(events)
+
+
+buffer = EventBuffer()
+atexit.register(buffer.flush)
+
+
+def record(event_type, reel_id, user_id=None, viewer=None):
+    buffer.add(EngagementEvent(event_type=event_type, reel_id=reel_id, user_id=user_id, viewer=viewer))
+
+
+def _add_viewers(reel_id, viewers):
+    """Add viewer hashes to the reel's sketch. Returns the new estimate, or None if unchanged."""
+    sketch, _ = ReelViewerSketch.objects.select_for_update().get_or_create(reel_id=reel_id)
+    registers = HyperLogLog(sketch.registers)
+    changed = False
+    for viewer in viewers:
+        changed |= registers.add_hash(viewer)
+    if not changed:
+        return None
+    sketch.registers = registers.to_bytes()
+    sketch.save(update_fields=['registers', 'updated_at'])
+    return registers.estimate()
+
+
+def apply_events(events):
+    """Apply (event_type, reel_id, viewer) tuples to the Reel counters."""
+    deltas = defaultdict(Counter)
+    viewers = defaultdict(list)
+    for event_type, reel_id, viewer in events:
+        field, delta = COUNTER_DELTAS[event_type]
+        deltas[reel_id][field] += delta
+        if viewer is not None:
+            viewers[reel_id].append(viewer)
+
+    # Reels archived since are skipped
+    sellers = dict(Reel.all_objects.filter(pk__in=deltas).values_list('pk', 'seller_id'))
+    seller_deltas = defaultdict(Counter)
+    for reel_id, counters in deltas.items():
+        if reel_id not in sellers:
+            continue
+        changes = {field: F(field) + delta for field, delta in counters.items() if delta}
+        if reel_id in viewers:
+            estimate = _add_viewers(reel_id, viewers[reel_id])
+            if estimate is not None:
+                changes['unique_viewers'] = estimate
+        if changes:
+            Reel.all_objects.filter(pk=reel_id).update(**changes)
+        for field, stat in SELLER_STATS.items():
+            seller_deltas[sellers[reel_id]][stat] += counters[field]
+
+    # update() skips the Reel signals that maintain SellerStats
+    for seller_id, stats in seller_deltas.items():
+        stats = {stat: delta for stat, delta in stats.items() if delta}
+        if stats:
+            SellerStats.objects.apply_deltas(seller_id, **stats)
+
+
+def consume(cursor_name, apply, batch_size=5000):
+    """
+    Pass the events after the named EventCursor to apply(), in id order and
+    in batches of (id, event_type, reel_id, viewer, created_at) tuples, each
+    batch in one transaction with the cursor update. Returns the number of
+    events consumed.
+    """
+    # By insert time on the database clock: an uncommitted batch was
+    # inserted less than the delay ago, whenever its events happened
+    settled = Now() - timedelta(seconds=settings.ENGAGEMENT_ROLLUP_DELAY_SECONDS)
+    consumed = 0
+    while True:
+        with transaction.atomic():
+            # Locked, so overlapping runs wait instead of double counting
+            cursor, _ = EventCursor.objects.select_for_update().get_or_create(name=cursor_name)
+            pending = EngagementEvent.objects.filter(id__gt=cursor.position)
+            # Stop short of the recent events: a batch with lower ids may
+            # still be committing
+            recent = pending.filter(inserted_at__gt=settled).order_by('id').values_list('id', flat=True).first()
+            if recent is not None:
+                pending = pending.filter(id__lt=recent)
+            batch = list(
+                pending.order_by('id')
+                .values_list('id', 'event_type', 'reel_id', 'viewer', 'created_at')[:batch_size]
+            )
+            if not batch:
+                return consumed
+            apply(batch)
+            cursor.position = batch[-1][0]
+            cursor.save(update_fields=['position', 'updated_at'])
+        consumed += len(batch)
+
+
+def rollup_events(batch_size=5000):
+    """Fold new events into the Reel counters. Returns the number of events applied."""
+    return consume(
+        ROLLUP_CURSOR,
+        lambda batch: apply_events((event_type, reel_id, viewer) for _, event_type, reel_id, viewer, _ in batch),
+        batch_size,
+    )
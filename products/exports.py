@@ -0,0 +1,83 @@
+# products/exports.py
+"""
+Streaming CSV/JSONL exports. Rows are read with .iterator(chunk_size=...) and
+encoded one at a time into a StreamingHttpResponse, so memory stays flat no
+matter how many rows are exported. Product CSVs use the same columns as the
+bulk importer, so an export can be re-imported as is.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_CHUNK_SIZE = 2000
+
+PRODUCT_COLUMNS = {
+    'id': lambda p: p.id,
+    'name': lambda p: p.name,
+    'description': lambda p: p.description,
+    'price': lambda p: p.price,
+    'region': lambda p: p.region,
+    'condition': lambda p: p.condition,
+    'phone_number': lambda p: p.phone_number,
+    # prefetched per chunk by iterator(chunk_size=...)
+    'image_urls': lambda p: [image.image_url for image in p.images.all()],
+    'is_active': lambda p: p.is_active,
+    'created_at': lambda p: p.created_at,
+    'updated_at': lambda p: p.updated_at,
+    'seller_email': lambda p: p.seller.email,
+}
+SELLER_PRODUCT_COLUMNS = tuple(c for c in PRODUCT_COLUMNS if c != 'seller_email')
+
+RATING_COLUMNS = (
+    'id', 'product_id', 'product__name', 'buyer__shop_name', 'rating', 'comment', 'created_at',
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Echo:
+    """File-like object whose write() hands the line straight back to csv.writer"""
+    def write(self, value):
+        return value
+
+
+def iter_product_rows(queryset, columns=SELLER_PRODUCT_COLUMNS):
+    queryset = queryset.prefetch_related(None).prefetch_related('images').order_by('pk')
+    if 'seller_email' in columns:
+        queryset = queryset.select_related('seller')
+    for product in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [PRODUCT_COLUMNS[column](product) for column in columns]
+
+
+def iter_rating_rows(queryset, columns=RATING_COLUMNS):
+    queryset = queryset.order_by('pk').values_list(*columns)
+    yield from queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _encode_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(['|'.join(v) if isinstance(v, list) else v for v in row])
+
+
+def _encode_jsonl(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_response(columns, rows, fmt, filename):
+    """Wrap a row iterator in a StreamingHttpResponse of the given format."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    encode = _encode_csv if fmt == 'csv' else _encode_jsonl
+    response = StreamingHttpResponse(encode(columns, rows), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
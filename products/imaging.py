@@ -0,0 +1,157 @@
+# products/imaging.py
+"""
+Local preprocessing of product images before they are uploaded.
+
+Camera originals are often several MB. They are downsized to fit
+MAX_DIMENSION x MAX_DIMENSION, stripped of EXIF (after applying its
+rotation) and re-encoded as WebP or JPEG before the upload. Decoding and
+encoding are CPU-bound, so they run in a process pool rather than in the
+request thread, which would hold the GIL.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_DIMENSION = 1000
+
+ProcessedImage = namedtuple('ProcessedImage', ['content', 'format', 'original_size', 'size', 'phash'])
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def difference_hash(image):
+    """
+    64-bit perceptual difference hash (dHash): shrink to 9x8 grayscale and
+    set one bit per pixel that is brighter than its right-hand neighbour.
+    Re-encoded, resized or slightly edited copies of a photo get hashes a
+    few bits apart.
+    """
+    from PIL import Image
+
+    pixels = image.convert('L').resize((9, 8), Image.LANCZOS).tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            offset = row * 9 + col
+            value = (value << 1) | (pixels[offset] > pixels[offset + 1])
+    return value
+
+
+def image_phash(data):
+    """Perceptual hash of encoded image bytes."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        return difference_hash(ImageOps.exif_transpose(image))
+
+
+def _encode(image, image_format, quality):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L') or \
+            image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if image_format == 'WEBP' and 'A' in image.getbands() else 'RGB')
+    buffer = io.BytesIO()
+    # No exif= argument, so no metadata is written
+    image.save(buffer, image_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def preprocess_image_bytes(data, image_format='WEBP', quality=82):
+    """
+    Resize and re-encode one image. Runs inside a pool worker.
+    Returns (encoded bytes, their format, perceptual hash).
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        original_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.LANCZOS)
+        phash = difference_hash(image)
+        content = _encode(image, image_format, quality)
+
+        # Small, already-compressed images can grow when converted. Keep
+        # their format then, but still re-encode: the original bytes carry
+        # the EXIF (GPS position included).
+        if len(content) >= len(data) and original_format and original_format != image_format:
+            try:
+                same_format = _encode(image, original_format, quality)
+            except (KeyError, OSError, ValueError):  # No encoder for that format
+                same_format = None
+            if same_format is not None and len(same_format) < len(content):
+                return same_format, original_format, phash
+        return content, image_format, phash
+
+
+def get_pool():
+    """
+    Process pool shared by the threads of this worker. Created lazily, and
+    again after a fork, so each server worker owns its own pool. Workers
+    start from a forkserver so they never inherit the server's threads.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PREPROCESS_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver'),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool():
+    """Stop this worker's pool, if it started one (called when a worker exits)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = _pool_pid = None
+
+
+def preprocess_images(files):
+    """
+    Preprocess uploaded files in parallel. Returns one ProcessedImage per
+    file, in order. Raises ValueError if a file is not a readable image.
+    """
+    image_format = settings.IMAGE_PREPROCESS_FORMAT
+    quality = settings.IMAGE_PREPROCESS_QUALITY
+    payloads = []
+    for f in files:
+        f.seek(0)
+        payloads.append(f.read())
+
+    try:
+        if settings.IMAGE_PREPROCESS_WORKERS > 0:
+            outputs = list(get_pool().map(
+                preprocess_image_bytes, payloads,
+                [image_format] * len(payloads), [quality] * len(payloads)
+            ))
+        else:
+            outputs = [preprocess_image_bytes(data, image_format, quality) for data in payloads]
+    except Exception as e:
+        raise ValueError(f"Could not process image: {e}") from e
+
+    results = [
+        ProcessedImage(processed, processed_format, len(original), len(processed), phash)
+        for original, (processed, processed_format, phash) in zip(payloads, outputs)
+    ]
+
+    original_total = sum(r.original_size for r in results)
+    saved = original_total - sum(r.size for r in results)
+    logger.info("Preprocessed %d images: %d bytes -> %d bytes (saved %d)",
+                len(results), original_total, original_total - saved, saved)
+    return results
+
+
+def bytes_saved(results):
+    return sum(r.original_size - r.size for r in results)
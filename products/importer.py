@@ -0,0 +1,144 @@
+# products/importer.py
+"""
+Streaming bulk import of products from CSV or JSONL.
+
+Rows are read one at a time from the (possibly on-disk) upload, validated with
+ProductImportRowSerializer and written in batches with bulk_create, so memory
+use depends on the batch size and not on the file size. Image URLs are stored
+as-is and queued in ProductImageFetch for the fetch_product_images worker.
+"""
+import csv
+import io
+import json
+
+from django.db import transaction
+
+from .models import Product, ProductImage, ProductImageFetch, SellerStats
+from .regions import region_directory
+from .serializers import ProductImportRowSerializer
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.images_queued = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'failed': self.failed,
+            'images_queued': self.images_queued,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def guess_format(filename):
+    """Return 'csv' or 'jsonl' from a file name, or None."""
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def iter_rows(fileobj, fmt):
+    """
+    Yield (row_number, data) pairs from a binary file object without reading
+    it into memory. Rows that cannot be parsed yield an error string instead
+    of a dict. Row numbers are 1-based data rows (the CSV header is row 0).
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                yield number, row
+        else:
+            for number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield number, f"Invalid JSON: {e}"
+                    continue
+                if not isinstance(row, dict):
+                    yield number, "Each line must be a JSON object"
+                    continue
+                yield number, row
+    finally:
+        # Leave the underlying file open for the caller
+        text.detach()
+
+
+def import_products(fileobj, fmt, seller, batch_size=DEFAULT_BATCH_SIZE):
+    """Import products for a seller from a CSV or JSONL binary stream."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    report = ImportReport()
+    batch = []
+    try:
+        for number, row in iter_rows(fileobj, fmt):
+            report.rows += 1
+            if isinstance(row, str):
+                report.add_error(number, {'non_field_errors': [row]})
+                continue
+
+            serializer = ProductImportRowSerializer(data=row)
+            if not serializer.is_valid():
+                report.add_error(number, serializer.errors)
+                continue
+
+            batch.append(serializer.validated_data)
+            if len(batch) >= batch_size:
+                _write_batch(batch, seller, report)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        report.add_error(report.rows + 1, {'non_field_errors': [f"Could not read file: {e}"]})
+
+    if batch:
+        _write_batch(batch, seller, report)
+    return report
+
+
+def _write_batch(rows, seller, report):
+    with transaction.atomic():
+        products = [Product(seller=seller, **{k: v for k, v in row.items() if k != 'image_urls'})
+                    for row in rows]
+        # bulk_create skips Product.save(), which links the canonical region
+        for product in products:
+            product.region_ref_id, product.region = region_directory.resolve(product.region)
+        Product.objects.bulk_create(products)
+
+        # Images point at the source URL until the worker re-hosts them
+        images = ProductImage.objects.bulk_create([
+            ProductImage(product=product, image_url=url)
+            for product, row in zip(products, rows)
+            for url in row.get('image_urls', [])
+        ])
+        ProductImageFetch.objects.bulk_create([
+            ProductImageFetch(image=image, source_url=image.image_url)
+            for image in images
+        ])
+        # bulk_create skips the signals that maintain SellerStats
+        SellerStats.objects.apply_deltas(
+            seller.id, active_product_count=sum(1 for product in products if product.is_active)
+        )
+
+    report.created += len(products)
+    report.images_queued += len(images)
@@ -0,0 +1,34 @@
+# products/management/commands/archive_inactive.py
+
+from django.core.management.base import BaseCommand
+
+from products.archive import ARCHIVE_PLAN, archivable, archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = ("Move products and reels deactivated more than ARCHIVE_INACTIVE_AFTER_DAYS ago, "
+            "with their images, ratings, likes and comments, into ArchivedRecord")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Inactive for at least this many days "
+                                                     "(default: ARCHIVE_INACTIVE_AFTER_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=200, help="Products or reels per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived")
+
+    def handle(self, *args, **options):
+        before = archive_cutoff(options['days'])
+        for model in ARCHIVE_PLAN:
+            label = model._meta.verbose_name_plural
+            if options['dry_run']:
+                self.stdout.write(f"{archivable(model, before).count()} {label} would be archived")
+                continue
+
+            archived = written = 0
+            while True:
+                rows, records = archive_batch(model, before, options['batch_size'])
+                if not rows:
+                    break
+                archived += rows
+                written += records
+                self.stdout.write(f"  {label}: {archived} archived")
+            self.stdout.write(self.style.SUCCESS(f"Archived {archived} {label} ({written} records)"))
@@ -0,0 +1,48 @@
+# products/management/commands/cluster_duplicate_images.py
+
+from django.core.management.base import BaseCommand
+
+from products.duplicates import MAX_DISTANCE, cluster_products, fetch_image, phash_fields
+from products.imaging import image_phash
+from products.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = "Group products whose images are near-duplicates across the catalogue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-distance', type=int, default=MAX_DISTANCE,
+                            help=f"Hamming distance in bits (at most {MAX_DISTANCE})")
+        parser.add_argument('--backfill', action='store_true',
+                            help="First download and hash images that have no hash yet")
+        parser.add_argument('--backfill-limit', type=int, default=1000)
+        parser.add_argument('--include-inactive', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.backfill(options['backfill_limit'])
+
+        images = ProductImage.objects.all()
+        if not options['include_inactive']:
+            images = images.filter(product__is_active=True)
+        clusters, skipped = cluster_products(images, options['max_distance'])
+
+        for cluster in clusters:
+            self.stdout.write(f"{len(cluster)} products: {', '.join(map(str, cluster))}")
+        if skipped:
+            self.stdout.write(f"Skipped {skipped} oversized band buckets")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(clusters)} duplicate clusters covering {sum(map(len, clusters))} products"
+        ))
+
+    def backfill(self, limit):
+        hashed = 0
+        for image in ProductImage.objects.filter(phash__isnull=True).order_by('id')[:limit]:
+            try:
+                fields = phash_fields(image_phash(fetch_image(image.image_url)))
+            except Exception as e:
+                self.stderr.write(f"image {image.pk}: {e}")
+                continue
+            ProductImage.objects.filter(pk=image.pk).update(**fields)
+            hashed += 1
+        self.stdout.write(f"Hashed {hashed} images")
@@ -0,0 +1,108 @@
+# products/management/commands/explain_list_views.py
+
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from products.views import (
+    ProductListView, SellerProductListView, MyProductsView, ProductRatingsView,
+    ReelListView, MyReelsView, ReelCommentsView,
+)
+
+User = get_user_model()
+
+# (label, view class, query params, url kwargs) - one entry per query shape
+# the list endpoints actually produce.
+LIST_VIEW_CASES = [
+    ('products', ProductListView, {}, {}),
+    ('products?region', ProductListView, {'region': ['Dar es Salaam', 'Arusha']}, {}),
+    ('products?condition', ProductListView, {'condition': 'new'}, {}),
+    ('products?price', ProductListView, {'min_price': '1000', 'max_price': '50000'}, {}),
+    ('products?region&condition&price', ProductListView,
+     {'region': ['Dar es Salaam'], 'condition': 'new', 'min_price': '1000', 'max_price': '50000'}, {}),
+    ('products?sort=price', ProductListView, {'sort': 'price'}, {}),
+    ('seller-products', SellerProductListView, {}, {'seller_id': None}),
+    ('my-products', MyProductsView, {}, {}),
+    ('product-ratings', ProductRatingsView, {}, {'product_id': 1}),
+    ('reels', ReelListView, {}, {}),
+    ('my-reels', MyReelsView, {}, {}),
+    ('reel-comments', ReelCommentsView, {}, {'reel_id': 1}),
+]
+
+# PostgreSQL: "Seq Scan on products_product"
+# SQLite:     "SCAN products_product" (index scans read "SCAN t USING INDEX ...")
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING)\s*$', re.MULTILINE),
+}
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN for every list view queryset and report sequential scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Email of the user for authenticated views (default: first user)")
+        parser.add_argument('--analyze', action='store_true', help="Use EXPLAIN ANALYZE (PostgreSQL only)")
+        parser.add_argument('--show-plans', action='store_true', help="Print the full plan for every query")
+        parser.add_argument('--fail-on-seq-scan', action='store_true',
+                            help="Exit with an error when any sequential scan is found")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        factory = APIRequestFactory()
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        explain_options = {'analyze': True} if options['analyze'] and connection.vendor == 'postgresql' else {}
+
+        if pattern is None:
+            self.stderr.write(f"Sequential scan detection is not supported for {connection.vendor}; "
+                              "showing raw plans.")
+            options['show_plans'] = True
+
+        offenders = []
+        for label, view_class, params, kwargs in LIST_VIEW_CASES:
+            kwargs = {key: (user.pk if value is None else value) for key, value in kwargs.items()}
+            queryset = self.build_queryset(factory, view_class, params, kwargs, user)
+            plan = queryset.explain(**explain_options)
+
+            seq_tables = sorted(set(pattern.findall(plan))) if pattern else []
+            if seq_tables:
+                offenders.append(label)
+                self.stdout.write(self.style.WARNING(f"{label}: sequential scan on {', '.join(seq_tables)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{label}: ok"))
+
+            if options['show_plans']:
+                self.stdout.write(plan)
+                self.stdout.write('')
+
+        if offenders:
+            self.stdout.write(
+                f"{len(offenders)} of {len(LIST_VIEW_CASES)} queries use sequential scans. "
+                "Small tables are legitimately scanned; run against production-sized data."
+            )
+            if options['fail_on_seq_scan']:
+                raise CommandError("Sequential scans found: " + ', '.join(offenders))
+
+    def get_user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {email}")
+        # An unsaved user still produces the right "seller_id = N" query shape.
+        return User.objects.order_by('pk').first() or User(pk=1)
+
+    def build_queryset(self, factory, view_class, params, kwargs, user):
+        request = Request(factory.get('/', params))
+        request.user = user
+
+        view = view_class()
+        view.request = request
+        view.args = ()
+        view.kwargs = kwargs
+        view.format_kwarg = None
+        return view.get_queryset()
@@ -0,0 +1,106 @@
+# products/management/commands/fetch_product_images.py
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from backend import storage
+from products.models import ProductImage, ProductImageFetch
+
+MAX_ATTEMPTS = 5
+# A failed fetch waits RETRY_BACKOFF_SECONDS * 2^(attempts - 1), capped
+RETRY_BACKOFF_SECONDS = 60
+MAX_RETRY_BACKOFF_SECONDS = 3600
+
+
+def retry_delay(attempts):
+    """Backoff before the next try: base * 2^(attempts - 1), capped."""
+    delay = RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, MAX_RETRY_BACKOFF_SECONDS))
+
+
+class Command(BaseCommand):
+    help = "Upload queued remote product images (from bulk imports) to Cloudinary"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new work")
+        parser.add_argument('--interval', type=float, default=10, help="Seconds between polls with --loop")
+        parser.add_argument('--lease', type=int, default=900,
+                            help="Seconds a claimed batch stays reserved for this worker")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.process_batch(options['batch_size'], options['lease'])
+            if processed:
+                self.stdout.write(f"Processed {processed} image fetches")
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
+
+    def process_batch(self, batch_size, lease):
+        fetches = self.claim(batch_size, lease)
+        # The remote fetch and the upload can be slow: no locks or
+        # transaction are held while they run
+        for fetch in fetches:
+            self.process(fetch)
+        return len(fetches)
+
+    def claim(self, batch_size, lease):
+        """Lease a batch of pending fetches to this worker, counting the attempt."""
+        now = timezone.now()
+        with transaction.atomic():
+            # skip_locked lets several workers claim at the same time
+            available = (
+                ProductImageFetch.objects.select_for_update(skip_locked=True)
+                .filter(Q(leased_until__isnull=True) | Q(leased_until__lt=now),
+                        status=ProductImageFetch.STATUS_PENDING)
+            )
+            fetches = list(available.order_by('id')[:batch_size])
+            ProductImageFetch.objects.filter(pk__in=[fetch.pk for fetch in fetches]).update(
+                leased_until=now + timedelta(seconds=lease), attempts=F('attempts') + 1, updated_at=now,
+            )
+        for fetch in fetches:
+            fetch.attempts += 1
+        return fetches
+
+    def process(self, fetch):
+        fetch.leased_until = None
+        if fetch.attempts > MAX_ATTEMPTS:
+            # Claimed too often without finishing: the worker died on it
+            fetch.status = ProductImageFetch.STATUS_FAILED
+            fetch.last_error = fetch.last_error or "Worker stopped while processing"
+            fetch.save(update_fields=['leased_until', 'last_error', 'status', 'updated_at'])
+            return
+
+        try:
+            # Cloudinary downloads the remote URL itself
+            upload_result = storage.upload(
+                fetch.source_url,
+                folder="bongoshop/products",
+                transformation=[
+                    {'width': 1000, 'height': 1000, 'crop': 'limit'},
+                    {'quality': "auto"},
+                    {'fetch_format': "auto"}
+                ]
+            )
+        except Exception as e:
+            fetch.last_error = str(e)
+            if fetch.attempts >= MAX_ATTEMPTS:
+                fetch.status = ProductImageFetch.STATUS_FAILED
+            else:
+                # Not claimed again until then
+                fetch.leased_until = timezone.now() + retry_delay(fetch.attempts)
+            fetch.save(update_fields=['leased_until', 'last_error', 'status', 'updated_at'])
+            return
+
+        with transaction.atomic():
+            ProductImage.objects.filter(pk=fetch.image_id).update(image_url=upload_result['secure_url'])
+            fetch.status = ProductImageFetch.STATUS_DONE
+            fetch.last_error = ''
+            fetch.save(update_fields=['leased_until', 'last_error', 'status', 'updated_at'])
@@ -0,0 +1,44 @@
+# products/management/commands/import_products.py
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import DEFAULT_BATCH_SIZE, FORMATS, guess_format, import_products
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or JSONL file of products into a seller's catalogue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file to import")
+        parser.add_argument('--seller', required=True, help="Email of the seller who owns the products")
+        parser.add_argument('--format', choices=FORMATS, help="File format (default: from the extension)")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            seller = User.objects.get(email=options['seller'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['seller']}")
+
+        fmt = options['format'] or guess_format(options['path'])
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format")
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = import_products(fileobj, fmt, seller, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report.errors:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if report.failed > len(report.errors):
+            self.stderr.write(f"... {report.failed - len(report.errors)} more failed rows not shown")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.rows} rows read, {report.created} products created, "
+            f"{report.failed} failed, {report.images_queued} images queued for fetch"
+        ))
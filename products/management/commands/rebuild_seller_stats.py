@@ -0,0 +1,57 @@
+# products/management/commands/rebuild_seller_stats.py
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from products.models import Product, Rating, Reel, ReelLike, SellerStats
+
+STAT_FIELDS = ('active_product_count', 'rating_count', 'rating_sum',
+               'reel_views', 'reel_likes', 'reel_shares')
+
+
+class Command(BaseCommand):
+    help = "Recompute SellerStats from products, ratings, reels and likes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', type=int, action='append', dest='sellers',
+                            help="Only rebuild these seller ids (repeatable)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        sellers = options['sellers']
+        stats = defaultdict(dict)
+
+        def collect(queryset, seller_field, **aggregates):
+            if sellers:
+                queryset = queryset.filter(**{f'{seller_field}__in': sellers})
+            rows = queryset.values(seller_field).annotate(**aggregates).order_by()
+            for row in rows:
+                seller_id = row.pop(seller_field)
+                stats[seller_id].update({k: v or 0 for k, v in row.items()})
+
+        # One grouped query per source table
+        collect(Product.objects.all(), 'seller_id', active_product_count=Count('id'))
+        collect(Rating.objects.all(), 'product__seller_id',
+                rating_count=Count('id'), rating_sum=Sum('rating'))
+        collect(Reel.all_objects.all(), 'seller_id',
+                reel_views=Sum('views_count'), reel_shares=Sum('shares_count'))
+        collect(ReelLike.objects.all(), 'reel__seller_id', reel_likes=Count('id'))
+
+        rows = [SellerStats(seller_id=seller_id, **values) for seller_id, values in stats.items()]
+        with transaction.atomic():
+            # Sellers with no remaining activity are dropped rather than zeroed
+            stale = SellerStats.objects.exclude(seller_id__in=stats.keys())
+            if sellers:
+                stale = stale.filter(seller_id__in=sellers)
+            removed, _ = stale.delete()
+            SellerStats.objects.bulk_create(
+                rows, batch_size=options['batch_size'],
+                update_conflicts=True, unique_fields=['seller'], update_fields=STAT_FIELDS,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt stats for {len(rows)} sellers ({removed} stale rows removed)"
+        ))
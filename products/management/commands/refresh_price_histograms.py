@@ -0,0 +1,16 @@
+# products/management/commands/refresh_price_histograms.py
+
+from django.core.management.base import BaseCommand
+
+from products.pricing import refresh_histograms
+
+
+class Command(BaseCommand):
+    help = "Rebuild the price histograms used by price sliders and the list view planner"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buckets', type=int, help="Buckets per histogram (default: PRICE_HISTOGRAM_BUCKETS)")
+
+    def handle(self, *args, **options):
+        histograms = refresh_histograms(options['buckets'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {len(histograms)} price histograms"))
@@ -0,0 +1,17 @@
+# products/management/commands/refresh_related_products.py
+
+from django.core.management.base import BaseCommand
+
+from products.related import refresh_related
+
+
+class Command(BaseCommand):
+    help = "Compute the related-products lists of new products (or of all products with --full)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild every list")
+        parser.add_argument('--size', type=int, help="Products per list (default: RELATED_PRODUCTS_SIZE)")
+
+    def handle(self, *args, **options):
+        written = refresh_related(full=options['full'], size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} related-product lists"))
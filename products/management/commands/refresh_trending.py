@@ -0,0 +1,16 @@
+# products/management/commands/refresh_trending.py
+
+from django.core.management.base import BaseCommand
+
+from products.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = "Aggregate recent engagement into hourly buckets and rebuild the trending lists"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, help="Items per list (default: TRENDING_SIZE)")
+
+    def handle(self, *args, **options):
+        buckets, items = refresh_trending(size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {buckets} hourly buckets, {items} trending entries"))
@@ -0,0 +1,20 @@
+# products/management/commands/rollup_daily_stats.py
+
+from django.core.management.base import BaseCommand
+
+from products.analytics import rollup_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Update the per-item daily rollups behind seller analytics"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="Recompute every day of product ratings (picks up deleted ratings)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Events per transaction")
+
+    def handle(self, *args, **options):
+        events, rows = rollup_daily_stats(options['full'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {events} engagement events, rewrote {rows} product-day rows"
+        ))
@@ -0,0 +1,17 @@
+# products/management/commands/rollup_engagement.py
+
+from django.core.management.base import BaseCommand
+
+from products.events import buffer, rollup_events
+
+
+class Command(BaseCommand):
+    help = "Fold new reel engagement events into the Reel counters (run every minute or so)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Events per transaction")
+
+    def handle(self, *args, **options):
+        buffer.flush()
+        applied = rollup_events(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Applied {applied} engagement events"))
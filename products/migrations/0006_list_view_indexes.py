@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-18 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_reel_phone_number'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='product_active_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['region', '-created_at'], name='product_active_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['condition', '-created_at'], name='product_active_cond_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price'], name='product_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['seller', '-created_at'], name='product_seller_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['product', 'created_at'], name='productimage_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['product', '-created_at'], name='rating_product_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reel',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='reel_active_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reel',
+            index=models.Index(fields=['seller', '-created_at'], name='reel_seller_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reelcomment',
+            index=models.Index(fields=['reel', '-created_at'], name='reelcomment_reel_recent_idx'),
+        ),
+    ]
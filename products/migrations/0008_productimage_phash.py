@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-19 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_productimagefetch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='phash',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='phash_band0',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='phash_band1',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='phash_band2',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='phash_band3',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 6.0 on 2026-10-19 11:40
+
+import re
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Frozen copy of products.regions.region_key
+def region_key(value):
+    return re.sub(r'[\s\-_.,]+', ' ', value or '').strip().casefold()
+
+
+def canonicalize_regions(apps, schema_editor):
+    """
+    Group existing spellings by key, name each Region after its most used
+    spelling and point products at it (one UPDATE per distinct spelling).
+    """
+    Product = apps.get_model('products', 'Product')
+    Region = apps.get_model('products', 'Region')
+
+    spellings = defaultdict(Counter)
+    raw_values = defaultdict(list)
+    for value, count in Product.objects.values_list('region').annotate(n=Count('id')).order_by():
+        key = region_key(value)
+        if key:
+            spellings[key][' '.join(value.split())] += count
+            raw_values[key].append(value)
+
+    for key, counts in spellings.items():
+        name = counts.most_common(1)[0][0]
+        region = Region.objects.create(key=key, name=name)
+        Product.objects.filter(region__in=raw_values[key]).update(region_ref=region, region=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_sellerstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Region',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_region_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='region_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='products', to='products.region'),
+        ),
+        migrations.RunPython(canonicalize_regions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['region_ref', '-created_at'], name='product_active_region_idx'),
+        ),
+    ]
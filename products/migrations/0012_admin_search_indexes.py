@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 13:05
+
+from django.db import migrations
+
+# Django's icontains / iexact compare UPPER(column::text) on PostgreSQL, so
+# the indexes are built on that exact expression.
+INDEXES = [
+    ('product_name_trgm_idx', 'products_product', 'USING gin (UPPER(name::text) gin_trgm_ops)'),
+    ('product_phone_upper_idx', 'products_product', '(UPPER(phone_number::text))'),
+    ('reel_title_trgm_idx', 'products_reel', 'USING gin (UPPER(title::text) gin_trgm_ops)'),
+    ('reelcomment_text_trgm_idx', 'products_reelcomment', 'USING gin (UPPER("text"::text) gin_trgm_ops)'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, definition in INDEXES:
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('products', '0011_pricehistogram'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_plays(apps, schema_editor):
+    # Until now every GET was counted in views_count
+    Reel = apps.get_model('products', 'Reel')
+    Reel.objects.update(plays_count=models.F('views_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_soft_delete_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReelViewerSketch',
+            fields=[
+                ('reel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='viewer_sketch', serialize=False, to='products.reel')),
+                ('registers', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='reel',
+            name='plays_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reel',
+            name='unique_viewers',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_plays, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-19 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_reel_view_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EngagementBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(choices=[('product', 'Product'), ('reel', 'Reel')], max_length=10)),
+                ('item_id', models.BigIntegerField()),
+                ('hour', models.DateTimeField()),
+                ('score', models.PositiveIntegerField()),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.region')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='engagementbucket_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item_type', 'item_id', 'hour'), name='engagementbucket_item_hour_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(choices=[('product', 'Product'), ('reel', 'Reel')], max_length=10)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('item_id', models.BigIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.region')),
+            ],
+            options={
+                'ordering': ['item_type', 'region', 'rank'],
+                'indexes': [models.Index(fields=['item_type', 'region', 'rank'], name='trendingitem_lookup_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_engagement_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyItemStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(choices=[('product', 'Product'), ('reel', 'Reel')], max_length=10)),
+                ('item_id', models.BigIntegerField()),
+                ('seller_id', models.BigIntegerField()),
+                ('day', models.DateField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('shares', models.PositiveIntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('ratings', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'daily item stats',
+                'indexes': [models.Index(fields=['seller_id', 'day'], include=('item_type', 'item_id', 'plays', 'views', 'likes', 'shares', 'comments', 'ratings', 'rating_sum'), name='dailyitemstats_seller_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item_type', 'item_id', 'day'), name='dailyitemstats_item_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 15:05
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_related_products'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='engagementevent',
+            name='inserted_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), editable=False),
+        ),
+    ]
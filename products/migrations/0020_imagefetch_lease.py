@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_engagementevent_inserted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimagefetch',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 6.0 on 2026-10-19 15:55
+
+from django.db import migrations, models
+
+# Built concurrently on PostgreSQL so products_product and products_reel
+# keep taking writes; the new price index is built before the old one is
+# dropped, so price queries are never left without one.
+OLD_PRICE_INDEX = models.Index(fields=['is_active', 'price', 'id'], name='product_price_keyset_idx')
+PRICE_INDEX = models.Index(condition=models.Q(('is_active', True)), fields=['price', 'id'],
+                           name='product_price_keyset_idx')
+ARCHIVAL_INDEXES = [
+    ('product', models.Index(condition=models.Q(('is_active', False)), fields=['updated_at'],
+                             name='product_inactive_updated_idx')),
+    ('reel', models.Index(condition=models.Q(('is_active', False)), fields=['updated_at'],
+                          name='reel_inactive_updated_idx')),
+]
+BUILDING_NAME = 'product_price_keyset_new'
+
+
+def _swap_price_index(apps, schema_editor, old, new):
+    Product = apps.get_model('products', 'Product')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.remove_index(Product, old)
+        schema_editor.add_index(Product, new)
+        return
+    building = models.Index(fields=new.fields, condition=new.condition, name=BUILDING_NAME)
+    # Left behind by an interrupted run, possibly invalid
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {BUILDING_NAME}')
+    schema_editor.add_index(Product, building, concurrently=True)
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {old.name}')
+    schema_editor.execute(f'ALTER INDEX {BUILDING_NAME} RENAME TO {new.name}')
+
+
+def _archival_indexes(apps, schema_editor, add):
+    concurrently = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    for model_name, index in ARCHIVAL_INDEXES:
+        model = apps.get_model('products', model_name)
+        if add:
+            schema_editor.add_index(model, index, **concurrently)
+        else:
+            schema_editor.remove_index(model, index, **concurrently)
+
+
+def forwards(apps, schema_editor):
+    _swap_price_index(apps, schema_editor, OLD_PRICE_INDEX, PRICE_INDEX)
+    _archival_indexes(apps, schema_editor, add=True)
+
+
+def backwards(apps, schema_editor):
+    _archival_indexes(apps, schema_editor, add=False)
+    _swap_price_index(apps, schema_editor, PRICE_INDEX, OLD_PRICE_INDEX)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('products', '0020_imagefetch_lease'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(model_name='product', name='product_price_keyset_idx'),
+                migrations.AddIndex(model_name='product', index=PRICE_INDEX),
+                *[migrations.AddIndex(model_name=model_name, index=index) for model_name, index in ARCHIVAL_INDEXES],
+            ],
+            database_operations=[migrations.RunPython(forwards, backwards)],
+        ),
+    ]
@@ -1,8 +1,56 @@
 # products/models.py
 
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Coalesce, Now
+
+
+class Region(models.Model):
+    """
+    Canonical region. `key` is the normalized spelling (see
+    products.regions.region_key) that free-text input is matched on.
+    """
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_rating_stats(self):
+        """
+        Annotate rating_avg and rating_count with correlated subqueries, so
+        only the rows actually fetched (e.g. one admin page) are aggregated.
+        """
+        ratings = Rating.objects.filter(product=models.OuterRef('pk')).order_by().values('product')
+        return self.annotate(
+            rating_avg=models.Subquery(ratings.annotate(avg=models.Avg('rating')).values('avg')),
+            rating_count=Coalesce(
+                models.Subquery(ratings.annotate(count=models.Count('id')).values('count')), 0
+            ),
+        )
+
+    def with_primary_image(self):
+        """Annotate primary_image_url (first image), so listings need no query per product."""
+        images = ProductImage.objects.filter(product=models.OuterRef('pk')).order_by('created_at', 'id')
+        return self.annotate(primary_image_url=models.Subquery(images.values('image_url')[:1]))
+
+
+class ActiveManager(models.Manager):
+    """
+    Default manager of soft-deleted models: rows with is_active=False are
+    hidden everywhere except through `all_objects` (sellers' own listings,
+    admin, archival).
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
 
 
 class Product(models.Model):
@@ -18,22 +66,56 @@ class Product(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    region = models.CharField(max_length=100)
+    region = models.CharField(max_length=100)  # Canonical name of region_ref
+    region_ref = models.ForeignKey(Region, on_delete=models.PROTECT, null=True, blank=True,
+                                   related_name='products')
     condition = models.CharField(max_length=20, choices=CONDITION_CHOICES)
     phone_number = models.CharField(max_length=20)
     image_url = models.URLField(blank=True, null=True)  # Keep for backward compatibility
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+
+    objects = ActiveManager.from_queryset(ProductQuerySet)()
+    all_objects = ProductQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Public listings only ever read active rows, newest first.
+            models.Index(fields=['-created_at'], name='product_active_recent_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['region_ref', '-created_at'], name='product_active_region_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['condition', '-created_at'], name='product_active_cond_idx',
+                         condition=models.Q(is_active=True)),
+            # Price range filters and ?sort=price keyset pagination
+            models.Index(fields=['price', 'id'], name='product_price_keyset_idx',
+                         condition=models.Q(is_active=True)),
+            # Seller storefront and "my products"
+            models.Index(fields=['seller', '-created_at'], name='product_seller_recent_idx'),
+            # Archival scans (archive_inactive) only read deactivated rows
+            models.Index(fields=['updated_at'], name='product_inactive_updated_idx',
+                         condition=models.Q(is_active=False)),
+        ]
     
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.region and (update_fields is None or 'region' in update_fields):
+            from .regions import region_directory
+            self.region_ref_id, self.region = region_directory.resolve(self.region)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'region_ref'}
+        super().save(*args, **kwargs)
     
     @property
     def average_rating(self):
+        # rating_avg / rating_count are annotated by with_rating_stats()
+        if hasattr(self, 'rating_avg'):
+            return round(self.rating_avg, 2) if self.rating_avg else 0
         ratings = self.ratings.all()
         if ratings.exists():
             return round(sum(r.rating for r in ratings) / ratings.count(), 2)
@@ -41,22 +123,86 @@ class Product(models.Model):
     
     @property
     def total_ratings(self):
+        if hasattr(self, 'rating_count'):
+            return self.rating_count
         return self.ratings.count()
     
     @property
     def primary_image(self):
         """Get the first image or fall back to image_url"""
+        if hasattr(self, 'primary_image_url'):
+            return self.primary_image_url or self.image_url
         first_image = self.images.first()
         return first_image.image_url if first_image else self.image_url
 
 
+class PriceHistogram(models.Model):
+    """
+    Equal-width histogram of active product prices for one region and
+    condition; a null region or blank condition means "any". Rebuilt by
+    `refresh_price_histograms` (products/pricing.py).
+    """
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='price_histograms')
+    condition = models.CharField(max_length=20, blank=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2)
+    bucket_counts = models.JSONField(default=list)
+    total_count = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['region', 'condition'], name='pricehistogram_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"Prices for {self.region or 'all regions'} / {self.condition or 'any condition'}"
+
+    @property
+    def bucket_width(self):
+        return (float(self.max_price) - float(self.min_price)) / max(len(self.bucket_counts), 1)
+
+    def buckets(self):
+        """(low, high, count) for each bucket."""
+        low, width = float(self.min_price), self.bucket_width
+        return [
+            (round(low + i * width, 2), round(low + (i + 1) * width, 2), count)
+            for i, count in enumerate(self.bucket_counts)
+        ]
+
+    def estimate(self, min_price=None, max_price=None):
+        """Estimated number of products priced within [min_price, max_price]."""
+        lo = float('-inf') if min_price is None else float(min_price)
+        hi = float('inf') if max_price is None else float(max_price)
+        total = 0.0
+        for low, high, count in self.buckets():
+            if high <= low:  # single-price histogram
+                total += count if lo <= low <= hi else 0
+                continue
+            overlap = min(hi, high) - max(lo, low)
+            if overlap > 0:
+                total += count * overlap / (high - low)
+        return int(round(total))
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image_url = models.URLField()
+    # 64-bit perceptual hash (stored signed) and its four 16-bit bands, each
+    # indexed for near-duplicate lookups (see products/duplicates.py)
+    phash = models.BigIntegerField(blank=True, null=True, db_index=True)
+    phash_band0 = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    phash_band1 = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    phash_band2 = models.PositiveIntegerField(blank=True, null=True, db_index=True)
+    phash_band3 = models.PositiveIntegerField(blank=True, null=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='productimage_product_idx'),
+        ]
     
     def __str__(self):
         return f"Image for {self.product.name}"
@@ -73,6 +219,9 @@ class Rating(models.Model):
     class Meta:
         unique_together = ('product', 'buyer')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', '-created_at'], name='rating_product_recent_idx'),
+        ]
     
     def __str__(self):
         return f'{self.buyer.email} rated {self.product.name} - {self.rating} stars'
@@ -89,7 +238,9 @@ class Reel(models.Model):
     video_url = models.URLField()
     thumbnail_url = models.URLField(blank=True, null=True)
     duration = models.IntegerField(default=0)  # in seconds
-    views_count = models.IntegerField(default=0)
+    views_count = models.IntegerField(default=0)  # Deduplicated per viewer (REEL_VIEW_DEDUP_SECONDS)
+    plays_count = models.IntegerField(default=0)  # Every play, replays included
+    unique_viewers = models.IntegerField(default=0)  # Estimate from ReelViewerSketch
     likes_count = models.IntegerField(default=0)
     comments_count = models.IntegerField(default=0)
     shares_count = models.IntegerField(default=0)  # Added share count
@@ -98,9 +249,19 @@ class Reel(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     phone_number = models.CharField(max_length=20, blank=True)  # ← ADD THIS LINE if it's missing
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='reel_active_recent_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['seller', '-created_at'], name='reel_seller_recent_idx'),
+            # Archival scans (archive_inactive) only read deactivated rows
+            models.Index(fields=['updated_at'], name='reel_inactive_updated_idx',
+                         condition=models.Q(is_active=False)),
+        ]
     
     def __str__(self):
         return self.title
@@ -127,6 +288,300 @@ class ReelComment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['reel', '-created_at'], name='reelcomment_reel_recent_idx'),
+        ]
     
     def __str__(self):
-        return f'{self.user.email} commented on {self.reel.title}'
\ No newline at end of file
+        return f'{self.user.email} commented on {self.reel.title}'
+
+class ReelViewerSketch(models.Model):
+    """
+    HyperLogLog registers (products/sketches.py) of everyone who has viewed
+    a reel; Reel.unique_viewers caches its estimate. Kept out of the Reel
+    row so listings never load it.
+    """
+    reel = models.OneToOneField(Reel, on_delete=models.CASCADE, primary_key=True,
+                                related_name='viewer_sketch')
+    registers = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Viewer sketch of reel {self.reel_id}'
+
+
+class ProductImageFetch(models.Model):
+    """
+    Queue of remote image URLs waiting to be uploaded to Cloudinary.
+    A worker claims pending rows by setting leased_until, then fetches and
+    uploads with no transaction open; rows whose lease ran out (a worker
+    died) are claimed again. A failed fetch keeps a lease for its retry
+    backoff.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    image = models.ForeignKey(ProductImage, on_delete=models.CASCADE, related_name='fetches')
+    source_url = models.URLField(max_length=500)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['id'], name='imagefetch_pending_idx',
+                         condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f'{self.status} fetch of {self.source_url}'
+
+
+class EngagementBucket(models.Model):
+    """
+    Weighted engagement (likes, comments, ratings) of one product or reel
+    during one hour. Maintained by `refresh_trending` (products/trending.py)
+    for the last TRENDING_WINDOW_HOURS only.
+    """
+    ITEM_PRODUCT = 'product'
+    ITEM_REEL = 'reel'
+    ITEM_CHOICES = [(ITEM_PRODUCT, 'Product'), (ITEM_REEL, 'Reel')]
+
+    item_type = models.CharField(max_length=10, choices=ITEM_CHOICES)
+    item_id = models.BigIntegerField()
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    hour = models.DateTimeField()
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item_type', 'item_id', 'hour'], name='engagementbucket_item_hour_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['hour'], name='engagementbucket_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.item_type} {self.item_id} at {self.hour:%Y-%m-%d %H}:00: {self.score}'
+
+
+class TrendingItem(models.Model):
+    """
+    Precomputed top-K trending products (per region, and for all regions
+    when region is null) and reels (all regions only: reels have no region).
+    """
+    item_type = models.CharField(max_length=10, choices=EngagementBucket.ITEM_CHOICES)
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    item_id = models.BigIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['item_type', 'region', 'rank']
+        indexes = [
+            models.Index(fields=['item_type', 'region', 'rank'], name='trendingitem_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f'#{self.rank} {self.item_type} {self.item_id}'
+
+
+class EngagementEvent(models.Model):
+    """
+    Append-only log of reel engagement, buffered and written in batches by
+    products.events; `rollup_engagement` folds it into the Reel counters.
+    Ids are plain integers, not foreign keys: the log outlives the reels and
+    users it mentions, and inserts skip the constraint checks.
+    """
+    PLAY = 1
+    VIEW = 2
+    LIKE = 3
+    UNLIKE = 4
+    SHARE = 5
+    COMMENT = 6
+    UNCOMMENT = 7
+    TYPE_CHOICES = [
+        (PLAY, 'Play'),
+        (VIEW, 'View'),
+        (LIKE, 'Like'),
+        (UNLIKE, 'Unlike'),
+        (SHARE, 'Share'),
+        (COMMENT, 'Comment'),
+        (UNCOMMENT, 'Comment deleted'),
+    ]
+
+    event_type = models.PositiveSmallIntegerField(choices=TYPE_CHOICES)
+    reel_id = models.BigIntegerField()
+    user_id = models.BigIntegerField(null=True, blank=True)
+    viewer = models.BigIntegerField(null=True, blank=True)  # sketches.hash64 of the viewer (views)
+    created_at = models.DateTimeField(default=timezone.now)  # When it happened
+    # When the row was written, by the database clock: a buffer flushed
+    # late writes events that happened long before
+    inserted_at = models.DateTimeField(db_default=Now(), editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='engagementevent_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_event_type_display()} of reel {self.reel_id}'
+
+
+class EventCursor(models.Model):
+    """How far a consumer of the EngagementEvent log has read (last event id)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} at event {self.position}'
+
+
+class DailyItemStats(models.Model):
+    """
+    Engagement of one product or reel on one day (in TIME_ZONE), filled by
+    `rollup_daily_stats` (products/analytics.py): reels from the
+    EngagementEvent log, products from Rating timestamps. seller_id is
+    denormalized so that a seller's time series is one range scan of the
+    (seller_id, day) index.
+    """
+    item_type = models.CharField(max_length=10, choices=EngagementBucket.ITEM_CHOICES)
+    item_id = models.BigIntegerField()
+    seller_id = models.BigIntegerField()
+    day = models.DateField()
+    plays = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+    likes = models.IntegerField(default=0)  # Net of unlikes
+    shares = models.PositiveIntegerField(default=0)
+    comments = models.IntegerField(default=0)  # Net of deleted comments
+    ratings = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'daily item stats'
+        constraints = [
+            models.UniqueConstraint(fields=['item_type', 'item_id', 'day'], name='dailyitemstats_item_day_uniq'),
+        ]
+        indexes = [
+            # Covering on PostgreSQL, so the series is an index-only scan
+            models.Index(fields=['seller_id', 'day'], name='dailyitemstats_seller_day_idx',
+                         include=['item_type', 'item_id', 'plays', 'views', 'likes', 'shares',
+                                  'comments', 'ratings', 'rating_sum']),
+        ]
+
+    def __str__(self):
+        return f'{self.item_type} {self.item_id} on {self.day}'
+
+
+class RelatedProduct(models.Model):
+    """
+    One of a product's nearest neighbours ("similar items"), ranked from 1.
+    Computed offline by `refresh_related_products` (products/related.py).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+',
+                                related_query_name='neighbour_of')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='relatedproduct_product_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'#{self.rank} for product {self.product_id}: {self.related_id}'
+
+
+class SellerStatsManager(models.Manager):
+    def apply_deltas(self, seller_id, **deltas):
+        """
+        Add `deltas` (field name -> increment) to a seller's stats row in one
+        UPDATE, creating the row if the seller has none yet.
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not seller_id or not deltas:
+            return
+        changes = {field: models.F(field) + delta for field, delta in deltas.items()}
+        if self.filter(seller_id=seller_id).update(updated_at=timezone.now(), **changes):
+            return
+        if any(delta < 0 for delta in deltas.values()):
+            # Nothing to take away from (e.g. the seller is being deleted);
+            # rebuild_seller_stats reconciles anything missed
+            return
+        try:
+            with transaction.atomic():
+                self.create(seller_id=seller_id, **deltas)
+        except IntegrityError:
+            # Created concurrently: apply the change to that row instead
+            self.filter(seller_id=seller_id).update(updated_at=timezone.now(), **changes)
+
+
+class SellerStats(models.Model):
+    """
+    Per-seller summary for the storefront, maintained incrementally by
+    products.signals and the bulk endpoints; `rebuild_seller_stats`
+    recomputes it from scratch.
+    """
+    seller = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                  primary_key=True, related_name='seller_stats')
+    active_product_count = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)
+    reel_views = models.BigIntegerField(default=0)
+    reel_likes = models.BigIntegerField(default=0)
+    reel_shares = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SellerStatsManager()
+
+    class Meta:
+        verbose_name_plural = 'seller stats'
+
+    def __str__(self):
+        return f'Stats for seller {self.seller_id}'
+
+    @property
+    def average_rating(self):
+        if self.rating_count <= 0:
+            return 0
+        return round(self.rating_sum / self.rating_count, 2)
+
+
+class ArchivedRecord(models.Model):
+    """
+    A row moved out of the hot tables by `archive_inactive`: a deactivated
+    product or reel, or one of its images, ratings, likes or comments, as
+    Django's serialized field values. `root` ties children to the product
+    or reel they were archived with.
+    """
+    model = models.CharField(max_length=50)  # app_label.model_name
+    object_id = models.BigIntegerField()
+    root_model = models.CharField(max_length=50)
+    root_id = models.BigIntegerField()
+    seller_id = models.BigIntegerField()  # not a FK: archives outlive accounts
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['root_model', 'root_id'], name='archivedrecord_root_idx'),
+            models.Index(fields=['seller_id', 'archived_at'], name='archivedrecord_seller_idx'),
+        ]
+
+    def __str__(self):
+        return f'Archived {self.model} #{self.object_id}'
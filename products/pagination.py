@@ -0,0 +1,81 @@
+# products/pagination.py
+import base64
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PriceKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (price, id), served by product_price_keyset_idx.
+
+    The cursor is the (price, id) of the last row on the page, so every page
+    costs one index range scan no matter how deep the client scrolls.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, descending=False):
+        self.descending = descending
+        self.ordering = ('-price', '-id') if descending else ('price', 'id')
+
+    def encode_cursor(self, product):
+        raw = f"{product.price}:{product.id}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, value):
+        try:
+            price, pk = base64.urlsafe_b64decode(value.encode()).decode().split(':')
+            return Decimal(price), int(pk)
+        except (ValueError, InvalidOperation, UnicodeDecodeError):
+            raise ValidationError({self.cursor_query_param: "Invalid cursor"})
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, settings.PRICE_SORT_PAGE_SIZE))
+        except ValueError:
+            size = settings.PRICE_SORT_PAGE_SIZE
+        return max(1, min(size, settings.PRICE_SORT_MAX_PAGE_SIZE))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            price, pk = self.decode_cursor(cursor)
+            if self.descending:
+                queryset = queryset.filter(Q(price__lt=price) | Q(price=price, id__lt=pk))
+            else:
+                queryset = queryset.filter(Q(price__gt=price) | Q(price=price, id__gt=pk))
+
+        # One extra row tells us whether there is a next page
+        rows = list(queryset[:page_size + 1])
+        self.page = rows[:page_size]
+        self.has_next = len(rows) > page_size
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
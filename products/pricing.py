@@ -0,0 +1,126 @@
+# products/pricing.py
+"""
+Price histograms and the price-range query plan for ProductListView.
+
+Histograms are rebuilt periodically (refresh_price_histograms) for every
+region x condition cell plus the "any region" / "any condition" rollups,
+with one grouped query for the bounds and one streamed pass over prices.
+They feed client price sliders and let the list view pick an access path
+from the cells matching its region and condition filters: narrow ranges
+are read through the partial (price, id) index and then
+loaded by primary key, wide ones are left to the region/recency indexes.
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import PriceHistogram, Product
+
+CACHE_KEY = 'price_histogram:{version}:{region_id}:{condition}'
+VERSION_KEY = 'price_histogram_version'
+CACHE_TIMEOUT = 24 * 60 * 60
+_MISSING = 'missing'
+
+
+def _cells(region_id, condition):
+    # The cell itself and the rollups it contributes to
+    return ((region_id, condition), (region_id, ''), (None, condition), (None, ''))
+
+
+def build_histograms(bucket_count=None):
+    """Compute (unsaved) PriceHistogram rows from the active products."""
+    bucket_count = bucket_count or settings.PRICE_HISTOGRAM_BUCKETS
+    active = Product.objects.all()
+
+    bounds = {}
+    groups = active.values('region_ref_id', 'condition').annotate(lo=Min('price'), hi=Max('price')).order_by()
+    for group in groups:
+        for cell in _cells(group['region_ref_id'], group['condition']):
+            lo, hi = bounds.get(cell, (group['lo'], group['hi']))
+            bounds[cell] = (min(lo, group['lo']), max(hi, group['hi']))
+
+    counts = defaultdict(lambda: [0] * bucket_count)
+    for region_id, condition, price in active.values_list('region_ref_id', 'condition', 'price').iterator(
+            chunk_size=5000):
+        for cell in _cells(region_id, condition):
+            lo, hi = bounds[cell]
+            width = (hi - lo) / bucket_count
+            index = int((price - lo) / width) if width else 0
+            counts[cell][min(index, bucket_count - 1)] += 1
+
+    now = timezone.now()
+    return [
+        PriceHistogram(region_id=region_id, condition=condition, min_price=lo, max_price=hi,
+                       bucket_counts=counts[(region_id, condition)],
+                       total_count=sum(counts[(region_id, condition)]), refreshed_at=now)
+        for (region_id, condition), (lo, hi) in bounds.items()
+    ]
+
+
+def refresh_histograms(bucket_count=None):
+    histograms = build_histograms(bucket_count)
+    with transaction.atomic():
+        PriceHistogram.objects.all().delete()
+        PriceHistogram.objects.bulk_create(histograms)
+    # A new version retires every cached cell, including ones now empty
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+    return histograms
+
+
+def get_histogram(region_id=None, condition=''):
+    """Latest histogram for a cell, or None if it has no active products."""
+    key = CACHE_KEY.format(version=cache.get(VERSION_KEY, 0),
+                           region_id=region_id or 'all', condition=condition or 'any')
+    histogram = cache.get(key)
+    if histogram is None:
+        histogram = (
+            PriceHistogram.objects.filter(region_id=region_id, condition=condition)
+            .order_by('-refreshed_at').first()
+        ) or _MISSING
+        cache.set(key, histogram, timeout=CACHE_TIMEOUT)
+    return None if histogram == _MISSING else histogram
+
+
+def estimate_rows(min_price=None, max_price=None, region_ids=None, condition=''):
+    """
+    Estimated active products in a price range, from the histogram cells
+    matching the region and condition filters. Falls back to the global
+    histogram when none of those cells has one; None without histograms.
+    """
+    cells = [get_histogram(region_id, condition) for region_id in region_ids or [None]]
+    histograms = [histogram for histogram in cells if histogram is not None]
+    if not histograms:
+        histograms = [histogram for histogram in [get_histogram()] if histogram is not None]
+    if not histograms:
+        return None
+    return sum(histogram.estimate(min_price, max_price) for histogram in histograms)
+
+
+def plan_price_range(queryset, min_price=None, max_price=None, region_ids=None, condition=''):
+    """
+    Apply a price range to a product queryset already filtered on
+    region_ids and condition, choosing the access path from the estimate of
+    matching rows for that region and condition.
+    """
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+
+    estimate = estimate_rows(min_price, max_price, region_ids, condition)
+    limit = settings.PRICE_INDEX_MAX_ROWS
+    if estimate is None or estimate > limit:
+        return queryset
+
+    # Walking the price index in order reads only the rows in range; the
+    # rest of the query then becomes a primary key lookup
+    ids = list(queryset.order_by('price', 'id').values_list('id', flat=True)[:limit + 1])
+    if len(ids) > limit:
+        # Histogram is stale; let the database plan the full filter
+        return queryset
+    return queryset.filter(id__in=ids)
@@ -0,0 +1,46 @@
+# products/reel_views.py
+"""
+Reel view counting.
+
+Every GET of a reel is a play, but only the first one per viewer within
+REEL_VIEW_DEDUP_SECONDS is a view. Both are recorded in the engagement event
+log (products/events.py), so a request writes nothing to the Reel row;
+`rollup_engagement` updates plays_count, views_count and the per-reel
+HyperLogLog sketch behind unique_viewers.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from . import events
+from .models import EngagementEvent
+from .sketches import hash64
+
+SEEN_KEY = 'reel_seen_{reel_id}_{viewer}'
+
+
+def viewer_key(request):
+    """Stable viewer identity: the user, or the client IP when anonymous."""
+    if request.user and request.user.is_authenticated:
+        return f'user{request.user.pk}'
+    ident = BaseThrottle().get_ident(request) or ''
+    # Hashed so IPs don't end up in cache keys or sketch inputs as-is
+    return 'anon' + hashlib.blake2b(ident.encode(), digest_size=8).hexdigest()
+
+
+def record_play(reel, viewer, user_id=None):
+    """
+    Record one play of `reel` by `viewer`, and a view if the viewer hasn't
+    seen it within the window. The instance's counters are bumped so the
+    response reflects the play. Returns True if it was a view.
+    """
+    events.record(EngagementEvent.PLAY, reel.pk, user_id)
+    reel.plays_count += 1
+    if not cache.add(SEEN_KEY.format(reel_id=reel.pk, viewer=viewer), 1,
+                     timeout=settings.REEL_VIEW_DEDUP_SECONDS):
+        return False
+    events.record(EngagementEvent.VIEW, reel.pk, user_id, viewer=hash64(viewer))
+    reel.views_count += 1
+    return True
@@ -0,0 +1,98 @@
+# products/regions.py
+"""
+In-process dictionary of canonical regions.
+
+Products store a foreign key to Region; free-text region input (API, imports,
+bulk actions, list filters) is matched through this dictionary so that
+"Dar es Salaam", "dar-es-salaam" and "DAR ES SALAAM " all map to one id
+without a query. The dictionary is loaded on first use, extended on misses
+and dropped whenever a Region row changes (products.signals).
+"""
+import re
+import threading
+
+from django.db import IntegrityError, connection, transaction
+
+from .models import Region
+
+_SEPARATORS = re.compile(r'[\s\-_.,]+')
+
+
+def region_key(value):
+    """Normalized matching key for a region spelling."""
+    return _SEPARATORS.sub(' ', value or '').strip().casefold()
+
+
+def region_display_name(value):
+    return ' '.join((value or '').split())
+
+
+class RegionDirectory:
+    """
+    Only data read outside transactions is kept, so a rolled-back region
+    never ends up in the dictionary; inside one, misses are read from the
+    database each time.
+    """
+
+    def __init__(self):
+        self._by_key = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cacheable():
+        return not connection.in_atomic_block
+
+    def _load(self, keys=None):
+        rows = Region.objects.all() if keys is None else Region.objects.filter(key__in=keys)
+        return {key: (pk, name) for pk, key, name in rows.values_list('id', 'key', 'name')}
+
+    def _entries(self):
+        entries = self._by_key
+        if entries is None:
+            if not self._cacheable():
+                return {}
+            with self._lock:
+                if self._by_key is None:
+                    self._by_key = self._load()
+                entries = self._by_key
+        return entries
+
+    def _lookup(self, keys):
+        entries = self._entries()
+        found = {key: entries[key] for key in keys if key in entries}
+        missing = set(keys) - found.keys()
+        if missing:
+            # Regions created since we loaded (possibly by another process)
+            loaded = self._load(missing)
+            found.update(loaded)
+            if loaded and self._cacheable() and entries is self._by_key:
+                entries.update(loaded)
+        return found
+
+    def invalidate(self):
+        self._by_key = None
+
+    def ids_for(self, names):
+        """Region ids matching any of `names`; unknown spellings are ignored."""
+        keys = {region_key(name) for name in names} - {''}
+        return [pk for pk, _ in self._lookup(keys).values()]
+
+    def resolve(self, name):
+        """(id, canonical name) for a region spelling, creating the region if new."""
+        key = region_key(name)
+        if not key:
+            raise ValueError("Region name is empty")
+        entry = self._lookup({key}).get(key)
+        if entry is None:
+            try:
+                with transaction.atomic():
+                    region, _ = Region.objects.get_or_create(
+                        key=key, defaults={'name': region_display_name(name)}
+                    )
+            except IntegrityError:
+                region = Region.objects.get(key=key)
+            entry = (region.pk, region.name)
+        return entry
+
+
+region_directory = RegionDirectory()
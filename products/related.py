@@ -0,0 +1,201 @@
+# products/related.py
+"""
+"Similar items": the nearest neighbours of each active product.
+
+`refresh_related_products` computes them offline. Each product becomes an
+L2-normalised TF-IDF vector of its name (counted twice) and description.
+The score between two products blends the cosine similarity of those
+vectors with whether the region matches, whether the condition matches,
+and how close the prices are as a ratio. Scores are computed with sparse
+matrix products and NumPy, one block of CHUNK_SIZE products against the
+whole catalogue at a time, and the top RELATED_PRODUCTS_SIZE of each
+product are stored as RelatedProduct rows. The endpoint then reads one
+list with a single join on the (product, rank) index.
+
+A full run rebuilds every list. An incremental run, meant to run between
+full runs, handles only the products created since the previous run. It
+gives each new product its list. It also adds the new product to existing
+lists where it now scores above their last entry, since the score is
+symmetric. The vocabulary and IDF weights are taken from the current
+catalogue on every run, so existing lists drift slightly until the next
+full run.
+
+NumPy and SciPy are imported by the functions that need them, so the web
+processes never load them.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import EventCursor, Product, RelatedProduct
+
+CURSOR = 'related_products'
+CHUNK_SIZE = 256
+
+# Score weights; a product identical in every respect scores 1
+TEXT_WEIGHT = 0.7
+PRICE_WEIGHT = 0.15
+REGION_WEIGHT = 0.1
+CONDITION_WEIGHT = 0.05
+
+_TOKEN = re.compile(r'[^\W_]{2,}')
+
+
+def _tokens(text):
+    return _TOKEN.findall(text.casefold())
+
+
+class Catalogue:
+    """The active products as arrays, row i describing product ids[i]."""
+
+    def __init__(self):
+        import numpy as np
+
+        rows = list(
+            Product.objects.order_by('id')
+            .values_list('id', 'name', 'description', 'region_ref_id', 'condition', 'price')
+        )
+        conditions = {}
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.vectors = tfidf_vectors([(row[1], row[2]) for row in rows])
+        # A product without a region matches no other product's region
+        self.regions = np.array([row[3] if row[3] is not None else -1 for row in rows], dtype=np.int64)
+        self.conditions = np.array([conditions.setdefault(row[4], len(conditions)) for row in rows],
+                                   dtype=np.int64)
+        self.log_prices = np.log1p(np.array([float(row[5]) for row in rows], dtype=np.float32))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, rows):
+        """Scores of the products at `rows` against every product, as a
+        (len(rows), len(self)) array. A product never matches itself."""
+        import numpy as np
+
+        scores = (self.vectors[rows] @ self.vectors.T).toarray()
+        scores *= TEXT_WEIGHT
+        scores += PRICE_WEIGHT * np.exp(-np.abs(self.log_prices[rows, None] - self.log_prices[None, :]))
+        scores += REGION_WEIGHT * ((self.regions[rows, None] == self.regions[None, :]) & (self.regions >= 0))
+        scores += CONDITION_WEIGHT * (self.conditions[rows, None] == self.conditions[None, :])
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+
+def tfidf_vectors(texts):
+    """L2-normalised TF-IDF rows (SciPy CSR, float32) of (name, description)
+    pairs, with sublinear term frequency and smoothed IDF."""
+    import numpy as np
+    from scipy import sparse
+
+    vocabulary = {}
+    indptr, indices, weights = [0], [], []
+    for name, description in texts:
+        for token, count in Counter(_tokens(name) * 2 + _tokens(description)).items():
+            indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            weights.append(1 + math.log(count))
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.array(weights, dtype=np.float32), np.array(indices, dtype=np.int64), np.array(indptr)),
+        shape=(len(texts), len(vocabulary)),
+    )
+    frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    matrix = matrix @ sparse.diags(np.log((1 + len(texts)) / (1 + frequency)).astype(np.float32) + 1)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+
+def top_neighbours(scores, size):
+    """(columns, scores) of the `size` best scores of each row, best first."""
+    import numpy as np
+
+    size = min(size, scores.shape[1] - 1)
+    if size <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64), np.empty((len(scores), 0), dtype=scores.dtype)
+    columns = np.argpartition(-scores, size - 1, axis=1)[:, :size]
+    best = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-best, axis=1, kind='stable')
+    return np.take_along_axis(columns, order, axis=1), np.take_along_axis(best, order, axis=1)
+
+
+def _write_lists(lists):
+    """Replace the lists of {product id: [(related id, score), ...]}."""
+    RelatedProduct.objects.filter(product_id__in=list(lists)).delete()
+    RelatedProduct.objects.bulk_create([
+        RelatedProduct(product_id=product_id, related_id=related_id, rank=rank, score=round(score, 4))
+        for product_id, neighbours in lists.items()
+        for rank, (related_id, score) in enumerate(neighbours, 1)
+    ], batch_size=1000)
+
+
+def _chunk_lists(catalogue, rows, columns, scores):
+    return {
+        int(catalogue.ids[row]): [(int(catalogue.ids[column]), float(score))
+                                  for column, score in zip(row_columns, row_scores)]
+        for row, row_columns, row_scores in zip(rows, columns, scores)
+    }
+
+
+def _merge_new(catalogue, rows, scores, first_new, size):
+    """Add the products at `rows` to the existing lists they now belong to.
+    `scores` are theirs against the catalogue; rows from first_new on are new."""
+    import numpy as np
+
+    existing = scores[:, :first_new]
+    last = dict(RelatedProduct.objects.filter(rank=size).values_list('product_id', 'score'))
+    # A list that is not full takes any product; the (rounded) stored score
+    # of a full one's last entry has to be beaten
+    threshold = np.array([last.get(int(product_id), -np.inf) for product_id in catalogue.ids[:first_new]])
+    affected = np.nonzero((existing > threshold).any(axis=0))[0]
+    if not len(affected):
+        return 0
+
+    lists = {int(catalogue.ids[column]): [] for column in affected}
+    current = RelatedProduct.objects.filter(product_id__in=list(lists)).values_list('product_id', 'related_id', 'score')
+    for product_id, related_id, score in current:
+        lists[product_id].append((related_id, score))
+    for column in affected:
+        neighbours = lists[int(catalogue.ids[column])]
+        for row in np.nonzero(existing[:, column] > threshold[column])[0]:
+            neighbours.append((int(catalogue.ids[rows[row]]), float(existing[row, column])))
+        neighbours.sort(key=lambda neighbour: -neighbour[1])
+        del neighbours[size:]
+    _write_lists(lists)
+    return len(lists)
+
+
+def refresh_related(full=False, size=None, chunk_size=CHUNK_SIZE):
+    """
+    Recompute the related-product lists: all of them, or (the default) those
+    of the products created since the previous run plus the existing lists
+    those products enter. The first run is always full. Returns the number
+    of lists written.
+    """
+    import numpy as np
+
+    size = size or settings.RELATED_PRODUCTS_SIZE
+    with transaction.atomic():
+        # Locked, so overlapping runs wait for each other
+        cursor, created = EventCursor.objects.select_for_update().get_or_create(name=CURSOR)
+        catalogue = Catalogue()
+        first_new = 0 if full or created else int(np.searchsorted(catalogue.ids, cursor.position, side='right'))
+
+        written = 0
+        for start in range(first_new, len(catalogue), chunk_size):
+            rows = np.arange(start, min(start + chunk_size, len(catalogue)))
+            scores = catalogue.scores(rows)
+            _write_lists(_chunk_lists(catalogue, rows, *top_neighbours(scores, size)))
+            written += len(rows)
+            if first_new:
+                written += _merge_new(catalogue, rows, scores, first_new, size)
+
+        if first_new == 0:
+            # Lists of products deactivated since the last full run
+            RelatedProduct.objects.filter(product__is_active=False).delete()
+        if len(catalogue):
+            cursor.position = max(cursor.position, int(catalogue.ids[-1]))
+        cursor.save(update_fields=['position', 'updated_at'])
+    return written
@@ -1,9 +1,14 @@
 # products/serializers.py
 
 from rest_framework import serializers
-from .models import Product, ProductImage, Rating, Reel, ReelComment, ReelLike
+from backend import storage
+from . import events
+from .models import EngagementEvent, Product, ProductImage, Rating, Reel, ReelComment, ReelLike, SellerStats
 from accounts.serializers import UserSerializer
-import cloudinary.uploader
+from .imaging import bytes_saved, preprocess_images
+from .duplicates import find_near_duplicates, phash_fields
+import io
+import os
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
@@ -67,14 +72,20 @@ class ProductCreateResponseSerializer(serializers.ModelSerializer):
     average_rating = serializers.ReadOnlyField()
     total_ratings = serializers.ReadOnlyField()
     ratings = RatingSerializer(many=True, read_only=True)  # ← ADDED THIS LINE
+    possible_duplicates = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = ('id', 'name', 'description', 'price', 'region', 'condition',
                   'phone_number', 'images', 'image_url', 'seller', 'average_rating',
-                  'total_ratings', 'ratings', 'created_at', 'updated_at', 'is_active')  # ← ADDED 'ratings'
+                  'total_ratings', 'ratings', 'created_at', 'updated_at', 'is_active',  # ← ADDED 'ratings'
+                  'possible_duplicates')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
+    def get_possible_duplicates(self, obj):
+        # Ids of active products sharing near-identical photos, set on create
+        return getattr(obj, 'possible_duplicates', [])
+
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     # Accept multiple uploaded image files from Flutter
@@ -99,15 +110,25 @@ class ProductCreateSerializer(serializers.ModelSerializer):
         # Set the seller automatically
         validated_data['seller'] = self.context['request'].user
 
+        # Shrink images locally first so only the resized copies are uploaded
+        try:
+            processed_images = preprocess_images(image_files)
+        except ValueError as e:
+            raise serializers.ValidationError({"images": str(e)})
+
         # Create the product
         product = Product.objects.create(**validated_data)
+        product.image_bytes_saved = bytes_saved(processed_images)
 
         # Upload images to Cloudinary if provided
         uploaded_images = []
-        for image_file in image_files:
+        for image_file, processed in zip(image_files, processed_images):
+            upload_file = io.BytesIO(processed.content)
+            name = os.path.splitext(image_file.name)[0]
+            upload_file.name = f"{name}.{processed.format.lower()}" if processed.format else image_file.name
             try:
-                upload_result = cloudinary.uploader.upload(
-                    image_file,
+                upload_result = storage.upload(
+                    upload_file,
                     folder="bongoshop/products",
                     transformation=[
                         {'width': 1000, 'height': 1000, 'crop': 'limit'},
@@ -117,7 +138,8 @@ class ProductCreateSerializer(serializers.ModelSerializer):
                 )
                 product_image = ProductImage.objects.create(
                     product=product,
-                    image_url=upload_result['secure_url']
+                    image_url=upload_result['secure_url'],
+                    **phash_fields(processed.phash)
                 )
                 uploaded_images.append(product_image)
             except Exception as e:
@@ -127,6 +149,11 @@ class ProductCreateSerializer(serializers.ModelSerializer):
                 product.delete()
                 raise serializers.ValidationError({"images": f"Upload failed: {str(e)}"})
 
+        # Reposted listings reuse the same photos; flag them for the client
+        product.possible_duplicates = find_near_duplicates(
+            [p.phash for p in processed_images], exclude_product_id=product.id
+        )
+
         return product
     
     def to_representation(self, instance):
@@ -134,6 +161,81 @@ class ProductCreateSerializer(serializers.ModelSerializer):
         return ProductCreateResponseSerializer(instance, context=self.context).data
 
 
+class ProductImportRowSerializer(ProductCreateSerializer):
+    """
+    One row of a bulk import. Same rules as ProductCreateSerializer, but images
+    are remote URLs that get fetched in the background instead of uploads.
+    """
+    images = None
+    image_urls = serializers.ListField(
+        child=serializers.URLField(max_length=500),
+        required=False,
+        max_length=10
+    )
+
+    class Meta(ProductCreateSerializer.Meta):
+        fields = (
+            'name', 'description', 'price', 'region', 'condition',
+            'phone_number', 'image_urls'
+        )
+
+    def to_internal_value(self, data):
+        # CSV rows carry image URLs as one "|"-separated column
+        image_urls = data.get('image_urls')
+        if isinstance(image_urls, str):
+            data = dict(data)
+            data['image_urls'] = [url.strip() for url in image_urls.split('|') if url.strip()]
+        return super().to_internal_value(data)
+
+
+class ProductBulkActionSerializer(serializers.Serializer):
+    ACTION_CHOICES = ('deactivate', 'reactivate', 'reprice', 'set_region')
+    MAX_IDS = 1000
+
+    action = serializers.ChoiceField(choices=ACTION_CHOICES)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_IDS
+    )
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    region = serializers.CharField(max_length=100, required=False)
+
+    def validate(self, data):
+        if data['action'] == 'reprice' and data.get('price') is None:
+            raise serializers.ValidationError({"price": "This field is required for reprice"})
+        if data['action'] == 'set_region' and not data.get('region'):
+            raise serializers.ValidationError({"region": "This field is required for set_region"})
+        # Drop duplicates but keep the caller's order for the results
+        data['ids'] = list(dict.fromkeys(data['ids']))
+        return data
+
+
+class SellerStatsSerializer(serializers.ModelSerializer):
+    average_rating = serializers.ReadOnlyField()
+
+    class Meta:
+        model = SellerStats
+        fields = ('active_product_count', 'rating_count', 'average_rating',
+                  'reel_views', 'reel_likes', 'reel_shares', 'updated_at')
+
+
+class SellerStorefrontSerializer(UserSerializer):
+    stats = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = ('id', 'shop_name', 'profile_picture_url', 'profile_picture_thumb_url',
+                  'profile_picture_medium_url', 'stats')
+
+    def get_stats(self, obj):
+        try:
+            stats = obj.seller_stats
+        except SellerStats.DoesNotExist:
+            # No tracked activity yet
+            stats = SellerStats(seller=obj)
+        return SellerStatsSerializer(stats).data
+
+
 class ReelListSerializer(serializers.ModelSerializer):
     seller = UserSerializer(read_only=True)
     is_liked = serializers.SerializerMethodField()
@@ -141,10 +243,10 @@ class ReelListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reel
         fields = ('id', 'title', 'description', 'price', 'video_url', 'thumbnail_url',
-                  'duration', 'views_count', 'likes_count', 'comments_count', 
-                  'shares_count', 'seller', 'is_liked', 'created_at', 'phone_number')
-        read_only_fields = ('id', 'views_count', 'likes_count', 'comments_count', 
-                          'shares_count', 'created_at', 'phone_number')
+                  'duration', 'views_count', 'plays_count', 'unique_viewers', 'likes_count',
+                  'comments_count', 'shares_count', 'seller', 'is_liked', 'created_at', 'phone_number')
+        read_only_fields = ('id', 'views_count', 'plays_count', 'unique_viewers', 'likes_count',
+                            'comments_count', 'shares_count', 'created_at', 'phone_number')
     
     def get_is_liked(self, obj):
         request = self.context.get('request')
@@ -170,7 +272,7 @@ class ReelCreateSerializer(serializers.ModelSerializer):
         
         try:
             # Upload video to Cloudinary
-            video_result = cloudinary.uploader.upload(
+            video_result = storage.upload(
                 video_file,
                 folder="bongoshop/reels",
                 resource_type="video",
@@ -184,7 +286,7 @@ class ReelCreateSerializer(serializers.ModelSerializer):
             
             # Upload thumbnail if provided, else use auto-generated from Cloudinary
             if thumbnail_file:
-                thumbnail_result = cloudinary.uploader.upload(
+                thumbnail_result = storage.upload(
                     thumbnail_file,
                     folder="bongoshop/reels/thumbnails",
                     transformation=[
@@ -224,9 +326,6 @@ class ReelCommentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         
-        # Increment comments count
-        reel = validated_data['reel']
-        reel.comments_count += 1
-        reel.save()
-        
-        return super().create(validated_data)
\ No newline at end of file
+        comment = super().create(validated_data)
+        events.record(EngagementEvent.COMMENT, comment.reel_id, comment.user_id)
+        return comment
\ No newline at end of file
@@ -0,0 +1,124 @@
+# products/signals.py
+"""
+Keep SellerStats in step with Product, Rating, Reel and ReelLike writes.
+
+Each instance remembers the tracked values it was loaded with (post_init), so
+a save only issues an UPDATE on the stats row when something actually moved.
+Bulk writes (bulk_create, queryset.update) bypass these signals; their callers
+apply the deltas with SellerStats.objects.apply_deltas themselves.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Product, Rating, Reel, ReelLike, Region, SellerStats
+from .regions import region_directory
+
+
+def _remember(instance, *fields):
+    # Deferred fields are missing from __dict__; leave them untracked
+    instance._stats_loaded = {f: instance.__dict__.get(f) for f in fields}
+
+
+def _loaded(instance, field):
+    return getattr(instance, '_stats_loaded', {}).get(field)
+
+
+@receiver(post_init, sender=Product)
+def remember_product(sender, instance, **kwargs):
+    _remember(instance, 'is_active')
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    was_active = False if created else _loaded(instance, 'is_active')
+    if was_active is not None and was_active != instance.is_active:
+        SellerStats.objects.apply_deltas(
+            instance.seller_id, active_product_count=1 if instance.is_active else -1
+        )
+    _remember(instance, 'is_active')
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    if instance.is_active:
+        SellerStats.objects.apply_deltas(instance.seller_id, active_product_count=-1)
+
+
+def _product_seller_id(rating):
+    if Rating.product.is_cached(rating):
+        return rating.product.seller_id
+    return Product.all_objects.filter(pk=rating.product_id).values_list('seller_id', flat=True).first()
+
+
+@receiver(post_init, sender=Rating)
+def remember_rating(sender, instance, **kwargs):
+    _remember(instance, 'rating')
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, **kwargs):
+    if created:
+        deltas = {'rating_count': 1, 'rating_sum': instance.rating}
+    else:
+        old = _loaded(instance, 'rating')
+        deltas = {'rating_sum': instance.rating - old} if old is not None else {}
+    if any(deltas.values()):
+        SellerStats.objects.apply_deltas(_product_seller_id(instance), **deltas)
+    _remember(instance, 'rating')
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, **kwargs):
+    SellerStats.objects.apply_deltas(
+        _product_seller_id(instance), rating_count=-1, rating_sum=-instance.rating
+    )
+
+
+@receiver(post_init, sender=Reel)
+def remember_reel(sender, instance, **kwargs):
+    _remember(instance, 'views_count', 'shares_count')
+
+
+@receiver(post_save, sender=Reel)
+def reel_saved(sender, instance, created, **kwargs):
+    deltas = {}
+    for field, stat in (('views_count', 'reel_views'), ('shares_count', 'reel_shares')):
+        old = 0 if created else _loaded(instance, field)
+        if old is not None:
+            deltas[stat] = getattr(instance, field) - old
+    SellerStats.objects.apply_deltas(instance.seller_id, **deltas)
+    _remember(instance, 'views_count', 'shares_count')
+
+
+@receiver(post_delete, sender=Reel)
+def reel_deleted(sender, instance, **kwargs):
+    # Likes go with the reel through the cascade and are counted below
+    SellerStats.objects.apply_deltas(
+        instance.seller_id, reel_views=-instance.views_count, reel_shares=-instance.shares_count
+    )
+
+
+def _reel_seller_id(like):
+    if ReelLike.reel.is_cached(like):
+        return like.reel.seller_id
+    return Reel.all_objects.filter(pk=like.reel_id).values_list('seller_id', flat=True).first()
+
+
+@receiver(post_save, sender=ReelLike)
+def reel_liked(sender, instance, created, **kwargs):
+    if created:
+        SellerStats.objects.apply_deltas(_reel_seller_id(instance), reel_likes=1)
+
+
+@receiver(post_delete, sender=ReelLike)
+def reel_unliked(sender, instance, **kwargs):
+    SellerStats.objects.apply_deltas(_reel_seller_id(instance), reel_likes=-1)
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+def reload_regions(sender, **kwargs):
+    # Again after commit, in case a reload saw the uncommitted row
+    region_directory.invalidate()
+    transaction.on_commit(region_directory.invalidate)
@@ -0,0 +1,69 @@
+# products/sketches.py
+"""
+HyperLogLog cardinality sketch (Flajolet et al., with the small-range
+correction), used to estimate unique viewers per reel.
+
+With PRECISION = 12 a sketch is 4096 one-byte registers (4 KB) whatever the
+number of viewers, and estimates are within about 1.6% (1.04 / sqrt(4096)).
+Adding a value that is already counted never changes the sketch, so a
+repeat viewer costs no write.
+"""
+import hashlib
+import math
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+_VALUE_BITS = 64 - PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def hash64(value):
+    """64-bit hash of a string, signed so that it fits a BigIntegerField."""
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class HyperLogLog:
+    def __init__(self, registers=None):
+        if registers:
+            if len(registers) != REGISTERS:
+                raise ValueError(f"Expected {REGISTERS} registers, got {len(registers)}")
+            self.registers = bytearray(registers)
+        else:
+            self.registers = bytearray(REGISTERS)
+
+    @staticmethod
+    def position(hashed):
+        """(register index, rank) of a 64-bit hash: the first PRECISION bits
+        pick the register, the rest give the rank."""
+        hashed &= (1 << 64) - 1
+        index = hashed >> _VALUE_BITS
+        rest = hashed & ((1 << _VALUE_BITS) - 1)
+        # Position of the leftmost 1 bit; all zeros ranks one past the end
+        return index, _VALUE_BITS - rest.bit_length() + 1
+
+    def add(self, value):
+        """Count a string value. Returns True if the sketch changed."""
+        return self.add_hash(hash64(value))
+
+    def add_hash(self, hashed):
+        """Count a value already hashed with hash64()."""
+        index, rank = self.position(hashed)
+        if rank <= self.registers[index]:
+            return False
+        self.registers[index] = rank
+        return True
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        raw = _ALPHA * REGISTERS * REGISTERS / math.fsum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * REGISTERS and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return int(round(REGISTERS * math.log(REGISTERS / zeros)))
+        return int(round(raw))
+
+    def to_bytes(self):
+        return bytes(self.registers)
@@ -1,3 +1,791 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import random
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from . import events
+from .events import rollup_events
+from .models import ArchivedRecord, EngagementEvent, Product, ProductImage, ProductImageFetch, Rating, Reel, ReelComment, ReelLike, Region, SellerStats
+from .duplicates import (
+    cluster_products, fetchable, find_near_duplicates, hamming_distance, phash_fields, split_bands, to_signed,
+)
+from .imaging import preprocess_images
+from .management.commands.explain_list_views import LIST_VIEW_CASES, SEQ_SCAN_PATTERNS
+from .pricing import estimate_rows, plan_price_range, refresh_histograms
+from .regions import region_directory
+from .related import refresh_related
+from .sketches import HyperLogLog
+from .trending import refresh_trending
+
+def roll_up_engagement():
+    events.buffer.flush()
+    return rollup_events()
+
+
+STAT_FIELDS = ('active_product_count', 'rating_count', 'rating_sum',
+               'reel_views', 'reel_likes', 'reel_shares')
+
+
+@override_settings(ENGAGEMENT_ROLLUP_DELAY_SECONDS=0)
+class SellerStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(events.buffer.flush)
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='x', shop_name='Buyer')
+        self.client = APIClient()
+
+    def create_product(self, **kwargs):
+        return Product.objects.create(seller=self.seller, name='Phone', description='d', price=10,
+                                      region='Arusha', condition='new', **kwargs)
+
+    def current(self):
+        return SellerStats.objects.values(*STAT_FIELDS).get(seller=self.seller)
+
+    def test_incremental_matches_rebuild(self):
+        product = self.create_product()
+        hidden = self.create_product()
+        rating = Rating.objects.create(product=product, buyer=self.buyer, rating=4)
+        rating.rating = 2
+        rating.save()
+        hidden.is_active = False
+        hidden.save()
+        reel = Reel.objects.create(seller=self.seller, title='Reel', price=10, video_url='https://v.test/a.mp4')
+
+        self.client.get(f'/api/products/reels/{reel.id}/')
+        self.client.force_authenticate(self.buyer)
+        self.client.post(f'/api/products/reels/{reel.id}/share/')
+        self.client.post(f'/api/products/reels/{reel.id}/like/')
+        self.client.force_authenticate(self.seller)
+        self.client.post('/api/products/bulk/', {'action': 'reactivate', 'ids': [hidden.id]}, format='json')
+        roll_up_engagement()
+
+        incremental = self.current()
+        self.assertEqual(incremental, {
+            'active_product_count': 2, 'rating_count': 1, 'rating_sum': 2,
+            'reel_views': 1, 'reel_likes': 1, 'reel_shares': 1,
+        })
+        call_command('rebuild_seller_stats', stdout=StringIO())
+        self.assertEqual(self.current(), incremental)
+
+    def test_storefront_is_one_query(self):
+        self.create_product()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/products/seller/{self.seller.id}/storefront/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stats']['active_product_count'], 1)
+
+    def test_deleting_seller_leaves_no_stats(self):
+        self.create_product()
+        self.seller.delete()
+        self.assertFalse(SellerStats.objects.exists())
+
+
+class ListViewIndexTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        Product.objects.create(seller=self.seller, name='Phone', description='d', price=10,
+                               region='Arusha', condition='new')
+
+    def test_sequential_scan_patterns(self):
+        sqlite = SEQ_SCAN_PATTERNS['sqlite']
+        self.assertEqual(sqlite.findall('4 0 0 SCAN products_product'), ['products_product'])
+        self.assertEqual(sqlite.findall('4 0 0 SCAN products_product USING INDEX product_active_recent_idx'), [])
+        self.assertEqual(SEQ_SCAN_PATTERNS['postgresql'].findall(
+            'Seq Scan on products_reel  (cost=0.00..1.01 rows=1 width=8)'), ['products_reel'])
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite plans; Postgres scans tables this small")
+    def test_every_list_view_uses_an_index(self):
+        out = StringIO()
+        call_command('explain_list_views', '--fail-on-seq-scan', '--show-plans', stdout=out)
+
+        output = out.getvalue()
+        for label, *_ in LIST_VIEW_CASES:
+            self.assertIn(f'{label}: ok', output)
+        for index in ('product_active_recent_idx', 'product_seller_recent_idx',
+                      'rating_product_recent_idx', 'reel_active_recent_idx'):
+            self.assertIn(index, output)
+
+
+class ProductBulkActionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        other = User.objects.create_user(email='other@example.com', password='x', shop_name='Other')
+        self.mine = [self.create_product(self.seller, f'Mine {i}') for i in range(3)]
+        self.theirs = self.create_product(other, 'Theirs')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def create_product(self, seller, name):
+        return Product.objects.create(seller=seller, name=name, description='d', price=10,
+                                      region='Arusha', condition='new')
+
+    def bulk(self, **body):
+        response = self.client.post('/api/products/bulk/', body, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_mixed_ownership_and_per_id_results(self):
+        self.mine[2].is_active = False
+        self.mine[2].save()
+        ids = [self.mine[0].id, self.theirs.id, self.mine[2].id, 999999]
+        with self.assertNumQueries(3):  # Read, UPDATE, SellerStats delta
+            data = self.bulk(action='deactivate', ids=ids)
+        self.assertEqual(data['updated'], 1)
+        self.assertEqual([r['status'] for r in data['results']], ['updated', 'not_found', 'unchanged', 'not_found'])
+        self.assertTrue(Product.all_objects.get(pk=self.theirs.pk).is_active)
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).active_product_count, 1)
+
+        data = self.bulk(action='reprice', ids=[self.mine[1].id, self.theirs.id], price='25.00')
+        self.assertEqual([r['status'] for r in data['results']], ['updated', 'not_found'])
+        self.assertEqual(str(Product.all_objects.get(pk=self.mine[1].pk).price), '25.00')
+        self.assertEqual(str(Product.all_objects.get(pk=self.theirs.pk).price), '10.00')
+
+    def test_batch_shows_in_lists_and_storefront_at_once(self):
+        client = APIClient()
+        names = lambda url: [item['name'] for item in client.get(url).data]
+        self.assertEqual(len(names('/api/products/')), 4)
+
+        self.bulk(action='deactivate', ids=[product.id for product in self.mine[:2]])
+        self.assertEqual(sorted(names('/api/products/')), ['Mine 2', 'Theirs'])
+        self.assertEqual(names(f'/api/products/seller/{self.seller.id}/'), ['Mine 2'])
+        storefront = client.get(f'/api/products/seller/{self.seller.id}/storefront/').data
+        self.assertEqual(storefront['stats']['active_product_count'], 1)
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller',
+                                               is_email_verified=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def upload(self, content, name):
+        return self.client.post('/api/products/import/', {'file': SimpleUploadedFile(name, content.encode())})
+
+    def test_csv_rows_are_created_or_reported(self):
+        response = self.upload(
+            'name,description,price,region,condition,phone_number,image_urls\n'
+            'Phone,Good phone,100,Arusha,new,0712345678,https://img.test/a.jpg|https://img.test/b.jpg\n'
+            'Broken,No price,,Arusha,new,0712345678,\n'
+            'Sofa,Three seater,300,Mwanza,good,0712345678,\n',
+            'products.csv',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['rows'], response.data['created'], response.data['failed']), (3, 2, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertEqual(response.data['images_queued'], 2)
+        self.assertEqual(
+            sorted(ProductImageFetch.objects.values_list('source_url', flat=True)),
+            ['https://img.test/a.jpg', 'https://img.test/b.jpg'],
+        )
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).active_product_count, 2)
+
+    def test_jsonl_with_bad_lines(self):
+        response = self.upload(
+            '{"name": "Phone", "description": "d", "price": "10", "region": "Arusha", '
+            '"condition": "new", "phone_number": "0712345678"}\nnot json\n[1]\n',
+            'products.jsonl',
+        )
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller',
+                                               is_email_verified=True)
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='x', shop_name='Buyer')
+        other = User.objects.create_user(email='other@example.com', password='x', shop_name='Other')
+        self.phone = self.create_product(self.seller, 'Phone, 64GB')
+        self.create_product(self.seller, 'Old sofa', is_active=False)
+        self.create_product(other, 'Theirs')
+        ProductImage.objects.create(product=self.phone, image_url='https://img.test/a.jpg')
+        ProductImage.objects.create(product=self.phone, image_url='https://img.test/b.jpg')
+        Rating.objects.create(product=self.phone, buyer=self.buyer, rating=5, comment='Great')
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def create_product(self, seller, name, **kwargs):
+        return Product.all_objects.create(seller=seller, name=name, description='d', price=10,
+                                          region='Arusha', condition='new', phone_number='0712345678', **kwargs)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_product_csv_covers_own_products_only(self):
+        response = self.client.get('/api/products/my-products/export.csv')
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="my-products.csv"')
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([row['name'] for row in rows], ['Phone, 64GB', 'Old sofa'])
+        self.assertEqual([row['is_active'] for row in rows], ['True', 'False'])
+        self.assertEqual(rows[0]['image_urls'], 'https://img.test/a.jpg|https://img.test/b.jpg')
+        self.assertNotIn('seller_email', rows[0])
+
+    def test_product_csv_can_be_reimported(self):
+        content = self.read(self.client.get('/api/products/my-products/export.csv'))
+
+        response = self.client.post('/api/products/import/',
+                                    {'file': SimpleUploadedFile('products.csv', content.encode())})
+
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 0))
+        self.assertEqual(response.data['images_queued'], 2)
+
+    def test_export_queries_do_not_grow_with_rows(self):
+        for number in range(5):
+            product = self.create_product(self.seller, f'Extra {number}')
+            ProductImage.objects.create(product=product, image_url='https://img.test/c.jpg')
+        # One query for the products and one for their images
+        with self.assertNumQueries(2):
+            self.read(self.client.get('/api/products/my-products/export.jsonl'))
+
+    def test_ratings_jsonl(self):
+        response = self.client.get('/api/products/my-products/ratings/export.jsonl')
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(
+            {key: lines[0][key] for key in ('product_id', 'product__name', 'buyer__shop_name', 'rating', 'comment')},
+            {'product_id': self.phone.id, 'product__name': 'Phone, 64GB', 'buyer__shop_name': 'Buyer',
+             'rating': 5, 'comment': 'Great'},
+        )
+
+    def test_unknown_format_and_anonymous_requests_are_rejected(self):
+        self.assertEqual(self.client.get('/api/products/my-products/export.xlsx').status_code, 400)
+        self.assertEqual(APIClient().get('/api/products/my-products/export.csv').status_code, 401)
+
+    def test_admin_export_includes_seller_email(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='x', shop_name='Admin')
+        self.client.force_login(admin)
+
+        response = self.client.post(reverse('admin:products_product_changelist'), {
+            'action': 'export_as_csv',
+            '_selected_action': [self.phone.id],
+        })
+
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([(row['name'], row['seller_email']) for row in rows],
+                         [('Phone, 64GB', 'seller@example.com')])
+
+
+class FetchProductImagesTests(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        product = Product.objects.create(seller=seller, name='Phone', description='d', price=10,
+                                         region='Arusha', condition='new')
+        self.image = ProductImage.objects.create(product=product, image_url='https://img.test/a.jpg')
+        self.fetch = ProductImageFetch.objects.create(image=self.image, source_url=self.image.image_url)
+
+    def run_worker(self, upload):
+        with patch('backend.storage.upload', side_effect=upload) as mock:
+            call_command('fetch_product_images', stdout=StringIO())
+        self.fetch.refresh_from_db()
+        return mock
+
+    def test_upload_runs_outside_transactions(self):
+        depths = []
+
+        def upload(url, **options):
+            depths.append(len(connection.atomic_blocks))
+            return {'secure_url': 'https://res.cloudinary.com/demo/a.jpg'}
+
+        self.run_worker(upload)
+        # No atomic block beyond TestCase's own: no rows were locked
+        self.assertEqual(depths, [len(connection.atomic_blocks)])
+        self.assertEqual((self.fetch.status, self.fetch.attempts, self.fetch.leased_until),
+                         (ProductImageFetch.STATUS_DONE, 1, None))
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.image_url, 'https://res.cloudinary.com/demo/a.jpg')
+
+    def test_failures_retry_then_give_up(self):
+        for attempt in range(1, 6):
+            # Each retry waits for its backoff to run out
+            ProductImageFetch.objects.filter(status=ProductImageFetch.STATUS_PENDING).update(leased_until=None)
+            self.run_worker(OSError('host timed out'))
+            self.assertEqual(self.fetch.attempts, attempt)
+        self.assertEqual(self.fetch.status, ProductImageFetch.STATUS_FAILED)
+        self.assertEqual(self.fetch.last_error, 'host timed out')
+
+    def test_failed_fetch_waits_for_its_backoff(self):
+        started = timezone.now()
+        self.run_worker(OSError('host timed out'))
+        self.assertEqual((self.fetch.status, self.fetch.attempts), (ProductImageFetch.STATUS_PENDING, 1))
+        self.assertGreaterEqual(self.fetch.leased_until, started + timedelta(seconds=60))
+
+        # An immediate second pass does not touch it
+        self.assertFalse(self.run_worker(OSError('host timed out')).called)
+        self.assertEqual(self.fetch.attempts, 1)
+
+        # Backoff doubles with each attempt
+        ProductImageFetch.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        started = timezone.now()
+        self.run_worker(OSError('host timed out'))
+        self.assertEqual(self.fetch.attempts, 2)
+        self.assertGreaterEqual(self.fetch.leased_until, started + timedelta(seconds=120))
+
+    def test_leased_rows_are_skipped_until_the_lease_runs_out(self):
+        ProductImageFetch.objects.update(leased_until=timezone.now() + timedelta(minutes=5), attempts=1)
+        self.assertFalse(self.run_worker(OSError).called)
+
+        # The worker holding it died
+        ProductImageFetch.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        self.run_worker(lambda url, **options: {'secure_url': 'https://res.cloudinary.com/demo/a.jpg'})
+        self.assertEqual((self.fetch.status, self.fetch.attempts), (ProductImageFetch.STATUS_DONE, 2))
+
+
+class DuplicateImageTests(TestCase):
+    BASE = 0x0123456789ABCDEF
+    NEAR = BASE ^ 0b111  # 3 bits apart, all in band 0
+    FAR = BASE ^ (1 | 1 << 16 | 1 << 32 | 1 << 48)  # 4 bits apart, one per band
+
+    def setUp(self):
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+
+    def product(self, *hashes):
+        product = Product.objects.create(seller=self.seller, name='Phone', description='d', price=10,
+                                         region='Arusha', condition='new')
+        for value in hashes:
+            ProductImage.objects.create(product=product, image_url='https://res.cloudinary.com/demo/a.jpg',
+                                        **phash_fields(value))
+        return product
+
+    def test_bands_and_distance(self):
+        self.assertEqual(split_bands(self.BASE), [0xCDEF, 0x89AB, 0x4567, 0x0123])
+        self.assertEqual(hamming_distance(to_signed(self.BASE), self.NEAR), 3)
+        self.assertEqual(hamming_distance(self.BASE, self.FAR), 4)
+        self.assertLess(phash_fields(1 << 63)['phash'], 0)
+
+    def test_near_duplicates_only(self):
+        base, near, far = self.product(self.BASE), self.product(self.NEAR), self.product(self.FAR)
+        self.assertEqual(find_near_duplicates([self.BASE], exclude_product_id=base.id), [near.id])
+        self.assertEqual(find_near_duplicates([self.FAR], exclude_product_id=far.id), [])
+
+        clusters, skipped = cluster_products(ProductImage.objects.all())
+        self.assertEqual((clusters, skipped), ([sorted([base.id, near.id])], 0))
+
+    def test_oversized_buckets_are_skipped(self):
+        # Same band 0, the other bands all different: one big bucket
+        products = [self.product(self.BASE ^ (i << 16 | i << 32 | i << 48)) for i in range(1, 5)]
+        identical = self.product(self.BASE ^ (1 << 16 | 1 << 32 | 1 << 48))
+        with patch('products.duplicates.MAX_BUCKET_HASHES', 3):
+            clusters, skipped = cluster_products(ProductImage.objects.all())
+        self.assertEqual(skipped, 1)
+        # Identical hashes are still linked without pairwise comparison
+        self.assertEqual(clusters, [sorted([products[0].id, identical.id])])
+
+    @override_settings(CLOUDINARY={'cloud_name': 'demo'})
+    def test_backfill_only_fetches_from_the_image_host(self):
+        self.assertTrue(fetchable('https://res.cloudinary.com/demo/image/upload/a.jpg'))
+        self.assertFalse(fetchable('https://res.cloudinary.com/other/image/upload/a.jpg'))
+        for url in ('http://res.cloudinary.com/demo/a.jpg', 'https://169.254.169.254/latest/meta-data',
+                    'https://res.cloudinary.com.evil.test/a.jpg', 'file:///etc/passwd'):
+            self.assertFalse(fetchable(url), url)
+
+        product = self.product()
+        ProductImage.objects.create(product=product, image_url='https://internal.test/admin')
+        with patch('products.duplicates._opener.open') as urlopen:
+            call_command('cluster_duplicate_images', '--backfill', stdout=StringIO(), stderr=StringIO())
+        urlopen.assert_not_called()
+
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='x', shop_name='Buyer')
+        self.client = APIClient()
+        self.product = Product.objects.create(seller=self.seller, name='Phone', description='d', price=10,
+                                              region='Arusha', condition='new')
+        self.client.force_authenticate(self.seller)
+        self.client.delete(f'/api/products/{self.product.id}/delete/')
+
+    def test_inactive_rows_are_hidden_except_from_their_seller(self):
+        self.assertFalse(Product.objects.exists())
+        self.assertEqual(self.client.get('/api/products/').data, [])
+        self.assertEqual([p['id'] for p in self.client.get('/api/products/my-products/').data], [self.product.id])
+        self.client.post('/api/products/bulk/', {'action': 'reactivate', 'ids': [self.product.id]}, format='json')
+        self.assertTrue(Product.objects.filter(pk=self.product.pk).exists())
+
+    def test_archive_moves_long_inactive_rows(self):
+        Rating.objects.create(product=self.product, buyer=self.buyer, rating=5)
+        ProductImage.objects.create(product=self.product, image_url='https://img.test/1.jpg')
+        Product.all_objects.filter(pk=self.product.pk).update(
+            is_active=False, updated_at=timezone.now() - timedelta(days=400)
+        )
+        recent = Product.objects.create(seller=self.seller, name='Case', description='d', price=5,
+                                        region='Arusha', condition='new', is_active=False)
+
+        call_command('archive_inactive', stdout=StringIO())
+
+        self.assertEqual(list(Product.all_objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertFalse(Rating.objects.exists())
+        archived = ArchivedRecord.objects.filter(root_model='products.product', root_id=self.product.pk)
+        self.assertEqual(sorted(archived.values_list('model', flat=True)),
+                         ['products.product', 'products.productimage', 'products.rating'])
+        self.assertEqual(archived.get(model='products.rating').data['rating'], 5)
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).rating_count, 0)
+
+
+@override_settings(ENGAGEMENT_EVENT_FLUSH_SECONDS=60, ENGAGEMENT_ROLLUP_DELAY_SECONDS=0)
+class ReelViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(events.buffer.flush)
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        self.reel = Reel.objects.create(seller=self.seller, title='Reel', price=10, video_url='https://v.test/a.mp4')
+        self.client = APIClient()
+
+    def test_sketch_estimate_and_repeats(self):
+        sketch = HyperLogLog()
+        for i in range(20000):
+            sketch.add(f'user{i}')
+        self.assertAlmostEqual(sketch.estimate(), 20000, delta=20000 * 0.05)
+        self.assertFalse(any(sketch.add(f'user{i}') for i in range(100)))
+        self.assertEqual(len(sketch.to_bytes()), 4096)
+
+    def test_replays_count_as_plays_only(self):
+        viewers = [User.objects.create_user(email=f'v{i}@example.com', password='x', shop_name=f'V{i}')
+                   for i in range(2)]
+        for viewer in (viewers[0], viewers[0], viewers[1]):
+            self.client.force_authenticate(viewer)
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(f'/api/products/reels/{self.reel.id}/').data
+            # Buffered as events: nothing is written during the request
+            self.assertTrue(all(q['sql'].startswith('SELECT') for q in queries.captured_queries))
+        self.assertEqual((data['views_count'], data['plays_count']), (1, 1))
+
+        roll_up_engagement()
+        self.reel.refresh_from_db()
+        self.assertEqual((self.reel.views_count, self.reel.plays_count, self.reel.unique_viewers), (2, 3, 2))
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).reel_views, 2)
+
+    def test_rollup_applies_each_event_once(self):
+        buyer = User.objects.create_user(email='buyer@example.com', password='x', shop_name='Buyer')
+        self.client.force_authenticate(buyer)
+        self.client.post(f'/api/products/reels/{self.reel.id}/like/')
+        self.client.post(f'/api/products/reels/{self.reel.id}/share/')
+        comment = self.client.post('/api/products/reels/comments/create/', {'reel': self.reel.id, 'text': 'Hi'}).data
+        self.client.delete(f"/api/products/reels/comments/{comment['id']}/delete/")
+
+        self.assertEqual(roll_up_engagement(), 4)
+        self.assertEqual(roll_up_engagement(), 0)
+        self.reel.refresh_from_db()
+        self.assertEqual((self.reel.likes_count, self.reel.shares_count, self.reel.comments_count), (1, 1, 0))
+        self.assertEqual(set(EngagementEvent.objects.values_list('event_type', flat=True)), {
+            EngagementEvent.LIKE, EngagementEvent.SHARE, EngagementEvent.COMMENT, EngagementEvent.UNCOMMENT,
+        })
+
+    @override_settings(ENGAGEMENT_ROLLUP_DELAY_SECONDS=60)
+    def test_rollup_waits_for_recent_inserts_not_recent_events(self):
+        # A buffer flushed late: the events are old, the rows are new, and a
+        # batch with lower ids may still be uncommitted
+        events.record(EngagementEvent.PLAY, self.reel.pk)
+        events.buffer.events[0].created_at = timezone.now() - timedelta(hours=1)
+        self.assertEqual(roll_up_engagement(), 0)
+
+        EngagementEvent.objects.update(inserted_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(rollup_events(), 1)
+
+    @override_settings(ENGAGEMENT_EVENT_FLUSH_SECONDS=0.05, ENGAGEMENT_EVENT_BATCH_SIZE=100)
+    def test_idle_buffer_is_flushed_by_timer(self):
+        buffer = events.EventBuffer()
+        with patch.object(EngagementEvent.objects, 'bulk_create') as bulk_create:
+            buffer.add(EngagementEvent(event_type=EngagementEvent.PLAY, reel_id=self.reel.pk))
+            # No later add() comes along to flush it
+            for _ in range(100):
+                if bulk_create.called:
+                    break
+                time.sleep(0.02)
+        self.assertEqual(len(bulk_create.call_args.args[0]), 1)
+        self.assertEqual(buffer.events, [])
+
+
+@override_settings(ENGAGEMENT_ROLLUP_DELAY_SECONDS=0)
+class SellerAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(events.buffer.flush)
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        self.buyer = User.objects.create_user(email='buyer@example.com', password='x', shop_name='Buyer')
+        self.reel = Reel.objects.create(seller=self.seller, title='Reel', price=10, video_url='https://v.test/a.mp4')
+        self.product = Product.objects.create(seller=self.seller, name='Phone', description='d', price=10,
+                                              region='Arusha', condition='new')
+        self.client = APIClient()
+
+    def roll_up(self):
+        events.buffer.flush()
+        call_command('rollup_daily_stats', stdout=StringIO())
+
+    def today(self, **params):
+        self.client.force_authenticate(self.seller)
+        response = self.client.get('/api/products/my-analytics/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['series'][-1]
+
+    def test_daily_series(self):
+        self.client.force_authenticate(self.buyer)
+        self.client.get(f'/api/products/reels/{self.reel.id}/')
+        self.client.get(f'/api/products/reels/{self.reel.id}/')
+        self.client.post(f'/api/products/reels/{self.reel.id}/like/')
+        rating = Rating.objects.create(product=self.product, buyer=self.buyer, rating=4)
+        self.roll_up()
+        self.roll_up()
+
+        day = self.today()
+        self.assertEqual(day['day'], timezone.localdate())
+        self.assertEqual({k: day[k] for k in ('plays', 'views', 'likes', 'ratings', 'rating_sum')},
+                         {'plays': 2, 'views': 1, 'likes': 1, 'ratings': 1, 'rating_sum': 4})
+        self.assertEqual(self.today(type='product', item=self.product.id)['plays'], 0)
+
+        rating.rating = 2
+        rating.save()
+        self.roll_up()
+        self.assertEqual(self.today()['rating_sum'], 2)
+
+    def test_range_is_one_query(self):
+        self.client.force_authenticate(self.seller)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/my-analytics/', {'start': '2026-01-01', 'end': '2026-03-31'})
+        self.assertEqual(len(response.data['series']), 90)
+        self.assertEqual(self.client.get('/api/products/my-analytics/', {'start': '2020-01-01'}).status_code, 400)
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        self.buyers = [User.objects.create_user(email=f'b{i}@example.com', password='x', shop_name=f'B{i}')
+                       for i in range(3)]
+        self.products = {
+            region: Product.objects.create(seller=self.seller, name=region, description='d', price=10,
+                                           region=region, condition='new')
+            for region in ('Arusha', 'Mwanza', 'Dodoma')
+        }
+        for region, raters in (('Arusha', 1), ('Mwanza', 3), ('Dodoma', 2)):
+            for buyer in self.buyers[:raters]:
+                Rating.objects.create(product=self.products[region], buyer=buyer, rating=5)
+        self.reels = [Reel.objects.create(seller=self.seller, title=f'Reel {i}', price=10,
+                                          video_url='https://v.test/a.mp4') for i in range(2)]
+        ReelLike.objects.create(reel=self.reels[1], user=self.buyers[0])
+        self.client = APIClient()
+
+    def names(self, **params):
+        response = self.client.get('/api/products/trending/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item.get('name') or item.get('title') for item in response.data]
+
+    def test_ranked_lists(self):
+        refresh_trending()
+        # A second run re-buckets the current hour instead of adding to it
+        refresh_trending()
+        self.assertEqual(self.names(), ['Mwanza', 'Dodoma', 'Arusha'])
+        self.assertEqual(self.names(region='arusha'), ['Arusha'])
+        self.assertEqual(self.names(limit=1), ['Mwanza'])
+        self.assertEqual(self.names(type='reel'), ['Reel 1'])
+
+        self.products['Mwanza'].is_active = False
+        self.products['Mwanza'].save()
+        self.assertEqual(self.names(), ['Dodoma', 'Arusha'])
+
+
+class RelatedProductTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        self.phone = self.product('Samsung Galaxy phone', 'Android smartphone, 128GB', 500000)
+        self.products = {
+            'similar': self.product('Samsung Galaxy S21 phone', 'Used Android smartphone', 450000),
+            'cheap': self.product('Tecno phone', 'Basic smartphone', 90000, condition='used'),
+            'sofa': self.product('Leather sofa', 'Three seater sofa', 800000, region='Mwanza'),
+        }
+        self.client = APIClient()
+
+    def product(self, name, description, price, region='Arusha', condition='new'):
+        return Product.objects.create(seller=self.seller, name=name, description=description, price=price,
+                                      region=region, condition=condition)
+
+    def names(self, product):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/products/{product.pk}/related/')
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_full_and_incremental_refresh(self):
+        self.assertEqual(refresh_related(size=2), 4)
+        self.assertEqual(self.names(self.phone), ['Samsung Galaxy S21 phone', 'Tecno phone'])
+        self.assertEqual(self.names(self.products['sofa']), ['Samsung Galaxy phone', 'Samsung Galaxy S21 phone'])
+
+        # Only the new product gets a list, and it enters the lists it beats
+        self.product('Samsung Galaxy S22 phone', 'Android smartphone, 128GB', 500000)
+        self.assertEqual(refresh_related(size=2), 1 + 3)
+        self.assertEqual(self.names(self.phone), ['Samsung Galaxy S22 phone', 'Samsung Galaxy S21 phone'])
+        self.assertEqual(self.names(self.products['sofa']), ['Samsung Galaxy phone', 'Samsung Galaxy S22 phone'])
+
+        self.products['similar'].is_active = False
+        self.products['similar'].save()
+        self.assertEqual(self.names(self.phone), ['Samsung Galaxy S22 phone'])
+        refresh_related(full=True, size=2)
+        self.assertEqual(self.names(self.phone), ['Samsung Galaxy S22 phone', 'Tecno phone'])
+
+
+@override_settings(IMAGE_PREPROCESS_WORKERS=0, IMAGE_PREPROCESS_FORMAT='WEBP', IMAGE_PREPROCESS_QUALITY=82)
+class ImagePreprocessTests(SimpleTestCase):
+    def test_exif_is_stripped_even_when_not_smaller(self):
+        from PIL import ExifTags, Image
+
+        # Noise at JPEG quality 10 only grows when re-encoded at quality 82
+        noise = random.Random(1)
+        image = Image.frombytes('RGB', (48, 48), bytes(noise.randrange(256) for _ in range(48 * 48 * 3)))
+        exif = Image.Exif()
+        exif[ExifTags.Base.Make] = 'Phone'
+        exif[ExifTags.Base.GPSInfo] = {ExifTags.GPS.GPSLatitudeRef: 'S', ExifTags.GPS.GPSLatitude: (6.0, 48.0, 0.0)}
+        upload = io.BytesIO()
+        image.save(upload, 'JPEG', quality=10, exif=exif)
+        self.assertIn(ExifTags.Base.GPSInfo, Image.open(io.BytesIO(upload.getvalue())).getexif())
+
+        [processed] = preprocess_images([upload])
+        # WebP would be larger: kept as JPEG, but re-encoded without metadata
+        self.assertEqual(processed.format, 'JPEG')
+        self.assertNotEqual(processed.content, upload.getvalue())
+        self.assertNotIn(b'Exif', processed.content)
+        with Image.open(io.BytesIO(processed.content)) as output:
+            self.assertEqual(output.format, processed.format)
+            self.assertEqual(len(output.getexif()), 0)
+
+
+class RegionTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+
+    def create_product(self, region):
+        return Product.objects.create(seller=self.seller, name='Phone', description='d', price=10,
+                                      region=region, condition='new')
+
+    def test_spellings_share_one_region(self):
+        first = self.create_product('Dar es Salaam')
+        second = self.create_product('  dar-es-SALAAM ')
+        self.assertEqual(first.region_ref_id, second.region_ref_id)
+        self.assertEqual(second.region, 'Dar es Salaam')
+        self.assertEqual(Region.objects.count(), 1)
+
+    def test_list_filter_uses_region_ids(self):
+        dar = self.create_product('Dar es Salaam')
+        arusha = self.create_product('Arusha')
+        self.create_product('Mwanza')
+
+        response = self.client.get('/api/products/', {'region': 'dar es salaam,ARUSHA'})
+        ids = {p['id'] for p in response.json()}
+        self.assertEqual(ids, {dar.id, arusha.id})
+
+        response = self.client.get('/api/products/', {'region': 'Atlantis'})
+        self.assertEqual(response.json(), [])
+
+
+class PriceListingTests(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user(email='seller@example.com', password='x', shop_name='Seller')
+        self.products = [
+            Product.objects.create(seller=seller, name=f'Item {price}', description='d', price=price,
+                                   region='Arusha' if price < 500 else 'Mwanza', condition='new')
+            for price in (100, 200, 200, 300, 400, 500, 600, 700, 800, 1000)
+        ]
+        refresh_histograms(bucket_count=9)
+
+    def test_histogram_endpoint(self):
+        data = self.client.get('/api/products/price-histogram/').json()
+        self.assertEqual(data['total'], 10)
+        self.assertEqual(len(data['buckets']), 9)
+        self.assertEqual(sum(b['count'] for b in data['buckets']), 10)
+
+        data = self.client.get('/api/products/price-histogram/', {'region': 'arusha'}).json()
+        self.assertEqual((data['total'], data['min_price'], data['max_price']), (5, '100.00', '400.00'))
+
+    def test_price_filter_matches_with_either_plan(self):
+        expected = {p.id for p in self.products if 200 <= p.price <= 600}
+        for max_rows in (0, 1000):
+            with self.settings(PRICE_INDEX_MAX_ROWS=max_rows):
+                response = self.client.get('/api/products/', {'min_price': '200', 'max_price': '600'})
+            self.assertEqual({p['id'] for p in response.json()}, expected)
+
+    @override_settings(PRICE_INDEX_MAX_ROWS=5)
+    def test_plan_uses_the_filtered_cell(self):
+        arusha = region_directory.ids_for(['Arusha'])
+        # 10 products overall, but only the 5 in Arusha can match
+        self.assertEqual(estimate_rows(100, 1000), 10)
+        self.assertEqual(estimate_rows(100, 1000, arusha, 'new'), 5)
+        self.assertEqual(estimate_rows(100, 1000, arusha, 'poor'), 10)  # No such cell: global
+
+        queryset = plan_price_range(Product.objects.filter(region_ref_id__in=arusha), 100, 1000, arusha, 'new')
+        self.assertIn('"id" IN', str(queryset.query))
+        self.assertEqual(queryset.count(), 5)
+        queryset = plan_price_range(Product.objects.all(), 100, 1000)
+        self.assertNotIn('"id" IN', str(queryset.query))
+
+    def test_sort_by_price_pages_with_cursor(self):
+        prices, url = [], '/api/products/?sort=price&page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            prices += [float(p['price']) for p in data['results']]
+            url = data['next']
+        self.assertEqual(prices, sorted(p.price for p in self.products))
+
+        first = self.client.get('/api/products/', {'sort': '-price', 'page_size': 2}).json()
+        self.assertEqual([p['price'] for p in first['results']], ['1000.00', '800.00'])
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Changelist query counts must not grow with the number of rows."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='x', shop_name='Admin')
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.rows += 1
+            user = User.objects.create_user(email=f'user{self.rows}@example.com', password='x',
+                                             shop_name=f'Shop {self.rows}')
+            product = Product.objects.create(seller=user, name=f'Item {self.rows}', description='d', price=10,
+                                             region='Arusha', condition='new')
+            Rating.objects.create(product=product, buyer=self.admin, rating=4)
+            reel = Reel.objects.create(seller=user, title=f'Reel {self.rows}', price=10,
+                                       video_url='https://v.test/a.mp4')
+            ReelLike.objects.create(reel=reel, user=self.admin)
+            ReelComment.objects.create(reel=reel, user=user, text='Nice')
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:products_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if model == 'product':
+            # Every listed product is rated, so the rating column is rendered
+            self.assertContains(response, '<b>4.0</b> ★★★★☆', html=False)
+        return len(queries)
+
+    def test_changelist_query_counts_are_constant(self):
+        models = ('product', 'rating', 'reel', 'reellike', 'reelcomment')
+        self.add_rows(2)
+        few = {model: self.changelist_queries(model) for model in models}
+        self.add_rows(10)
+        many = {model: self.changelist_queries(model) for model in models}
+        self.assertEqual(few, many)
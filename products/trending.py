@@ -0,0 +1,123 @@
+# products/trending.py
+"""
+Trending products and reels.
+
+`refresh_trending` runs periodically (every few minutes). It aggregates
+the engagement events of the hours that can still change (the current one
+and any not yet bucketed) into EngagementBucket rows, one per item and
+hour, drops the hours that left the TRENDING_WINDOW_HOURS window, and
+merges the window into top-K TrendingItem lists: products per region and
+overall, reels overall. An hour's weight halves every
+TRENDING_HALF_LIFE_HOURS. The trending endpoint then reads K rows by index
+and K items by primary key; items deactivated since the last refresh are
+skipped there.
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import EngagementBucket, Rating, ReelComment, ReelLike, TrendingItem
+
+PRODUCT = EngagementBucket.ITEM_PRODUCT
+REEL = EngagementBucket.ITEM_REEL
+
+# (event model, item type, item field, item's region field or None, weight)
+EVENT_SOURCES = [
+    (ReelLike, REEL, 'reel', None, 1),
+    (ReelComment, REEL, 'reel', None, 2),
+    (Rating, PRODUCT, 'product', 'product__region_ref', 3),
+]
+
+
+def _hour(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def aggregate_buckets(start, end):
+    """Unsaved EngagementBucket rows for the events in [start, end)."""
+    scores = defaultdict(int)
+    regions = {}
+    for model, item_type, item_field, region_field, weight in EVENT_SOURCES:
+        fields = [f'{item_field}_id', 'hour'] + ([f'{region_field}_id'] if region_field else [])
+        rows = (
+            model.objects
+            .filter(created_at__gte=start, created_at__lt=end, **{f'{item_field}__is_active': True})
+            .annotate(hour=TruncHour('created_at', tzinfo=dt_timezone.utc))
+            .values(*fields)
+            .annotate(events=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            key = (item_type, row[f'{item_field}_id'], row['hour'])
+            scores[key] += row['events'] * weight
+            if region_field:
+                regions[key] = row[f'{region_field}_id']
+    return [
+        EngagementBucket(item_type=item_type, item_id=item_id, hour=hour,
+                         region_id=regions.get((item_type, item_id, hour)), score=score)
+        for (item_type, item_id, hour), score in scores.items()
+    ]
+
+
+def merge_top_k(now, window_start, size):
+    """Unsaved TrendingItem rows: the window's buckets, decayed and ranked."""
+    current = _hour(now)
+    half_life = settings.TRENDING_HALF_LIFE_HOURS
+    totals = defaultdict(float)
+    regions = {}
+    buckets = (
+        EngagementBucket.objects.filter(hour__gte=window_start).order_by('hour')
+        .values_list('item_type', 'item_id', 'region_id', 'hour', 'score')
+    )
+    for item_type, item_id, region_id, hour, score in buckets.iterator():
+        age_hours = (current - hour).total_seconds() / 3600
+        totals[(item_type, item_id)] += score * 0.5 ** (age_hours / half_life)
+        regions[(item_type, item_id)] = region_id  # The latest hour wins
+
+    candidates = defaultdict(list)
+    for (item_type, item_id), score in totals.items():
+        candidates[(item_type, None)].append((score, item_id))
+        if regions[(item_type, item_id)] is not None:
+            candidates[(item_type, regions[(item_type, item_id)])].append((score, item_id))
+
+    return [
+        TrendingItem(item_type=item_type, region_id=region_id, rank=rank, item_id=item_id,
+                     score=round(score, 4), computed_at=now)
+        for (item_type, region_id), scored in candidates.items()
+        for rank, (score, item_id) in enumerate(heapq.nlargest(size, scored), 1)
+    ]
+
+
+def refresh_trending(now=None, size=None):
+    """Update the hourly buckets and rebuild the trending lists. Returns (buckets written, items)."""
+    now = now or timezone.now()
+    size = size or settings.TRENDING_SIZE
+    window_start = _hour(now) - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    latest = EngagementBucket.objects.aggregate(latest=Max('hour'))['latest']
+    # Hours before the latest bucketed one are complete; that one may have
+    # been bucketed while it was still in progress
+    start = window_start if latest is None else max(window_start, min(latest, _hour(now)))
+
+    buckets = aggregate_buckets(start, now)
+    with transaction.atomic():
+        EngagementBucket.objects.filter(Q(hour__lt=window_start) | Q(hour__gte=start)).delete()
+        EngagementBucket.objects.bulk_create(buckets, batch_size=1000)
+        items = merge_top_k(now, window_start, size)
+        TrendingItem.objects.all().delete()
+        TrendingItem.objects.bulk_create(items, batch_size=1000)
+    return len(buckets), len(items)
+
+
+def trending_ids(item_type, region_id=None, limit=None):
+    """Item ids of a trending list, best first."""
+    limit = limit or settings.TRENDING_SIZE
+    return list(
+        TrendingItem.objects.filter(item_type=item_type, region_id=region_id)
+        .order_by('rank').values_list('item_id', flat=True)[:limit]
+    )
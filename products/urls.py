@@ -1,8 +1,9 @@
 # products/urls.py
 from django.urls import path
 from .views import (
-    ProductListView, ProductDetailView, ProductCreateView,
-    SellerProductListView, MyProductsView, ProductUpdateView, ProductDeleteView,
+    ProductListView, ProductDetailView, RelatedProductsView, ProductCreateView, PriceHistogramView, TrendingView,
+    SellerProductListView, MyProductsView, ProductUpdateView, ProductDeleteView, ProductBulkActionView,
+    ProductImportView, MyProductsExportView, MyProductRatingsExportView, SellerStorefrontView, SellerAnalyticsView,
     RatingCreateView, RatingUpdateView, RatingDeleteView, ProductRatingsView,
     ReelListView, ReelDetailView, ReelCreateView, MyReelsView, ReelDeleteView,
     ReelLikeToggleView, ReelCommentsView, ReelCommentCreateView, ReelCommentDeleteView,ReelShareView
@@ -12,11 +13,21 @@ urlpatterns = [
     # Product endpoints
     path('', ProductListView.as_view(), name='product-list'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
+    path('<int:pk>/related/', RelatedProductsView.as_view(), name='product-related'),
+    path('price-histogram/', PriceHistogramView.as_view(), name='price-histogram'),
+    path('trending/', TrendingView.as_view(), name='trending'),
     path('create/', ProductCreateView.as_view(), name='product-create'),
     path('my-products/', MyProductsView.as_view(), name='my-products'),
+    path('my-analytics/', SellerAnalyticsView.as_view(), name='seller-analytics'),
+    path('my-products/export.<str:export_format>', MyProductsExportView.as_view(), name='my-products-export'),
+    path('my-products/ratings/export.<str:export_format>', MyProductRatingsExportView.as_view(),
+         name='my-product-ratings-export'),
     path('<int:pk>/update/', ProductUpdateView.as_view(), name='product-update'),
     path('<int:pk>/delete/', ProductDeleteView.as_view(), name='product-delete'),
     path('seller/<int:seller_id>/', SellerProductListView.as_view(), name='seller-products'),
+    path('seller/<int:seller_id>/storefront/', SellerStorefrontView.as_view(), name='seller-storefront'),
+    path('bulk/', ProductBulkActionView.as_view(), name='product-bulk'),
+    path('import/', ProductImportView.as_view(), name='product-import'),
     
     # Rating endpoints
     path('ratings/create/', RatingCreateView.as_view(), name='rating-create'),
@@ -1,24 +1,44 @@
 # products/views.py
 
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from django.shortcuts import get_object_or_404
-from .models import Product, ProductImage, Rating
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from backend.throttling import UserTokenBucketThrottle
+from . import events
+from .analytics import METRICS, seller_series
+from .importer import FORMATS as IMPORT_FORMATS, guess_format, import_products
+from .exports import (
+    EXPORT_FORMATS, RATING_COLUMNS, SELLER_PRODUCT_COLUMNS,
+    export_response, iter_product_rows, iter_rating_rows,
+)
+from .models import EngagementBucket, EngagementEvent, Product, ProductImage, Rating, SellerStats
+from .pagination import PriceKeysetPagination
+from .pricing import get_histogram, plan_price_range
+from .regions import region_directory
+from .reel_views import record_play, viewer_key
+from .trending import trending_ids
 from .serializers import (
     ProductListSerializer, 
     ProductDetailSerializer, 
     ProductCreateSerializer,
     ProductCreateResponseSerializer,
-    RatingSerializer
+    ProductBulkActionSerializer,
+    RatingSerializer,
+    SellerStorefrontSerializer
 )
 from .models import Reel, ReelLike, ReelComment
 from .serializers import ReelListSerializer, ReelCreateSerializer, ReelCommentSerializer
 
-
 from django.db.models import Count
 from rest_framework import generics, status
 from rest_framework.views import APIView
@@ -29,25 +49,50 @@ from .models import Reel, ReelLike, ReelComment
 from .serializers import ReelListSerializer, ReelCreateSerializer, ReelCommentSerializer
 import json
 
+User = get_user_model()
+
 
 class ProductListView(generics.ListAPIView):
-    """List all active products (public access)"""
-    queryset = Product.objects.filter(is_active=True)
+    """
+    List all active products (public access), newest first.
+    ?sort=price or ?sort=-price returns cursor-paginated pages instead.
+    """
+    queryset = Product.objects.all()
     serializer_class = ProductListSerializer
+    PRICE_SORTS = ('price', '-price')
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            sort = self.request.query_params.get('sort')
+            self._paginator = None
+            if sort in self.PRICE_SORTS:
+                self._paginator = PriceKeysetPagination(descending=sort == '-price')
+        return self._paginator
+
+    def get_price_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            raise ValidationError({name: "Must be a number"})
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
-        # Filter by region(s) if provided
+        # Filter by region(s) if provided, as ?region=a&region=b or ?region=a,b
         regions = self.request.query_params.getlist('region', [])
+        region_ids = None
         if regions:
-            # If regions is a string, split it by commas
-            if isinstance(regions, str):
-                regions = [r.strip() for r in regions.split(',')]
-            queryset = queryset.filter(region__in=regions)
+            names = [r for value in regions for r in value.split(',')]
+            # Matched to region ids in memory; unknown names match nothing
+            region_ids = region_directory.ids_for(names)
+            queryset = queryset.filter(region_ref_id__in=region_ids)
         
         # Filter by condition
-        condition = self.request.query_params.get('condition', None)
+        condition = self.request.query_params.get('condition', '')
         if condition:
             queryset = queryset.filter(condition=condition)
         
@@ -57,19 +102,115 @@ class ProductListView(generics.ListAPIView):
             queryset = queryset.filter(name__icontains=search)
         
         # Filter by price range
-        min_price = self.request.query_params.get('min_price', None)
-        max_price = self.request.query_params.get('max_price', None)
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
+        min_price = self.get_price_param('min_price')
+        max_price = self.get_price_param('max_price')
+        if self.paginator is not None:
+            # Keyset pages already walk the price index
+            if min_price is not None:
+                queryset = queryset.filter(price__gte=min_price)
+            if max_price is not None:
+                queryset = queryset.filter(price__lte=max_price)
+            queryset = queryset.order_by(*self.paginator.ordering)
+        elif min_price is not None or max_price is not None:
+            queryset = plan_price_range(queryset, min_price, max_price, region_ids, condition)
         
         return queryset
 
 
+class PriceHistogramView(APIView):
+    """
+    Price distribution of active products for price sliders.
+    ?region=<name>&condition=<condition>, both optional.
+    """
+
+    def get(self, request):
+        condition = request.query_params.get('condition', '')
+        if condition and condition not in dict(Product.CONDITION_CHOICES):
+            raise ValidationError({"condition": "Unknown condition"})
+
+        region_id = None
+        region = request.query_params.get('region')
+        if region:
+            region_ids = region_directory.ids_for([region])
+            if not region_ids:
+                raise NotFound("Unknown region")
+            region_id = region_ids[0]
+
+        histogram = get_histogram(region_id, condition)
+        if histogram is None:
+            return Response({'min_price': None, 'max_price': None, 'total': 0,
+                             'buckets': [], 'refreshed_at': None})
+        return Response({
+            # Strings, like prices everywhere else in the API
+            'min_price': str(histogram.min_price),
+            'max_price': str(histogram.max_price),
+            'total': histogram.total_count,
+            'buckets': [{'min': low, 'max': high, 'count': count}
+                        for low, high, count in histogram.buckets()],
+            'refreshed_at': histogram.refreshed_at,
+        })
+
+
+class TrendingView(APIView):
+    """
+    Trending products (?region=<name> for one region) or reels (?type=reel),
+    best first, from the lists precomputed by `refresh_trending`.
+    ?limit=<n> returns the top n only.
+    """
+
+    def get(self, request):
+        item_type = request.query_params.get('type', EngagementBucket.ITEM_PRODUCT)
+        if item_type not in dict(EngagementBucket.ITEM_CHOICES):
+            raise ValidationError({"type": "Must be product or reel"})
+
+        region_id = None
+        region = request.query_params.get('region')
+        if region:
+            if item_type == EngagementBucket.ITEM_REEL:
+                raise ValidationError({"region": "Reels are not listed per region"})
+            region_ids = region_directory.ids_for([region])
+            if not region_ids:
+                raise NotFound("Unknown region")
+            region_id = region_ids[0]
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', settings.TRENDING_SIZE)), 1),
+                        settings.TRENDING_SIZE)
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer"})
+
+        ids = trending_ids(item_type, region_id, limit)
+        if item_type == EngagementBucket.ITEM_PRODUCT:
+            queryset = Product.objects.with_rating_stats().select_related('seller').prefetch_related('images')
+            serializer_class = ProductListSerializer
+        else:
+            queryset = Reel.objects.select_related('seller')
+            serializer_class = ReelListSerializer
+        # Items deactivated since the lists were computed are left out
+        items = queryset.in_bulk(ids)
+        ranked = [items[pk] for pk in ids if pk in items]
+        return Response(serializer_class(ranked, many=True, context={'request': request}).data)
+
+
+class RelatedProductsView(generics.ListAPIView):
+    """
+    Products similar to a product, most similar first, from the lists
+    precomputed by `refresh_related_products` (one query).
+    """
+    serializer_class = ProductListSerializer
+
+    def get_queryset(self):
+        # Related products deactivated since the lists were computed are left out
+        return (
+            Product.objects.filter(neighbour_of__product_id=self.kwargs['pk'])
+            .select_related('seller').with_rating_stats().with_primary_image()
+            .order_by('neighbour_of__rank')
+        )
+
+
 class ProductDetailView(generics.RetrieveAPIView):
     """Get product details (public access)"""
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.all()
     serializer_class = ProductDetailSerializer
     
     def get_serializer_context(self):
@@ -92,7 +233,12 @@ class ProductCreateView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         """Override to handle both success and error responses properly"""
         try:
-            return super().create(request, *args, **kwargs)
+            response = super().create(request, *args, **kwargs)
+            # Set by ProductCreateSerializer after local image preprocessing
+            saved = getattr(response.data.serializer.instance, 'image_bytes_saved', None)
+            if saved is not None:
+                response['X-Image-Bytes-Saved'] = str(saved)
+            return response
         except Exception as e:
             return Response(
                 {"detail": str(e)},
@@ -106,7 +252,16 @@ class SellerProductListView(generics.ListAPIView):
     
     def get_queryset(self):
         seller_id = self.kwargs.get('seller_id')
-        return Product.objects.filter(seller_id=seller_id, is_active=True)
+        return Product.objects.filter(seller_id=seller_id)
+
+
+class SellerStorefrontView(generics.RetrieveAPIView):
+    """Seller profile and summary stats, read from SellerStats in one query"""
+    serializer_class = SellerStorefrontSerializer
+    lookup_url_kwarg = 'seller_id'
+
+    def get_queryset(self):
+        return User.objects.select_related('seller_stats')
 
 
 class MyProductsView(generics.ListAPIView):
@@ -115,7 +270,86 @@ class MyProductsView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Product.objects.filter(seller=self.request.user)
+        return Product.all_objects.filter(seller=self.request.user)
+
+
+class MyProductsExportView(APIView):
+    """Stream the authenticated seller's products as CSV or JSONL"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({"detail": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"})
+
+        queryset = Product.all_objects.filter(seller=request.user)
+        return export_response(
+            SELLER_PRODUCT_COLUMNS,
+            iter_product_rows(queryset, SELLER_PRODUCT_COLUMNS),
+            export_format,
+            'my-products'
+        )
+
+
+class MyProductRatingsExportView(APIView):
+    """Stream all ratings on the authenticated seller's products as CSV or JSONL"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({"detail": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"})
+
+        queryset = Rating.objects.filter(product__seller=request.user)
+        return export_response(
+            RATING_COLUMNS,
+            iter_rating_rows(queryset),
+            export_format,
+            'my-product-ratings'
+        )
+
+
+class SellerAnalyticsView(APIView):
+    """
+    Daily engagement of the authenticated seller's products and reels, from
+    the rollups written by `rollup_daily_stats`.
+
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: the last 30 days, at most
+    MAX_DAYS), optionally ?type=product|reel and ?item=<id>.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_DAYS = 366
+    DEFAULT_DAYS = 30
+
+    def get_date_param(self, name, default):
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValidationError({name: "Must be a date (YYYY-MM-DD)"})
+
+    def get(self, request):
+        end = self.get_date_param('end', timezone.localdate())
+        start = self.get_date_param('start', end - timedelta(days=self.DEFAULT_DAYS - 1))
+        if start > end:
+            raise ValidationError({"start": "Must not be after end"})
+        if (end - start).days >= self.MAX_DAYS:
+            raise ValidationError({"start": f"Ranges are limited to {self.MAX_DAYS} days"})
+
+        item_type = request.query_params.get('type')
+        if item_type and item_type not in dict(EngagementBucket.ITEM_CHOICES):
+            raise ValidationError({"type": "Must be product or reel"})
+        item_id = request.query_params.get('item')
+        if item_id:
+            if not item_type:
+                raise ValidationError({"type": "Required with item"})
+            if not item_id.isdigit():
+                raise ValidationError({"item": "Must be an id"})
+
+        series = seller_series(request.user.id, start, end, item_type, item_id and int(item_id))
+        totals = {metric: sum(day[metric] for day in series) for metric in METRICS}
+        totals['average_rating'] = round(totals['rating_sum'] / totals['ratings'], 2) if totals['ratings'] else 0
+        return Response({'start': start, 'end': end, 'totals': totals, 'series': series})
 
 
 class ProductUpdateView(generics.UpdateAPIView):
@@ -124,7 +358,7 @@ class ProductUpdateView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Product.objects.filter(seller=self.request.user)
+        return Product.all_objects.filter(seller=self.request.user)
 
 
 class ProductDeleteView(generics.DestroyAPIView):
@@ -132,7 +366,7 @@ class ProductDeleteView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Product.objects.filter(seller=self.request.user)
+        return Product.all_objects.filter(seller=self.request.user)
     
     def perform_destroy(self, instance):
         # Soft delete - just mark as inactive
@@ -140,6 +374,95 @@ class ProductDeleteView(generics.DestroyAPIView):
         instance.save()
 
 
+class ProductBulkActionView(APIView):
+    """
+    Apply one change to many of the caller's products with a single UPDATE.
+
+    Body: {"action": "deactivate" | "reactivate" | "reprice" | "set_region",
+           "ids": [...], "price": "...", "region": "..."}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ProductBulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        action = serializer.validated_data['action']
+        ids = serializer.validated_data['ids']
+
+        owned = Product.all_objects.filter(seller=request.user, id__in=ids)
+        current = dict(owned.values_list('id', 'is_active'))
+
+        if action == 'deactivate':
+            changes = {'is_active': False}
+            to_update = [pk for pk, is_active in current.items() if is_active]
+        elif action == 'reactivate':
+            changes = {'is_active': True}
+            to_update = [pk for pk, is_active in current.items() if not is_active]
+        elif action == 'reprice':
+            changes = {'price': serializer.validated_data['price']}
+            to_update = list(current)
+        else:
+            region_id, region_name = region_directory.resolve(serializer.validated_data['region'])
+            changes = {'region': region_name, 'region_ref_id': region_id}
+            to_update = list(current)
+
+        updated = 0
+        if to_update:
+            # update() bypasses auto_now, so stamp updated_at explicitly
+            updated = Product.all_objects.filter(seller=request.user, id__in=to_update).update(
+                updated_at=timezone.now(), **changes
+            )
+            if 'is_active' in changes:
+                # update() skips the model signals that maintain SellerStats
+                SellerStats.objects.apply_deltas(
+                    request.user.id, active_product_count=updated if changes['is_active'] else -updated
+                )
+
+        to_update = set(to_update)
+        results = []
+        for pk in ids:
+            if pk not in current:
+                result = 'not_found'
+            elif pk in to_update:
+                result = 'updated'
+            else:
+                result = 'unchanged'
+            results.append({'id': pk, 'status': result})
+
+        return Response({
+            'action': action,
+            'updated': updated,
+            'results': results
+        })
+
+
+class ProductImportView(APIView):
+    """
+    Bulk import products from an uploaded CSV or JSONL file (verified sellers).
+    Rows are validated like ProductCreateView; failures are reported per row.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request):
+        if not request.user.is_email_verified:
+            raise PermissionDenied("Email must be verified to create products")
+
+        upload = request.FILES.get('file')
+        if not upload:
+            raise ValidationError({"file": "A CSV or JSONL file is required"})
+
+        fmt = request.data.get('file_format') or guess_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            raise ValidationError({"file_format": f"Must be one of: {', '.join(IMPORT_FORMATS)}"})
+
+        report = import_products(upload, fmt, request.user)
+        return Response(
+            report.as_dict(),
+            status=status.HTTP_201_CREATED if report.created else status.HTTP_400_BAD_REQUEST
+        )
+
+
 class RatingCreateView(generics.CreateAPIView):
     """Create a rating for a product (buyers only - must be authenticated)"""
     serializer_class = RatingSerializer
@@ -207,7 +530,7 @@ class ReelListView(generics.ListAPIView):
     serializer_class = ReelListSerializer
     
     def get_queryset(self):
-        return Reel.objects.filter(is_active=True).annotate(
+        return Reel.objects.annotate(
             like_count=Count('likes'),
             comment_count=Count('comments')
         )
@@ -219,15 +542,13 @@ class ReelListView(generics.ListAPIView):
 
 
 class ReelDetailView(generics.RetrieveAPIView):
-    """Get reel details and increment view count"""
-    queryset = Reel.objects.filter(is_active=True)
+    """Get reel details and record a play (and a view, once per viewer per window)"""
+    queryset = Reel.objects.all()
     serializer_class = ReelListSerializer
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment view count
-        instance.views_count += 1
-        instance.save(update_fields=['views_count'])
+        record_play(instance, viewer_key(request), request.user.pk)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -250,7 +571,7 @@ class MyReelsView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Reel.objects.filter(seller=self.request.user)
+        return Reel.all_objects.filter(seller=self.request.user)
 
 
 class ReelDeleteView(generics.DestroyAPIView):
@@ -258,7 +579,7 @@ class ReelDeleteView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Reel.objects.filter(seller=self.request.user)
+        return Reel.all_objects.filter(seller=self.request.user)
     
     def perform_destroy(self, instance):
         # Soft delete
@@ -270,27 +591,30 @@ class ReelDeleteView(generics.DestroyAPIView):
 class ReelShareView(APIView):
     """Increment share count for a reel"""
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_classes = [UserTokenBucketThrottle]
+    throttle_scope = 'reel_share'
     
     def post(self, request, reel_id):
-        reel = get_object_or_404(Reel, id=reel_id, is_active=True)
+        reel = get_object_or_404(Reel, id=reel_id)
         
-        # Increment share count
-        reel.shares_count += 1
-        reel.save(update_fields=['shares_count'])
+        # Counted by the next engagement rollup
+        events.record(EngagementEvent.SHARE, reel.pk, request.user.pk)
         
         return Response({
             'success': True,
             'message': 'Share recorded',
-            'shares_count': reel.shares_count
+            'shares_count': reel.shares_count + 1
         })
 
 # Update ReelLikeToggleView to use context
 class ReelLikeToggleView(APIView):
     """Toggle like on a reel"""
     permission_classes = [IsAuthenticated]
+    throttle_classes = [UserTokenBucketThrottle]
+    throttle_scope = 'reel_like'
     
     def post(self, request, reel_id):
-        reel = get_object_or_404(Reel, id=reel_id, is_active=True)
+        reel = get_object_or_404(Reel, id=reel_id)
         user = request.user
         
         like, created = ReelLike.objects.get_or_create(reel=reel, user=user)
@@ -298,8 +622,8 @@ class ReelLikeToggleView(APIView):
         if not created:
             # Unlike
             like.delete()
+            events.record(EngagementEvent.UNLIKE, reel.pk, user.pk)
             reel.likes_count = max(0, reel.likes_count - 1)
-            reel.save()
             return Response({
                 'liked': False, 
                 'likes_count': reel.likes_count,
@@ -307,8 +631,8 @@ class ReelLikeToggleView(APIView):
             })
         else:
             # Like
+            events.record(EngagementEvent.LIKE, reel.pk, user.pk)
             reel.likes_count += 1
-            reel.save()
             return Response({
                 'liked': True, 
                 'likes_count': reel.likes_count,
@@ -339,8 +663,5 @@ class ReelCommentDeleteView(generics.DestroyAPIView):
         return ReelComment.objects.filter(user=self.request.user)
     
     def perform_destroy(self, instance):
-        # Decrement comments count
-        reel = instance.reel
-        reel.comments_count = max(0, reel.comments_count - 1)
-        reel.save()
+        events.record(EngagementEvent.UNCOMMENT, instance.reel_id, self.request.user.pk)
         instance.delete()
\ No newline at end of file